@@ -22,24 +22,34 @@ class BasisSelector(QWidget):
         self.element_selector.currentTextChanged.connect(self.changed_element)
 
         self.code_selector = QComboBox(self)
+        self.codes = []
         layout.addWidget(self.code_selector)
         self.code_selector.currentTextChanged.connect(self.changed_code)
 
     def reload(self, current_spec, possible_basis_sets):
+        r"""
+        Show a basis specification and the basis sets that may be chosen. The selectors are only repopulated if the
+        elements or the choice of basis sets have changed.
+        """
         self.current_spec = copy.deepcopy(current_spec)
         select_ = current_spec['default'] if current_spec['default'] in possible_basis_sets else self.null_prompt
         last_element = self.element_selector.currentText()
-        self.element_selector.clear()
-        self.element_selector.addItem('default')
-        if 'elements' in current_spec:
-            self.element_selector.addItems(current_spec['elements'].keys())
-            if last_element in current_spec['elements'].keys():
-                self.element_selector.setCurrentText(last_element)
-                if last_element in possible_basis_sets:
-                    select_ = current_spec['elements'][last_element]
-        self.element_selector.addItem(self.new_elementRange)
-        self.code_selector.clear()
-        self.code_selector.addItems([self.null_prompt] + possible_basis_sets + [self.delete_elementRange])
+        elements = ['default'] + (list(current_spec['elements'].keys()) if 'elements' in current_spec else []) + [
+            self.new_elementRange]
+        if elements != [self.element_selector.itemText(i) for i in range(self.element_selector.count())]:
+            self.element_selector.clear()
+            self.element_selector.addItems(elements)
+        if 'elements' in current_spec and last_element in current_spec['elements'].keys():
+            self.element_selector.setCurrentText(last_element)
+            if last_element in possible_basis_sets:
+                select_ = current_spec['elements'][last_element]
+        else:
+            self.element_selector.setCurrentText('default')
+        codes = [self.null_prompt] + possible_basis_sets + [self.delete_elementRange]
+        if codes != self.codes:
+            self.code_selector.clear()
+            self.code_selector.addItems(codes)
+            self.codes = codes
         self.code_selector.setCurrentText(select_)
 
     def changed_element(self, text):
@@ -3,22 +3,23 @@ import pathlib
 import platform
 import re
 
-from PyQt5.QtCore import QCoreApplication, Qt, QUrl
+from PyQt5.QtCore import QCoreApplication, Qt, QUrl, QTimer, QSize
 
 from MenuBar import MenuBar
 from RecentMenu import RecentMenu
 from help import HelpManager
-from utilities import force_suffix
+from utilities import force_suffix, structure_thumbnail
 
-import pymolpro
 from PyQt5 import QtCore
-from PyQt5.QtGui import QPixmap, QKeySequence, QDesktopServices, QGuiApplication
+from PyQt5.QtGui import QPixmap, QKeySequence, QDesktopServices, QGuiApplication, QIcon
 from PyQt5.QtWidgets import QMainWindow, QHBoxLayout, QLabel, QWidget, QVBoxLayout, QPushButton, QFileDialog, \
     QDesktopWidget, QAction, QShortcut, QToolButton
 
-from ProjectWindow import ProjectWindow
 from WindowManager import WindowManager
 from settings import settings, settings_edit
+from login_environment import refresh_login_path
+from recent_projects import recent_projects_index
+from version import version
 
 
 class PushButton(QPushButton):
@@ -47,6 +48,11 @@ class Chooser(QMainWindow):
         # new_button.setStyleSheet(hover_css)
         lh_panel.addWidget(new_button)
         self.recent_project_box = QWidget()
+        self.recent_project_buttons = []
+        self.recent_projects_version = None
+        self.recent_projects_index = recent_projects_index(structure_thumbnail)
+        self.recent_projects_timer = QTimer(self)
+        self.recent_projects_timer.timeout.connect(self.show_recent_project_summaries)
         self.populate_recent_project_box()
 
         lh_panel.addWidget(self.recent_project_box)
@@ -54,6 +60,9 @@ class Chooser(QMainWindow):
         # existing_button.setStyleSheet(hover_css)
         existing_button.clicked.connect(self.openProjectDialog)
         lh_panel.addWidget(existing_button)
+        browse_button = PushButton('&Browse projects...')
+        browse_button.clicked.connect(self.browseProjectsDialog)
+        lh_panel.addWidget(browse_button)
         self.quitButton = PushButton('&Quit')
         # self.quitButton.setStyleSheet(hover_css)
         lh_panel.addWidget(self.quitButton)
@@ -109,26 +118,7 @@ class Chooser(QMainWindow):
         link_layout.addWidget(manual_button)
 
         # rh_panel.addWidget(QLabel("iMolpro version "+get_versions()['version']+'\n('+get_versions()['date']+')'))
-        def version_():
-            import subprocess
-            import os
-            version = None
-            if os.path.exists(pathlib.Path(__file__).resolve().parent / '.git'):
-                try:
-                    version = subprocess.check_output(['git', 'describe', '--tags', '--dirty']).decode('ascii').strip()
-                except Exception:
-                    pass
-                if version:
-                    return version
-            version_file = pathlib.Path(__file__).resolve().parent / 'VERSION'
-            if os.path.exists(version_file):
-                version = open(version_file, 'r').read().strip()
-            if version:
-                return version
-            else:
-                return 'unknown'
-
-        version_label = LinkLabel("iMolpro version " + version_(), 'https://github.com/molpro/iMolpro/tree/'+re.sub('-.*','',version_())+'/README.md')
+        version_label = LinkLabel("iMolpro version " + version(), 'https://github.com/molpro/iMolpro/tree/'+re.sub('-.*','',version())+'/README.md')
         version_label.setStyleSheet("font-size: 10px")
         version_label.setAlignment(Qt.AlignCenter)
         rh_panel.addWidget(version_label)
@@ -140,6 +130,8 @@ class Chooser(QMainWindow):
                           tooltip='Create a new project')
         menubar.addAction('Open', 'Projects', slot=self.openProjectDialog, shortcut='Ctrl+O',
                           tooltip='Open an existing project')
+        menubar.addAction('Browse', 'Projects', slot=self.browseProjectsDialog,
+                          tooltip='Search the projects in indexed directories')
         menubar.addSeparator('Projects')
         self.recentMenu = RecentMenu(window_manager)
         menubar.addSubmenu(self.recentMenu, 'Projects')
@@ -147,6 +139,8 @@ class Chooser(QMainWindow):
         menubar.addAction('Quit', 'Projects', slot=QCoreApplication.quit, shortcut='Ctrl+Q',
                           tooltip='Quit')
         menubar.addAction('Settings', 'Edit', lambda arg, parent=self: settings_edit(parent), tooltip='Edit settings')
+        menubar.addAction('Refresh shell PATH', 'Edit', refresh_login_path,
+                          tooltip='Find again the PATH set by the login shell, for example after installing software')
 
         help_manager = HelpManager(menubar)
         help_manager.register('Overview', 'README')
@@ -187,6 +181,28 @@ class Chooser(QMainWindow):
                 self.clicked.connect(self.qaction.triggered)
                 self.setStyleSheet("* {border: none } :hover { background-color: #F0F0F0}  ")
                 # self.setStyleSheet("* {border: none }")
+                self.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
+                self.setIconSize(QSize(32, 32))
+                self.label = self.text()
+
+            def show_summary(self, summary):
+                if summary is None:
+                    return
+                details = []
+                if not summary.get('exists', True):
+                    details.append('not found')
+                elif not summary.get('available', True):
+                    details.append('not responding')
+                else:
+                    if summary.get('status'):
+                        details.append(summary['status'])
+                    if summary.get('energy') is not None:
+                        details.append('E = {:.8f}'.format(summary['energy']))
+                self.setEnabled(summary.get('exists', True) and summary.get('available', True))
+                self.setText(self.label + ('\n' + ', '.join(details) if details else ''))
+                self.setToolTip(self.filename)
+                if summary.get('thumbnail') is not None:
+                    self.setIcon(QIcon(QPixmap.fromImage(summary['thumbnail'])))
 
             def enterEvent(self, ev, QEnterEvent=None):
                 self.setCursor(Qt.PointingHandCursor)
@@ -195,9 +211,16 @@ class Chooser(QMainWindow):
                 self.setCursor(Qt.ArrowCursor)
 
             def action(self):
+                from ProjectWindow import ProjectWindow
                 self.parent.window_manager.register(ProjectWindow(self.filename, self.parent.window_manager))
                 self.parent.hide()
 
+        projects = self.recent_projects_index.projects(max_items - 1)
+        self.recent_projects_index.refresh(max_items - 1)
+        self.recent_projects_timer.start(200)
+        if self.recent_project_box.layout() and projects == getattr(self, 'recent_projects_shown', None):
+            return
+        self.recent_projects_shown = projects
         self.recent_project_box.setStyleSheet(" background-color: #F7F7F7 ")
         self.recent_project_box.setMaximumWidth(400)
         self.recent_project_box.setFixedWidth(400)
@@ -208,21 +231,46 @@ class Chooser(QMainWindow):
             self.recent_project_box.layout().removeItem(item)
             item.widget().setParent(None)
         self.recent_project_box.layout().addWidget(QLabel('Open a recently-used project:'), 0, QtCore.Qt.AlignLeft)
-        for i in range(1, max_items):
-            f = pymolpro.recent_project('molpro', i)
-            if f:
-                button = RecentProjectButton(f, i, self)
-                self.recent_project_box.layout().addWidget(button, -1, QtCore.Qt.AlignLeft)
+        self.recent_project_buttons = []
+        for i, f in enumerate(projects, 1):
+            button = RecentProjectButton(f, i, self)
+            button.show_summary(self.recent_projects_index.summary(f))
+            self.recent_project_buttons.append((f, button))
+            self.recent_project_box.layout().addWidget(button, -1, QtCore.Qt.AlignLeft)
+
+    def show_recent_project_summaries(self):
+        r"""
+        Update the recent-project entries with the results of the background checks that have finished
+        """
+        self.recent_projects_index.poll()
+        if self.recent_projects_index.version != self.recent_projects_version:
+            self.recent_projects_version = self.recent_projects_index.version
+            for f, button in self.recent_project_buttons:
+                button.show_summary(self.recent_projects_index.summary(f))
+                button.setVisible(not self.recent_projects_index.missing(f))
+        if not self.recent_projects_index.pending:
+            self.recent_projects_timer.stop()
 
     def openProjectDialog(self):
         _dir = settings['project_directory'] if 'project_directory' in settings else os.path.curdir
-        if platform.system() == 'Darwin':
-            filename, filter = QFileDialog.getOpenFileName(self, 'Open existing project...', _dir,
-                                                           filter='Molpro projects (*.molpro)')
-        else:
-            filename = force_suffix(QFileDialog.getExistingDirectory(self, 'Open existing project...', _dir))
-        if filename:
-            self.window_manager.register(ProjectWindow(filename, self.window_manager))
+        self.window_manager.opening = True  # no preloading behind the dialog
+        try:
+            if platform.system() == 'Darwin':
+                filename, filter = QFileDialog.getOpenFileName(self, 'Open existing project...', _dir,
+                                                               filter='Molpro projects (*.molpro)')
+            else:
+                filename = force_suffix(QFileDialog.getExistingDirectory(self, 'Open existing project...', _dir))
+            if filename:
+                from ProjectWindow import ProjectWindow
+                self.window_manager.register(ProjectWindow(filename, self.window_manager))
+                self.hide()
+        finally:
+            self.window_manager.opening = False
+
+    def browseProjectsDialog(self):
+        from ProjectBrowser import ProjectBrowser
+        browser = ProjectBrowser(self.window_manager, self)
+        if browser.exec():
             self.hide()
 
     def newProjectDialog(self):
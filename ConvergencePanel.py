@@ -0,0 +1,134 @@
+import math
+
+import numpy
+from PyQt5.QtCore import QTimer, Qt, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+from PyQt5.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QComboBox
+
+from convergence import ConvergenceParser, decimate
+
+traces = [
+    ('change', 'log10 |energy change|', QColor('#1f77b4')),
+    ('gradient', 'log10 gradient', QColor('#d62728')),
+]
+
+
+class ConvergencePlot(QWidget):
+    r"""
+    Plot of the logarithms of the energy change and gradient against iteration for one series
+    """
+
+    margin = 40
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.series = None
+        self.cache = None
+        self.setMinimumSize(240, 160)
+
+    def curves(self, width):
+        r"""
+        The logarithms of the traces, reduced to the points to draw, each as (indices, values), with their range. They
+        are worked out with numpy, and kept until the series grows or the plot is resized.
+        """
+        key = (id(self.series), len(self.series), width)
+        if self.cache is None or self.cache[0] != key:
+            curves = {}
+            for attribute, label, colour in traces:
+                with numpy.errstate(divide='ignore', invalid='ignore'):
+                    logarithms = numpy.log10(numpy.abs(getattr(self.series, attribute)))
+                logarithms[~numpy.isfinite(logarithms)] = math.nan  # zero or missing
+                if not numpy.isnan(logarithms).all():
+                    indices = decimate(logarithms, width)
+                    curves[attribute] = (indices, logarithms[indices])
+            low = min([float(numpy.nanmin(values)) for indices, values in curves.values()] + [0])
+            high = max([float(numpy.nanmax(values)) for indices, values in curves.values()] + [low + 1])
+            self.cache = (key, curves, math.floor(low), math.ceil(high))
+        return self.cache[1:]
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), Qt.white)
+        if self.series is None or not len(self.series):
+            painter.drawText(self.rect(), Qt.AlignCenter, 'No iterations yet')
+            return
+        area = QRectF(self.margin, 10, self.width() - self.margin - 10, self.height() - self.margin - 10)
+        curves, low, high = self.curves(max(1, int(area.width())))
+        n = len(self.series)
+        painter.setPen(QPen(Qt.gray))
+        painter.drawRect(area)
+        for decade in range(low, high + 1, max(1, (high - low) // 6)):
+            y = area.bottom() - (decade - low) / (high - low) * area.height()
+            painter.drawText(QRectF(0, y - 8, self.margin - 4, 16), Qt.AlignRight | Qt.AlignVCenter, str(decade))
+        painter.drawText(QRectF(area.left(), area.bottom() + 4, area.width(), 16), Qt.AlignCenter,
+                         self.series.name + ': ' + str(n) + ' iterations, E = {:.8f}'.format(self.series.energy[-1]))
+        for attribute, label, colour in traces:
+            if attribute not in curves:
+                continue
+            polygon = QPolygonF()
+            for i, value in zip(*curves[attribute]):
+                if not math.isnan(value):
+                    polygon.append(QPointF(area.left() + (i / (n - 1) if n > 1 else 0.5) * area.width(),
+                                           area.bottom() - (value - low) / (high - low) * area.height()))
+            painter.setPen(QPen(colour, 1.5))
+            painter.drawPolyline(polygon)
+        for k, (attribute, label, colour) in enumerate(trace for trace in traces if trace[0] in curves):
+            painter.setPen(colour)
+            painter.drawText(QRectF(area.left() + 6, area.top() + 4 + 16 * k, area.width(), 16), Qt.AlignLeft, label)
+
+
+class ConvergencePanel(QDockWidget):
+    r"""
+    Live plots of the convergence of the iterations in the output of a job, fed with the output as it is read by the
+    output pane, and redrawn at most ``frame_rate`` times a second
+    """
+
+    def __init__(self, output_pane, parent=None, frame_rate=4):
+        super().__init__('Convergence', parent)
+        self.setObjectName('Convergence')
+        self.parser = ConvergenceParser()
+        self.selector = QComboBox(self)
+        self.selector.currentIndexChanged.connect(self.show_series)
+        self.plot = ConvergencePlot(self)
+        container = QWidget(self)
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.selector)
+        layout.addWidget(self.plot)
+        self.setWidget(container)
+        self.shown = None
+        output_pane.appended.connect(self.feed)
+        if output_pane.position:
+            try:
+                with open(output_pane.filename, 'rb') as f:
+                    self.feed(0, f.read(output_pane.position))
+            except OSError:
+                pass
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(int(1000 / frame_rate))
+
+    def feed(self, offset, data):
+        if offset == 0:
+            self.parser.reset()
+        self.parser.feed(data)
+
+    def refresh(self):
+        if not self.isVisible() or self.parser.version == self.shown:
+            return
+        self.shown = self.parser.version
+        names = [series.name for series in self.parser.series]
+        if names != [self.selector.itemText(i) for i in range(self.selector.count())]:
+            current = self.selector.currentIndex()
+            follow = current < 0 or current == self.selector.count() - 1  # stay with the latest series
+            self.selector.blockSignals(True)
+            self.selector.clear()
+            self.selector.addItems(names)
+            self.selector.setCurrentIndex(len(names) - 1 if follow else current)
+            self.selector.blockSignals(False)
+        self.show_series(self.selector.currentIndex())
+
+    def show_series(self, index):
+        self.plot.series = self.parser.series[index] if 0 <= index < len(self.parser.series) else None
+        self.plot.update()
@@ -39,3 +39,44 @@ def test_content(qtbot, tmpdir):
         editor.sync()
         assert editor.toPlainText() == ensure_trailing_newline(replacement_text)
         assert os.path.getmtime(test_file) == file_written_time # editor should not have written unnecessarily
+
+
+def test_undo_and_unnecessary_writes(qtbot, tmpdir):
+    test_file = tmpdir / 'test-Editfile-undo.txt'
+    editor = EditFile(test_file)
+    qtbot.addWidget(editor)
+    editor.insertPlainText('abc')
+    editor.sync()
+    with open(test_file, 'r') as f:
+        assert f.read() == 'abc\n'
+    inode = os.stat(test_file).st_ino
+    editor.sync()
+    assert os.stat(test_file).st_ino == inode  # not modified, so not written again
+
+    editor.selectAll()
+    editor.textCursor().removeSelectedText()
+    editor.sync()
+    assert editor.toPlainText() == '\n'
+    with open(test_file, 'r') as f:
+        assert f.read() == '\n'
+    assert editor.document().isUndoAvailable()
+    editor.undo()
+    assert editor.toPlainText() == 'abc\n'
+
+
+def test_search(qtbot, tmpdir):
+    test_file = tmpdir / 'test-Editfile-search.txt'
+    with open(test_file, 'w') as f:
+        f.write('geometry=h2o.xyz\nbasis=cc-pVTZ\nhf\nccsd(t)\nhf\n')
+    editor = EditFile(test_file)
+    qtbot.addWidget(editor)
+    assert editor.search_and_move('hf')
+    assert editor.textCursor().position() == 31
+    assert editor.search_and_move()
+    assert editor.textCursor().position() == 42
+    assert not editor.search_and_move()
+    assert editor.search_and_move(reverse=True)
+    assert editor.textCursor().position() == 31
+    assert editor.search_and_move('c+sd', regex=True)
+    assert editor.textCursor().position() == 34
+    assert not editor.search_and_move('HF', regex=False)
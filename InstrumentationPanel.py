@@ -0,0 +1,76 @@
+from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtGui import QFont, QFontDatabase
+from PyQt5.QtWidgets import QDockWidget, QTableWidget, QTableWidgetItem, QHeaderView, QWidget, QVBoxLayout, \
+    QPushButton, QFileDialog
+
+bars = ' ▁▂▃▄▅▆▇█'
+
+
+def sparkline(histogram):
+    r"""
+    :return: The histogram drawn as a line of block characters, one per bin
+    :rtype: str
+    """
+    largest = max(histogram) if histogram else 0
+    if not largest:
+        return ''
+    return ''.join(bars[0 if not count else max(1, round(count * (len(bars) - 1) / largest))] for count in histogram)
+
+
+class InstrumentationPanel(QDockWidget):
+    r"""
+    A live table of the calls recorded by the instrumentation: count, total, mean and maximum time, and a histogram of
+    times, with one bin for each factor of about 3 from 10 microseconds to 10 seconds
+    """
+    columns = ['Function', 'Calls', 'Total (ms)', 'Mean (ms)', 'Max (ms)', 'Histogram']
+
+    def __init__(self, instrumentation, parent=None, interval=1000):
+        super().__init__('Performance', parent)
+        self.setObjectName('Performance')
+        self.instrumentation = instrumentation
+        self.table = QTableWidget(0, len(self.columns), self)
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        font = QFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.table.setFont(font)
+        save_button = QPushButton('Save trace...')
+        save_button.clicked.connect(self.save_trace)
+        container = QWidget(self)
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.table)
+        layout.addWidget(save_button)
+        self.setWidget(container)
+        self.shown = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(interval)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible() and self.shown is not None:
+            return
+        rows = self.instrumentation.summary()
+        shown = [(row['name'], row['calls']) for row in rows]
+        if shown == self.shown:
+            return
+        self.shown = shown
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, value in enumerate([row['name'], str(row['calls']), '{:.1f}'.format(row['total'] * 1e3),
+                                       '{:.2f}'.format(row['mean'] * 1e3), '{:.1f}'.format(row['maximum'] * 1e3),
+                                       sparkline(row['histogram'])]):
+                item = QTableWidgetItem(value)
+                if 0 < j < 5:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(i, j, item)
+        self.table.setUpdatesEnabled(True)
+
+    def save_trace(self):
+        filename, _ = QFileDialog.getSaveFileName(self, 'Save trace for the Chrome trace viewer', 'iMolpro.trace.json',
+                                                  'JSON files (*.json)')
+        if filename:
+            self.instrumentation.write_trace(filename)
@@ -0,0 +1,125 @@
+import os
+import threading
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem, \
+    QHeaderView, QPushButton, QLabel, QFileDialog
+
+from project_catalogue import project_catalogue
+from settings import settings
+
+
+class ProjectBrowser(QDialog):
+    r"""
+    Search the catalogue of projects found under chosen directories, and open one of them
+    """
+    columns = ['Project', 'Status', 'Formula', 'Energy', 'Directory']
+
+    def __init__(self, window_manager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Browse projects')
+        self.resize(900, 500)
+        self.window_manager = window_manager
+        self.catalogue = project_catalogue()
+        self.results = []
+        self.indexer = None
+        self.progress = None
+
+        layout = QVBoxLayout(self)
+        self.search_text = QLineEdit()
+        self.search_text.setPlaceholderText('Search by name, formula, status or input')
+        self.search_text.setClearButtonEnabled(True)
+        layout.addWidget(self.search_text)
+        self.table = QTableWidget(0, len(self.columns), self)
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.cellDoubleClicked.connect(lambda row, column: self.open(row))
+        layout.addWidget(self.table)
+        buttons = QHBoxLayout()
+        layout.addLayout(buttons)
+        self.status = QLabel()
+        buttons.addWidget(self.status)
+        buttons.addStretch()
+        add_button = QPushButton('Add directory...')
+        add_button.clicked.connect(self.add_directory)
+        buttons.addWidget(add_button)
+        self.reindex_button = QPushButton('Re-index')
+        self.reindex_button.clicked.connect(lambda: self.index())
+        buttons.addWidget(self.reindex_button)
+        open_button = QPushButton('Open')
+        open_button.clicked.connect(lambda: self.open(self.table.currentRow()))
+        buttons.addWidget(open_button)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.search)
+        self.search_text.textChanged.connect(lambda text: self.search_timer.start(200))
+        self.index_timer = QTimer(self)
+        self.index_timer.timeout.connect(self.show_progress)
+        self.search()
+
+    def search(self):
+        self.results = self.catalogue.search(self.search_text.text())
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(self.results))
+        home_dir = os.path.expanduser('~')
+        for i, result in enumerate(self.results):
+            directory, name = os.path.split(result['filename'])
+            for j, value in enumerate([name, result['status'], result['formula'] or '',
+                                       '{:.8f}'.format(result['energy']) if result['energy'] is not None else '',
+                                       directory.replace(home_dir, '~')]):
+                item = QTableWidgetItem(value)
+                if j == 3:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                item.setToolTip(result['filename'])
+                self.table.setItem(i, j, item)
+        self.table.setUpdatesEnabled(True)
+        self.show_status()
+
+    def show_status(self):
+        if self.indexer is not None:
+            self.status.setText('Indexing: ' + str(self.progress[0]) + ' projects found, ' + str(
+                self.progress[1]) + ' read' if self.progress else 'Indexing...')
+        else:
+            self.status.setText(str(len(self.results)) + ' of ' + str(len(self.catalogue)) + ' projects')
+
+    def add_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, 'Index the projects in...', settings[
+            'project_directory'] if 'project_directory' in settings else os.path.curdir)
+        if directory:
+            self.index([directory])
+
+    def index(self, roots=None):
+        r"""
+        Update the catalogue in a background thread, which starts its own pool of processes
+        """
+        if self.indexer is not None:
+            return
+        self.progress = None
+        self.indexer = threading.Thread(target=self.catalogue.update, args=(roots,),
+                                        kwargs={'progress': lambda *progress: setattr(self, 'progress', progress)},
+                                        name='ProjectBrowser', daemon=True)
+        self.indexer.start()
+        self.reindex_button.setEnabled(False)
+        self.index_timer.start(500)
+        self.show_status()
+
+    def show_progress(self):
+        if not self.indexer.is_alive():
+            self.indexer = None
+            self.index_timer.stop()
+            self.reindex_button.setEnabled(True)
+            self.search()
+        else:
+            self.show_status()
+
+    def open(self, row):
+        if 0 <= row < len(self.results):
+            from ProjectWindow import ProjectWindow
+            self.window_manager.register(ProjectWindow(self.results[row]['filename'], self.window_manager))
+            self.accept()
@@ -1,4 +1,5 @@
 import concurrent.futures
+import contextlib
 import copy
 import difflib
 import glob
@@ -21,17 +22,26 @@ from pymolpro import Project
 
 import molpro_input
 from BasisSelector import BasisSelector
+from basis_index import basis_index
 from SpinComboBox import SpinComboBox
 from molpro_input import InputSpecification
 from CheckableComboBox import CheckableComboBox
 from MenuBar import MenuBar
 from OldOutputMenu import OldOutputMenu
 from RecentMenu import RecentMenu
-from database import database_choose_structure
 from help import HelpManager
 from utilities import EditFile, ViewFile, factory_vibration_set, factory_orbital_set
-from backend import configure_backend, BackendConfigurationEditor, sanitise_backends
+from backend import configure_backend, BackendConfigurationEditor, sanitise_backends, backend_registry
+from local_pool import local_pool, is_pool_backend
+from job_submission import job_submitter
+from ssh_multiplex import ssh_pool
+from delta_sync import RemoteOutputFollower
+from output_xml import xml_complete
+from coalescer import Coalescer
+from tool_discovery import tool_discovery, viewer_paths
 from settings import settings, settings_edit
+from login_environment import refresh_login_path
+from instrumentation import instrumentation
 from OptionsDialog import OptionsDialog
 
 import logging
@@ -50,13 +60,27 @@ class StatusBar(QLabel):
         self.refresh_timer.start(latency)
 
     def refresh(self):
-        self.setText('Status: ' + ('run ' + pathlib.Path(
-            self.project.filename()).stem + ' ' if self.project.filename() != self.project.filename(
-            run=-1) else '') + self.project.status)
+        pool_state = local_pool().state(self.project.filename(run=-1))
+        operation = job_submitter().current(self.project.filename(run=-1))
+        if operation is not None:
+            self.setText('Status: ' + operation.description)
+            for run_action in self.run_actions:
+                run_action.setDisabled(True)
+            for kill_action in self.kill_actions:
+                kill_action.setDisabled(operation.name != 'run' or operation.cancelled)
+            return
+        if pool_state == 'queued':
+            self.setText('Status: queued in local pool, position ' + str(
+                local_pool().position(self.project.filename(run=-1))))
+        else:
+            self.setText('Status: ' + ('run ' + pathlib.Path(
+                self.project.filename()).stem + ' ' if self.project.filename() != self.project.filename(
+                run=-1) else '') + self.project.status)
         for run_action in self.run_actions:
-            run_action.setDisabled(not self.project.run_needed())
+            run_action.setDisabled(pool_state is not None or not self.project.run_needed())
         for kill_action in self.kill_actions:
-            kill_action.setDisabled(self.project.status != 'running' and self.project.status != 'waiting')
+            kill_action.setDisabled(
+                pool_state is None and self.project.status != 'running' and self.project.status != 'waiting')
 
 
 class ViewProjectOutput(ViewFile):
@@ -98,6 +122,8 @@ class ProjectWindow(QMainWindow):
     close_signal = pyqtSignal(QWidget, name='closeSignal')
     new_signal = pyqtSignal(QWidget, name='newSignal')
     chooser_signal = pyqtSignal(QWidget, name='chooserSignal')
+    job_operation_finished = pyqtSignal(object, object)  # emitted from a worker thread
+    pool_launch_finished = pyqtSignal(object, object)  # emitted from the local pool's scheduler thread
     null_prompt = '- Select -'
     all_qualities = 'All Qualities'
     basis_qualities = [all_qualities, 'SZ', 'DZ', 'TZ', 'QZ', '5Z', '6Z']
@@ -135,6 +161,7 @@ class ProjectWindow(QMainWindow):
             self.resize(settings['project_window_width'], settings['project_window_height'])
         self.thread_executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
         self.initialised_from_input = False
+        self.guided_possible_cache = None
 
         self.normal_geometry = self.normalGeometry()
 
@@ -182,6 +209,13 @@ class ProjectWindow(QMainWindow):
             ]}
 
         self.vods = {}
+        self.vod_coalescer = Coalescer(self.vod_artifacts, self.rebuild_vod_selector, interval=float(
+            settings['vod_rebuild_interval']) if 'vod_rebuild_interval' in settings else 1.0)
+        self.rebuild_vod_selector_timer = QTimer(self)
+        self.rebuild_vod_selector_timer.setSingleShot(True)
+        self.rebuild_vod_selector_timer.timeout.connect(
+            lambda: self.wait_to_rebuild_vod_selector(self.vod_coalescer.poll()))
+        self.convergence_panel = None
         self.setup_menubar()
 
         self.run_button = QPushButton('Run job')
@@ -190,6 +224,8 @@ class ProjectWindow(QMainWindow):
 
         self.statusBar = StatusBar(self.project, [self.run_action, self.run_button], [self.kill_action])
         self.statusBar.refresh()
+        self.job_operation_finished.connect(self.job_operation_done)
+        self.pool_launch_finished.connect(self.pool_launch_done)
 
         left_layout = QVBoxLayout()
         self.input_tabs = QTabWidget(self)
@@ -210,7 +246,9 @@ class ProjectWindow(QMainWindow):
         self.backend_selector.addItems(self.project.backend_names())
         backend = self.project.property_get('backend')
         self.backend_selector.setCurrentText(backend['backend'] if backend else 'local')
-        self.backend_selector.currentTextChanged.connect(lambda text: self.project.property_set({'backend': text}))
+        self.backend_selector.currentTextChanged.connect(self.backend_changed)
+        self.connect_backend(self.backend_selector.currentText())
+        backend_registry().subscribe(self.refresh_backend_selector)
         self.backend_parameter_button = QPushButton('Parameters')
         self.backend_parameter_button.clicked.connect(lambda: configure_backend(self))
         backend_label = QLabel('Backend:')
@@ -251,7 +289,14 @@ class ProjectWindow(QMainWindow):
         self.layout = QVBoxLayout()
         self.layout.addLayout(top_layout)
 
-        self.output_panes['out'].textChanged.connect(self.rebuild_vod_selector)
+        self.output_panes['out'].textChanged.connect(self.schedule_rebuild_vod_selector)
+        self.remote_output_follower = None
+        self.output_search = ''
+        self.remote_output_future = None
+        self.timer_remote_output = QTimer(self)
+        self.timer_remote_output.timeout.connect(self.follow_remote_output)
+        self.timer_remote_output.start(
+            int(float(settings['remote_fetch_interval']) * 1000) if 'remote_fetch_interval' in settings else 2000)
         # self.minimum_window_size = self.window().size()
 
         if self.input_pane.toPlainText().strip('\n ') == '':
@@ -274,32 +319,108 @@ class ProjectWindow(QMainWindow):
         container.setLayout(self.layout)
         self.setCentralWidget(container)
         splitter.setSizes([1, 1])
+        if instrumentation() is not None:
+            self.add_instrumentation_panel()
         if not pathlib.Path(self.project.filename('xml')).exists():
             self.show_initial_structure()
 
+    def add_instrumentation_panel(self):
+        r"""
+        Show the calls recorded by the instrumentation in a panel, that can be hidden from the View menu
+        """
+        from InstrumentationPanel import InstrumentationPanel
+        self.instrumentation_panel = InstrumentationPanel(instrumentation(), self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.instrumentation_panel)
+        self.menuBar().addSeparator('View')
+        action = self.menuBar().addAction('Performance panel', 'View', self.instrumentation_panel.setVisible,
+                                          tooltip='Show the time taken by instrumented functions', checkable=True)
+        action.setChecked(True)
+        self.instrumentation_panel.visibilityChanged.connect(action.setChecked)
+
+    def show_convergence_panel(self, visible=True):
+        r"""
+        Show or hide the live plot of convergence of the output, creating it the first time it is shown
+        """
+        if self.convergence_panel is None:
+            if not visible:
+                return
+            from ConvergencePanel import ConvergencePanel
+            self.convergence_panel = ConvergencePanel(
+                self.output_panes['out'], self, frame_rate=float(
+                    settings['convergence_frame_rate']) if 'convergence_frame_rate' in settings else 4)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.convergence_panel)
+            self.convergence_panel.visibilityChanged.connect(self.convergence_action.setChecked)
+        self.convergence_panel.setVisible(visible)
+
     def discover_external_viewer_commands(self):
         external_command_stems = [
             'avogadro',
             'Avogadro2',
             'jmol',
         ]
-        external_command_paths = []
-        if 'PATH' in os.environ:
-            external_command_paths += os.environ['PATH'].split(':')
         # TODO paths for Windows
-        external_command_paths += [
-            '/Applications/Avogadro.app/Contents/MacOS',
-            '/Applications/Avogadro2.app/Contents/MacOS',
-            '/usr/local/bin',
-            '/usr/bin',
-            '/bin',
-        ]
-        self.external_viewer_commands = {}
-        for command in external_command_stems:
-            for path in external_command_paths:
-                if os.path.exists(pathlib.Path(path) / command):
-                    self.external_viewer_commands[command] = str(pathlib.Path(path) / command)
-                    break
+        self.external_viewer_commands = tool_discovery().locate_all(external_command_stems, viewer_paths)
+
+    def backend_changed(self, text):
+        self.project.property_set({'backend': text})
+        self.connect_backend(text)
+
+    def refresh_backend_selector(self):
+        r"""
+        Bring the project's view of the backends, and the backend selector, up to date after backends.xml changes
+        """
+        self.project.refresh_backends()
+        names = self.project.backend_names()
+        if names == [self.backend_selector.itemText(i) for i in range(self.backend_selector.count())]:
+            return
+        current = self.backend_selector.currentText()
+        self.backend_selector.blockSignals(True)
+        self.backend_selector.clear()
+        self.backend_selector.addItems(names)
+        self.backend_selector.setCurrentText(current if current in names else 'local')
+        self.backend_selector.blockSignals(False)
+        if self.backend_selector.currentText() != current:
+            self.backend_changed(self.backend_selector.currentText())
+
+    def connect_backend(self, backend):
+        r"""
+        Open, in the background, the persistent ssh connection used for a remote backend
+        """
+        if ssh_pool() is None or not backend or backend not in self.project.backend_names():
+            return
+        host = self.project.backend_get(backend, 'host')
+        if host and host != 'localhost':
+            self.thread_executor.submit(ssh_pool().ensure, host)
+
+    def follow_remote_output(self):
+        r"""
+        For a job running on a remote backend, fetch the output appended since the last call, and show it
+        """
+        if self.remote_output_future is not None:
+            if not self.remote_output_future.done():
+                return
+            for suffix, (offset, data) in self.remote_output_future.result().items():
+                if suffix in self.output_panes and self.output_panes[suffix].filename == self.project.filename(
+                        suffix, run=0):
+                    self.output_panes[suffix].append(offset, data)
+            self.remote_output_future = None
+        if self.project.status not in ['running', 'waiting']:
+            self.remote_output_follower = None
+            return
+        backend = self.project.property_get('backend')
+        backend = backend['backend'] if backend else 'local'
+        host = self.project.backend_get(backend, 'host') if backend in self.project.backend_names() else None
+        if not host or host == 'localhost':
+            return
+        run_directory = self.project.filename('', '', run=0)
+        if self.remote_output_follower is None or self.remote_output_follower.run_directory != run_directory:
+            self.remote_output_follower = RemoteOutputFollower(
+                host, self.project.backend_get(backend, 'cache'), run_directory,
+                pathlib.Path(self.project.filename(run=0)).stem,
+                compress='remote_fetch_compress' in settings and bool(int(settings['remote_fetch_compress'])))
+        offsets = {suffix: pane.position for suffix, pane in self.output_panes.items() if
+                   pane.filename == self.project.filename(suffix, run=0)}  # fetch only what is not yet shown
+        self.remote_output_future = self.thread_executor.submit(self.remote_output_follower.poll, offsets)
 
     def setup_menubar(self):
         menubar = MenuBar(self)
@@ -343,6 +464,8 @@ class ProjectWindow(QMainWindow):
         menubar.addAction('Settings', 'Edit',
                           lambda arg, parent=self: settings_edit(parent, {'orbital_transparency': self.restart_vods}),
                           tooltip='Edit settings')
+        menubar.addAction('Refresh shell PATH', 'Edit', refresh_login_path,
+                          tooltip='Find again the PATH set by the login shell, for example after installing software')
         menubar.addSeparator('Edit')
         menubar.addAction('Structure', 'Edit', self.edit_input_structure, 'Ctrl+D', 'Edit molecular geometry')
         menubar.addAction('Cut', 'Edit', self.input_pane.cut, 'Ctrl+X', 'Cut')
@@ -390,6 +513,15 @@ class ProjectWindow(QMainWindow):
         self.old_output_menu = OldOutputMenu(self)
         menubar.addSubmenu(self.old_output_menu, 'View')
         menubar.addSeparator('View')
+        menubar.addAction('Find in output', 'View', self.find_in_output, 'Ctrl+F',
+                          'Highlight all occurrences of text in the current output tab, and go to the next')
+        menubar.addAction('Find next in output', 'View', lambda: self.find_in_output(again=True), 'F3',
+                          'Go to the next occurrence of the text last searched for')
+        menubar.addSeparator('View')
+        self.convergence_action = menubar.addAction('Convergence plot', 'View', self.show_convergence_panel,
+                                                    tooltip='Plot the convergence of the iterations of the job as it runs',
+                                                    checkable=True)
+        menubar.addSeparator('View')
         menubar.addAction('Job stdout', 'View', lambda: self.add_output_tab(0, 'stdout', name='stdout'))
         menubar.addAction('Job stderr', 'View', lambda: self.add_output_tab(0, 'stderr', name='stderr'))
 
@@ -397,6 +529,8 @@ class ProjectWindow(QMainWindow):
         self.run_force_action = menubar.addAction('Run (force)', 'Job', self.run_force, 'Ctrl+Shift+R',
                                                   'Run Molpro on the project input, even if the input has not changed since the last run')
         self.kill_action = menubar.addAction('Kill', 'Job', self.kill, tooltip='Kill the running job')
+        menubar.addAction('Local pool priority', 'Job', self.edit_pool_priority,
+                          tooltip='Set the priority of the project in the queue of local pool backends')
         menubar.addAction('Backend', 'Job', lambda: configure_backend(self), 'Ctrl+B', 'Configure backend')
         menubar.addAction('Edit backend configuration file', 'Job', self.edit_backend_configuration, 'Ctrl+Shift+B',
                           'Edit backend configuration file')
@@ -410,8 +544,7 @@ class ProjectWindow(QMainWindow):
         menubar.show()
 
     def edit_backend_configuration(self):
-        self.backend_configuration_editor = BackendConfigurationEditor(
-            str(pathlib.Path.home() / '.sjef/molpro/backends.xml'), self)
+        self.backend_configuration_editor = BackendConfigurationEditor(backend_registry().file, self)
         self.backend_configuration_editor.exec()
 
     def edit_input_structure(self):
@@ -464,6 +597,21 @@ class ProjectWindow(QMainWindow):
             if self.output_tabs.tabText(i) == tab_name:
                 self.output_tabs.setCurrentIndex(i)
 
+    def find_in_output(self, again=False):
+        pane = self.output_tabs.currentWidget()
+        if not isinstance(pane, ViewFile):
+            return
+        if not again or not self.output_search:
+            text, ok = QInputDialog.getText(self, 'Find in output',
+                                            'Text to find (start with \\v for a regular expression):',
+                                            text=self.output_search)
+            if not ok:
+                return
+            self.output_search = text
+        regex = self.output_search.startswith('\\v')
+        if not pane.find(self.output_search[2:] if regex else self.output_search, regex) and self.output_search:
+            QApplication.beep()
+
     def guided_toggle(self):
         logger.debug('guided_toggle')
         index = 1 if self.guided_action.isChecked() else 0
@@ -508,8 +656,12 @@ class ProjectWindow(QMainWindow):
     def guided_possible(self):
         input_text = self.input_pane.toPlainText()
         if not input_text: input_text = ''
+        cached = self.guided_possible_cache
+        if cached is not None and cached[0] == input_text:
+            return cached[1]
         input_specification = InputSpecification(input_text, directory=self.project.filename())
         guided = len(input_specification) and molpro_input.equivalent(input_text, input_specification)
+        self.guided_possible_cache = (input_text, guided)
         return guided
 
     def input_tab_changed_consequence(self, index=0):
@@ -578,16 +730,44 @@ class ProjectWindow(QMainWindow):
                 if text.replace(' orbitals', '') == molpro_input.orbital_types[typ]['text']:
                     self.visualise_output(external_path, '', self.project.filename('molden', typ, run=0))
 
+    def vod_artifacts(self):
+        r"""
+        A signature of the files that the structure and orbital views are made from: whether the output is complete,
+        and the geometry and molden files, with their sizes and modification times
+        """
+
+        def stat(file):
+            try:
+                stat_ = os.stat(file)
+                return stat_.st_mtime_ns, stat_.st_size
+            except OSError:
+                return None
+
+        xml_file = self.project.filename('xml')
+        return (xml_file, self.project.status == 'completed' or xml_complete(xml_file),
+                tuple((f, stat(self.project.filename('', f, run=-1))) for t, f in self.geometry_files()),
+                tuple((f, stat(self.project.filename('', f, run=0))) for t, f in self.putfiles()))
+
+    def schedule_rebuild_vod_selector(self):
+        r"""
+        Rebuild the structure and orbital views if the files they are made from have changed, checking at most once
+        per interval however often this is called
+        """
+        self.wait_to_rebuild_vod_selector(self.vod_coalescer.trigger())
+
+    def wait_to_rebuild_vod_selector(self, wait):
+        if wait is not None and not self.rebuild_vod_selector_timer.isActive():
+            self.rebuild_vod_selector_timer.start(int(wait * 1000) + 1)
+
     def rebuild_vod_selector(self):
         logger.debug('rebuild_vod_selector')
+        self.rebuild_vod_selector_timer.stop()
+        self.vod_coalescer.record()
         self.vods.clear()
         for t, f in self.geometry_files():
             self.vod_selector_action('Edit ' + f)
         self.vod_selector_action('Initial structure')
-        if self.project.status == 'completed' or (
-                os.path.isfile(self.project.filename('xml')) and open(self.project.filename('xml'),
-                                                                      'r').read().rstrip()[
-                                                                 -9:] == '</molpro>'):
+        if self.project.status == 'completed' or xml_complete(self.project.filename('xml')):
             self.vod_selector_action('Final structure')
             for t, f in self.putfiles():
                 if f.replace('.molden', '') in molpro_input.orbital_types:
@@ -638,7 +818,14 @@ class ProjectWindow(QMainWindow):
                 del self.vods[vod]
         self.refresh_output_tabs()
         try:
-            self.project.run(force=force)
+            backend = self.project.property_get('backend')
+            backend = backend['backend'] if backend else 'local'
+            if is_pool_backend(backend_registry().get(backend)):
+                local_pool().submit(self.project.filename(run=-1), backend, priority=self.pool_priority, force=force,
+                                    callback=self.pool_launch_finished.emit)
+            else:
+                job_submitter().submit(self.project, 'run', self.job_operation_finished.emit, force=force)
+                self.statusBar.refresh()
         except Exception as e:
             QMessageBox.critical(self, 'Job submission failed', 'Cannot submit job:\n' + str(e))
             return False
@@ -650,10 +837,45 @@ class ProjectWindow(QMainWindow):
         self.run(force=True)
 
     def kill(self):
-        self.project.kill()
+        if not local_pool().cancel(self.project.filename(run=-1)) and not job_submitter().cancel(
+                self.project.filename(run=-1)):
+            job_submitter().submit(self.project, 'kill', self.job_operation_finished.emit)
+        self.statusBar.refresh()
+
+    def job_operation_done(self, operation, error):
+        r"""
+        Report the outcome of a run, kill or clean carried out by the job submitter
+        """
+        self.statusBar.refresh()
+        if error is not None:
+            titles = {'run': 'Job submission failed', 'kill': 'Kill failed', 'clean': 'Clean failed'}
+            QMessageBox.critical(self, titles.get(operation.name, 'Error'),
+                                 'Cannot ' + operation.name + ' job:\n' + str(error))
+
+    def pool_launch_done(self, filename, error):
+        r"""
+        Report the outcome of launching a job queued in the local pool
+        """
+        self.statusBar.refresh()
+        if error is not None:
+            QMessageBox.critical(self, 'Job submission failed', 'Cannot launch job from the local pool:\n' + str(error))
+
+    @property
+    def pool_priority(self):
+        priority = self.project.property_get('pool_priority')
+        return int(priority['pool_priority']) if priority and priority['pool_priority'] else 0
+
+    def edit_pool_priority(self):
+        priority, ok = QInputDialog.getInt(self, 'Local pool priority',
+                                           'Priority in the local pool queue (higher priority runs first):',
+                                           self.pool_priority)
+        if ok:
+            self.project.property_set({'pool_priority': str(priority)})
+            local_pool().reprioritise(self.project.filename(run=-1), priority)
 
     def clean(self):
-        self.project.clean()
+        job_submitter().submit(self.project, 'clean', self.job_operation_finished.emit)
+        self.statusBar.refresh()
 
     def visualise_output(self, external_path=None, typ='xml', name=None):
         filename = self.project.filename(typ, name) if name else self.project.filename(typ)
@@ -957,6 +1179,7 @@ Jmol.jmolHtml("</p>")
             self.embedded_vod(xyz_file, command='', title='initial structure')
 
     def closeEvent(self, a0, QCloseEvent=None):
+        backend_registry().unsubscribe(self.refresh_backend_selector)
         self.close_signal.emit(self)
 
     def new_action(self):
@@ -1014,6 +1237,7 @@ Jmol.jmolHtml("</p>")
                     self.output_tabs.setCurrentIndex(i)
 
     def database_import_structure(self):
+        from database import database_choose_structure
         if filename := database_choose_structure():
             self.adopt_structure_file(filename)
             os.remove(filename)
@@ -1195,6 +1419,7 @@ class BasisAndHamiltonianChooser(QWidget):
         self.parent = parent
 
         self.basis_registry = self.parent.project.basis_registry()
+        self.basis_index = basis_index(self.basis_registry)
         self.desired_basis_quality = self.parent.input_specification.basis_quality
 
         self.combo_hamiltonian = QComboBox(self)
@@ -1225,21 +1450,10 @@ class BasisAndHamiltonianChooser(QWidget):
 
             core_correlation = self.input_specification[
                 'core_correlation'] if 'core_correlation' in self.input_specification else 'large'
-            possible_basis_sets = [k for k in self.basis_registry.keys() if (  # True or
-                    self.desired_basis_quality == 0 or self.basis_registry[k][
-                'quality'] == self.basis_qualities[self.desired_basis_quality]
-            )
-                                   and (
-                                           not 'hamiltonian' in self.input_specification or
-                                           self.hamiltonian_type(k) == self.input_specification[
-                                               'hamiltonian']
-                                   )
-                                   and (
-                                           core_correlation == 'mixed'
-                                           or (core_correlation == 'small' and 'CV' in k)
-                                           or core_correlation == 'large'
-                                   )
-                                   ]
+            possible_basis_sets = self.basis_index.select(
+                self.basis_qualities[self.desired_basis_quality] if self.desired_basis_quality else None,
+                self.input_specification['hamiltonian'] if 'hamiltonian' in self.input_specification else None,
+                core_correlation)
             self.basis_selector.reload(self.input_specification['basis'], possible_basis_sets)
             self.basis_selector.show()
 
@@ -1252,16 +1466,18 @@ class BasisAndHamiltonianChooser(QWidget):
         new_hamiltonian_ = list(molpro_input.hamiltonians.keys())[
             [v['text'] for v in molpro_input.hamiltonians.values()].index(text)]
         if self.input_specification['hamiltonian'] != new_hamiltonian_:
-            self.input_specification['hamiltonian'] = new_hamiltonian_
-            if 'basis' in self.input_specification and 'default' in self.input_specification['basis']:
-                self.input_specification['basis'] = self.default_basis_for_hamiltonian(self.desired_basis_quality)
-            self.write()
-            self.refresh()
+            with self.parent.batch_update():
+                self.input_specification['hamiltonian'] = new_hamiltonian_
+                if 'basis' in self.input_specification and 'default' in self.input_specification['basis']:
+                    self.input_specification['basis'] = self.default_basis_for_hamiltonian(self.desired_basis_quality)
+                self.write()
+                self.refresh()
 
     def changed_basis_quality(self, text):
         if self.desired_basis_quality != self.basis_qualities.index(text):
-            self.desired_basis_quality = self.basis_qualities.index(text)
-            self.refresh()
+            with self.parent.batch_update():
+                self.desired_basis_quality = self.basis_qualities.index(text)
+                self.refresh()
 
     def default_basis_for_hamiltonian(self, desired_basis_quality=0):
         quality = self.desired_basis_quality if desired_basis_quality > 0 else 3
@@ -1275,9 +1491,10 @@ class BasisAndHamiltonianChooser(QWidget):
                 spec['default'] != self.null_prompt and
                 spec['default'] != '' and
                 spec != self.input_specification['basis']):
-            self.input_specification['basis'] = copy.deepcopy(spec)
-            self.input_specification['basis']['quality'] = self.input_specification.basis_quality
-            self.write()
+            with self.parent.batch_update():
+                self.input_specification['basis'] = copy.deepcopy(spec)
+                self.input_specification['basis']['quality'] = self.input_specification.basis_quality
+                self.write()
 
     def write(self):
         self.parent.refresh_input_from_specification()
@@ -1288,14 +1505,10 @@ class BasisAndHamiltonianChooser(QWidget):
 
     @property
     def hamiltonians(self):
-        result = set()
-        for keyfound in self.basis_registry.keys():
-            if keyfound is not None:
-                result.add(self.hamiltonian_type(keyfound))
-        return result
+        return set(self.basis_index.hamiltonians)
 
     def hamiltonian_type(self, key):
-        return re.sub(r'\(.*', '', self.basis_registry[key]['type'])
+        return self.basis_index.hamiltonian[key]
 
 
 class GuidedPane(QWidget):
@@ -1308,6 +1521,8 @@ class GuidedPane(QWidget):
         self.input_pane = self.parent.input_pane
         self.setContentsMargins(0, 0, 0, 0)
         self.method_asserted = False
+        self.updating = False
+        self.input_stale = False
 
         self.guided_layout = QVBoxLayout()
         self.guided_layout.setContentsMargins(0, 0, 0, 0)
@@ -1410,7 +1625,42 @@ class GuidedPane(QWidget):
     def input_specification(self):
         return self.parent.input_specification
 
+    def signalling_widgets(self):
+        chooser = self.basis_and_hamiltonian_chooser
+        return [self.guided_combo_orientation, self.charge_line, self.spin_line, self.guided_combo_wave_fct_symm,
+                self.guided_combo_job_type, self.guided_combo_method, self.guided_combo_functional,
+                self.guided_combo_core_correlation, self.checkbox_df, self.step_options_combo,
+                self.guided_orbitals_input, self.guided_orbitals_input.model(), self.combo_properties,
+                self.combo_properties.model(), chooser.combo_hamiltonian, chooser.guided_combo_basis_quality,
+                chooser.basis_selector.element_selector, chooser.basis_selector.code_selector]
+
+    @contextlib.contextmanager
+    def batch_update(self):
+        r"""
+        Group the changes to the specification made for one user action. While the widgets are brought up to date
+        their signals are blocked, so that they do not act again on the specification, and the input is regenerated
+        and written to the editor just once, at the end.
+        """
+        if self.updating:
+            yield
+            return
+        self.updating = True
+        blocked = [(widget, widget.blockSignals(True)) for widget in self.signalling_widgets()]
+        try:
+            yield
+        finally:
+            for widget, was_blocked in blocked:
+                widget.blockSignals(was_blocked)
+            self.updating = False
+        if self.input_stale:
+            self.input_stale = False
+            self.write_input()
+
     def refresh(self):
+        with self.batch_update():
+            self.refresh_widgets()
+
+    def refresh_widgets(self):
         self.guided_combo_orientation.setCurrentText(
             self.input_specification['orientation'] if 'orientation' in self.input_specification else
             list(molpro_input.orientation_options.keys())[0])
@@ -1505,47 +1755,58 @@ class GuidedPane(QWidget):
         if value is None or (
                 key in self.input_specification and str(self.input_specification[key]).lower() == str(value).lower()):
             return
-        if key == 'method':
-            self.input_specification.method = value
-            self.method_changed_signal.emit(value)
-            if self.parent.initialised_from_input:
-                self.method_asserted = True
-            self.input_specification.polish()
-        elif key == 'job_type':
-            self.input_specification.job_type = value
-        elif key == 'density_functional':
-            self.input_specification.density_functional = value
-        else:
-            self.input_specification[key] = value
-        self.refresh_input_from_specification()
-        self.refresh()
+        with self.batch_update():
+            if key == 'method':
+                self.input_specification.method = value
+                self.method_changed_signal.emit(value)
+                if self.parent.initialised_from_input:
+                    self.method_asserted = True
+                self.input_specification.polish()
+            elif key == 'job_type':
+                self.input_specification.job_type = value
+            elif key == 'density_functional':
+                self.input_specification.density_functional = value
+            else:
+                self.input_specification[key] = value
+            self.refresh_input_from_specification()
+            self.refresh()
 
     def input_specification_variable_change(self, key, value):
         # print('input_specification_variable_change',key,value)
         value_ = value
-        if 'variables' not in self.input_specification:
-            self.input_specification['variables'] = {}
-        if key == 'charge':
-            if value == '-': return
-            try:
-                old_charge = int(self.input_specification['variables']['charge'])
-            except:
-                old_charge = 0
-            value_ = str(int(value_) if value_.isdigit() else value_ if value_ else '0')
-            if int(value_) != old_charge:
-                self.input_specification.spin = None
-        self.input_specification['variables'][key] = value_
-        if key == 'charge':
-            self.refresh()
-        if key == 'spin':
-            if value_:
-                self.input_specification.spin = value_
-            else:
-                self.input_specification.spin = None
-        self.refresh_input_from_specification()
+        if key == 'charge' and value == '-': return
+        with self.batch_update():
+            if 'variables' not in self.input_specification:
+                self.input_specification['variables'] = {}
+            if key == 'charge':
+                try:
+                    old_charge = int(self.input_specification['variables']['charge'])
+                except:
+                    old_charge = 0
+                value_ = str(int(value_) if value_.isdigit() else value_ if value_ else '0')
+                if int(value_) != old_charge:
+                    self.input_specification.spin = None
+            self.input_specification['variables'][key] = value_
+            if key == 'charge':
+                self.refresh()
+            if key == 'spin':
+                if value_:
+                    self.input_specification.spin = value_
+                else:
+                    self.input_specification.spin = None
+            self.refresh_input_from_specification()
 
     def refresh_input_from_specification(self):
-        logger.debug('refresh_input_from_specification')
+        r"""
+        Write the input generated from the specification to the editor, or, during an update, when the update ends
+        """
+        if self.updating:
+            self.input_stale = True
+        else:
+            self.write_input()
+
+    def write_input(self):
+        logger.debug('write_input')
         if not self.parent.guided_possible(): return
         new_input = self.input_specification.input()
         if not molpro_input.equivalent(self.input_pane.toPlainText(), new_input):
@@ -1561,8 +1822,9 @@ class GuidedPane(QWidget):
             help_uri='https://www.molpro.net/manual/doku.php?id=program_control&s[]=gthresh#global_thresholds_gthresh')
         result = box.exec()
         if result is not None:
-            self.parent.input_specification['thresholds'] = result
-            self.refresh_input_from_specification()
+            with self.batch_update():
+                self.parent.input_specification['thresholds'] = result
+                self.refresh_input_from_specification()
 
     def print_edit(self, flag):
         available_options = [
@@ -1589,8 +1851,9 @@ class GuidedPane(QWidget):
             help_uri='https://www.molpro.net/manual/doku.php?id=program_control#global_print_options_gprint_nogprint')
         result = box.exec()
         if result is not None:
-            self.parent.input_specification['prints'] = result
-            self.refresh_input_from_specification()
+            with self.batch_update():
+                self.parent.input_specification['prints'] = result
+                self.refresh_input_from_specification()
 
     def step_options_edit(self, step: int):
         if step < 0: return
@@ -1605,9 +1868,10 @@ class GuidedPane(QWidget):
                             help_uri='https://www.molpro.net/manual/doku.php?q=' + method_ + '&do=search')
         result = box.exec()
         if result is not None:
-            self.parent.input_specification['steps'][step]['options'] = [k + '=' + v if v else k for k, v in
-                                                                         result.items()]
-            self.refresh_input_from_specification()
+            with self.batch_update():
+                self.parent.input_specification['steps'][step]['options'] = [k + '=' + v if v else k for k, v in
+                                                                             result.items()]
+                self.refresh_input_from_specification()
         self.step_options_combo.setCurrentIndex(0)
 
 
@@ -1679,11 +1943,12 @@ class OrbitalInput(CheckableComboBox):
         self.updateText()
 
     def action(self, text):
-        self.parent.input_specification['orbitals'] = [k for k, v in molpro_input.orbital_types.items() for t in
-                                                       self.currentData() if t == v['text']]
-        if any([b in self.parent.input_specification['orbitals'] for b in ['nbo', 'ibo']]):
-            self.parent.input_specification_change('wave_fct_symm', 'No Symmetry')
-        self.parent.refresh_input_from_specification()
+        with self.parent.batch_update():
+            self.parent.input_specification['orbitals'] = [k for k, v in molpro_input.orbital_types.items() for t in
+                                                           self.currentData() if t == v['text']]
+            if any([b in self.parent.input_specification['orbitals'] for b in ['nbo', 'ibo']]):
+                self.parent.input_specification_change('wave_fct_symm', 'No Symmetry')
+            self.parent.refresh_input_from_specification()
 
 
 class PropertyInput(CheckableComboBox):
@@ -1703,10 +1968,11 @@ class PropertyInput(CheckableComboBox):
         self.model().dataChanged.connect(self.refresh)
 
     def refresh(self, text):
-        self.parent.input_specification['properties'] = [k for k, v in molpro_input.properties.items() for t in
-                                                         self.currentData() if t == k]
-        self.parent.input_specification.polish()
-        self.parent.refresh_input_from_specification()
+        with self.parent.batch_update():
+            self.parent.input_specification['properties'] = [k for k, v in molpro_input.properties.items() for t in
+                                                             self.currentData() if t == k]
+            self.parent.input_specification.polish()
+            self.parent.refresh_input_from_specification()
 
 
 class ChargeSelector(QWidget):
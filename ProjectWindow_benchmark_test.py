@@ -0,0 +1,330 @@
+r"""
+Performance benchmarks for the periodic refresh paths of the project window, run without a display.
+
+Each ``ProjectWindow`` is built against a synthetic project bundle, with a large output and many runs, through a fake
+in place of ``pymolpro.Project`` that answers from the bundle without running Molpro. Measured are
+
+- the time of ``ViewFile.refresh``, ``ProjectWindow.refresh_output_tabs``, ``embedded_vod``, ``restart_vods`` and
+  ``StatusBar.refresh``, with pytest-benchmark;
+- the latency of the event loop, ie how late a zero-length timer fires, while windows are open;
+- the CPU time spent by the windows' timers in each second that nothing happens;
+- the memory taken by each open window.
+
+The limits on the last three can be set with GUI_BENCHMARK_LATENCY (seconds, default 0.05),
+GUI_BENCHMARK_IDLE_CPU (CPU seconds per idle second per window, default 0.05) and GUI_BENCHMARK_MEMORY (megabytes per
+window, default 200). The sizes of the synthetic projects can be set with GUI_BENCHMARK_OUTPUT_LINES (default 200000)
+and GUI_BENCHMARK_RUNS (default 50).
+
+The benchmarks take minutes, so they are run only when GUI_BENCHMARK is set, eg ``GUI_BENCHMARK=1 pytest
+ProjectWindow_benchmark_test.py``.
+"""
+import os
+import pathlib
+import statistics
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('QTWEBENGINE_CHROMIUM_FLAGS', '--no-sandbox')
+
+import pytest
+
+if not os.environ.get('GUI_BENCHMARK'):
+    pytest.skip('GUI benchmarks are run only when GUI_BENCHMARK is set', allow_module_level=True)
+pytest.importorskip('pytestqt')
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('pymolpro')
+try:
+    import PyQt5.QtWebEngineWidgets  # the module can exist without the shared libraries that it needs
+except ImportError as e:
+    pytest.skip('QtWebEngine cannot be loaded: ' + str(e), allow_module_level=True)
+
+from PyQt5.QtCore import QTimer
+
+import ProjectWindow
+import settings
+
+latency_limit = float(os.environ.get('GUI_BENCHMARK_LATENCY', '0.05'))
+idle_cpu_limit = float(os.environ.get('GUI_BENCHMARK_IDLE_CPU', '0.05'))
+memory_limit = float(os.environ.get('GUI_BENCHMARK_MEMORY', '200'))
+output_lines = int(os.environ.get('GUI_BENCHMARK_OUTPUT_LINES', '200000'))
+runs = int(os.environ.get('GUI_BENCHMARK_RUNS', '50'))
+
+status_codes = {'unknown': 0, 'running': 1, 'waiting': 2, 'completed': 3, 'unevaluated': 4, 'killed': 5}
+
+geometry = """3
+water
+O 0.000000 0.000000 0.117790
+H 0.000000 0.755453 -0.471161
+H 0.000000 -0.755453 -0.471161
+"""
+
+xml = """<?xml version="1.0"?>
+<molpro xmlns="http://www.molpro.net/schema/molpro-output" xmlns:cml="http://www.xml-cml.org/schema">
+ <job>
+  <jobstep command="RHF-SCF">
+   <cml:molecule>
+    <cml:atomArray>
+     <cml:atom id="a1" elementType="O" x3="0.0" y3="0.0" z3="0.117790"/>
+     <cml:atom id="a2" elementType="H" x3="0.0" y3="0.755453" z3="-0.471161"/>
+     <cml:atom id="a3" elementType="H" x3="0.0" y3="-0.755453" z3="-0.471161"/>
+    </cml:atomArray>
+    <cml:bondArray>
+     <cml:bond atomRefs2="a1 a2"/>
+     <cml:bond atomRefs2="a1 a3"/>
+    </cml:bondArray>
+   </cml:molecule>
+   <property name="Energy" method="RHF" principal="true" value="-76.0267"/>
+  </jobstep>
+ </job>
+</molpro>
+"""
+
+inp = 'geometry=water.xyz\nbasis=cc-pVTZ\nrhf\n'
+
+
+def synthetic_output(lines):
+    iterations = ' ITER           ETOT              DE          GRAD        DDIFF     DIIS  NEXP   TIME(IT)  TIME(TOT)\n'
+    return ''.join(iterations if i % 1000 == 0 else
+                   '{:5d}  {:20.12f} {:15.8E} {:11.2E} {:11.2E} {:6d} {:5d} {:8.2f} {:9.2f}\n'.format(
+                       i % 1000, -76.0 - 1e-6 * i, 1e-6, 1e-4, 1e-3, 1, 0, 0.01, 0.01 * i)
+                   for i in range(lines))
+
+
+def synthetic_project(directory, output_lines, runs, status='completed'):
+    r"""
+    Write a project bundle in the layout made by sjef, with the given number of run directories, each holding an
+    output of the given number of lines
+
+    :return: The name of the bundle
+    :rtype: str
+    """
+    bundle = pathlib.Path(directory) / 'synthetic.molpro'
+    bundle.mkdir()
+    (bundle / 'synthetic.inp').write_text(inp)
+    (bundle / 'water.xyz').write_text(geometry)
+    output = synthetic_output(output_lines)
+    for run in range(1, runs + 1):
+        run_directory = bundle / 'run' / (str(run) + '.molpro')
+        run_directory.mkdir(parents=True)
+        (run_directory / (str(run) + '.inp')).write_text(inp)
+        (run_directory / 'water.xyz').write_text(geometry)
+        (run_directory / (str(run) + '.out')).write_text(output)
+        (run_directory / (str(run) + '.log')).write_text(output[:len(output) // 10])
+        (run_directory / (str(run) + '.xml')).write_text(xml)
+    (bundle / 'Info.plist').write_text(
+        '<?xml version="1.0"?>\n<plist>\n\t<dict>\n'
+        '\t\t<key>run_directories</key>\n\t\t<string>' + ' '.join(str(run) for run in range(runs, 0, -1)) +
+        ' </string>\n'
+        '\t\t<key>_status</key>\n\t\t<string>' + str(status_codes[status]) + '</string>\n'
+        '\t\t<key>backend</key>\n\t\t<string>local</string>\n'
+        '\t</dict>\n</plist>\n')
+    return str(bundle)
+
+
+class FakeProject:
+    r"""
+    The parts of ``pymolpro.Project`` used by the project window, answered from a bundle made by
+    :func:`synthetic_project`. Jobs are never started; ``run``, ``kill`` and ``clean`` are only counted.
+    """
+
+    def __init__(self, filename):
+        self.bundle = pathlib.Path(filename)
+        self.name = self.bundle.stem
+        self.status = 'completed'
+        self.properties = {'backend': 'local'}
+        self.calls = {'run': 0, 'kill': 0, 'clean': 0}
+        self.runs = len(list((self.bundle / 'run').glob('*.molpro')))
+        self.out = True
+
+    def filename(self, suffix='', name='', run=0):
+        if run == -1 or (run == 0 and not self.runs):
+            directory = self.bundle
+            stem = self.name
+        else:
+            run_ = self.runs if run == 0 else min(run, self.runs)
+            directory = self.bundle / 'run' / (str(run_) + '.molpro')
+            stem = str(run_)
+        if not suffix and not name:
+            return str(directory)
+        return str(directory / ((name if name else stem) + ('.' + suffix if suffix else '')))
+
+    def property_get(self, key):
+        if key == 'run_directories':
+            return {key: ' '.join(str(run) for run in range(self.runs, 0, -1))}
+        return {key: self.properties[key]} if key in self.properties else {}
+
+    def property_set(self, properties):
+        self.properties.update(properties)
+
+    def backend_names(self):
+        return ['local']
+
+    def backend_get(self, backend, key):
+        return {'name': 'local', 'host': 'localhost', 'run_command': 'molpro', 'cache': ''}.get(key, '')
+
+    def backend_parameters(self, backend, doc=False):
+        return {}
+
+    def refresh_backends(self):
+        pass
+
+    def run_needed(self):
+        return False
+
+    def registry(self, name):
+        if name == 'dfunc':
+            return {'B3LYP': {'priority': 5}, 'PBE': {'priority': 4}}
+        return {}
+
+    def procedures_registry(self):
+        return {name: {'class': 'PROG', 'name': name} for name in ['RHF', 'UHF', 'RKS', 'UKS', 'CCSD', 'OPTG']}
+
+    def basis_registry(self):
+        return {basis: {'quality': quality, 'type': 'ORBITAL'} for basis, quality in
+                [('cc-pVDZ', 'DZ'), ('cc-pVTZ', 'TZ'), ('cc-pVQZ', 'QZ'), ('cc-pV(T+d)Z', 'TZ')]}
+
+    def xpath_search(self, *args, **kwargs):
+        return []
+
+    def geometry(self, *args, **kwargs):
+        return []
+
+    def run(self, *args, **kwargs):
+        self.calls['run'] += 1
+
+    def kill(self, *args, **kwargs):
+        self.calls['kill'] += 1
+
+    def clean(self, *args, **kwargs):
+        self.calls['clean'] += 1
+
+
+def resident_memory():
+    r"""
+    :return: The resident memory of the process, in bytes, or None where it cannot be found
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def event_loop_latencies(qtbot, duration=1.0):
+    r"""
+    Post zero-length timers one after another for the given time, and record how late each one fires
+
+    :return: The delays, in seconds
+    :rtype: list
+    """
+    delays = []
+    end = time.perf_counter() + duration
+
+    def post():
+        if time.perf_counter() < end:
+            posted = time.perf_counter()
+            QTimer.singleShot(0, lambda: (delays.append(time.perf_counter() - posted), post()))
+
+    post()
+    qtbot.wait(int(duration * 1000) + 100)
+    return delays
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.settings, 'filename', str(tmp_path / 'iMolpro.settings.json'))
+    monkeypatch.setattr(ProjectWindow, 'Project', FakeProject)
+
+
+@pytest.fixture(scope='module')
+def project_directory(tmp_path_factory):
+    return synthetic_project(tmp_path_factory.mktemp('projects'), output_lines, runs)
+
+
+def open_window(qtbot, project_directory):
+    window = ProjectWindow.ProjectWindow(project_directory, None)
+    qtbot.addWidget(window)
+    window.show()
+    qtbot.waitExposed(window)
+    return window
+
+
+@pytest.fixture
+def window(qtbot, project_directory):
+    return open_window(qtbot, project_directory)
+
+
+def view_file_refresh(window):
+    pane = window.output_panes['out']
+    pane.position = 0
+    pane.modtime = 0.0
+    pane.refresh()
+
+
+refresh_paths = {
+    'ViewFile.refresh': view_file_refresh,
+    'ViewFile.refresh unchanged': lambda window: window.output_panes['out'].refresh(),
+    'refresh_output_tabs': lambda window: window.refresh_output_tabs(),
+    'refresh_output_tabs force': lambda window: window.refresh_output_tabs(force=True),
+    'embedded_vod': lambda window: window.embedded_vod(window.project.filename('xyz', 'water', run=0),
+                                                       command='', title='benchmark'),
+    'restart_vods': lambda window: window.restart_vods(),
+    'StatusBar.refresh': lambda window: window.statusBar.refresh(),
+}
+
+
+@pytest.mark.parametrize('path', list(refresh_paths.keys()))
+def test_refresh_path(benchmark, window, path):
+    benchmark.group = 'refresh'
+    benchmark(refresh_paths[path], window)
+
+
+@pytest.mark.parametrize('windows', [1, 4])
+def test_event_loop_latency(qtbot, project_directory, windows):
+    for i in range(windows):
+        open_window(qtbot, project_directory)
+    qtbot.wait(500)
+    delays = event_loop_latencies(qtbot, duration=3.0)
+    assert delays
+    median = statistics.median(delays)
+    print('event loop latency with {} windows: median {:.4f} s, maximum {:.4f} s'.format(windows, median,
+                                                                                        max(delays)))
+    assert median <= latency_limit, ('median event loop latency ' + str(median) + ' s with ' + str(windows) +
+                                     ' windows exceeds ' + str(latency_limit) + ' s')
+
+
+@pytest.mark.parametrize('windows', [1, 4])
+def test_idle_timer_cpu(qtbot, project_directory, windows):
+    for i in range(windows):
+        open_window(qtbot, project_directory)
+    qtbot.wait(2500)  # let the first round of every timer pass
+    duration = 5.0
+    start = time.process_time()
+    qtbot.wait(int(duration * 1000))
+    cpu = (time.process_time() - start) / duration / windows
+    print('idle timer cpu with {} windows: {:.4f} s per second per window'.format(windows, cpu))
+    assert cpu <= idle_cpu_limit, ('timers take ' + str(cpu) + ' s of CPU per idle second per window, more than ' +
+                                   str(idle_cpu_limit))
+
+
+def test_memory_per_window(qtbot, project_directory):
+    open_window(qtbot, project_directory)  # pay for the one-off costs before measuring
+    qtbot.wait(500)
+    windows = 4
+    resident = resident_memory()
+    tracemalloc.start()
+    try:
+        for i in range(windows):
+            open_window(qtbot, project_directory)
+        qtbot.wait(500)
+        python = tracemalloc.get_traced_memory()[0] / windows
+    finally:
+        tracemalloc.stop()
+    print('python memory per window: {:.1f} MB'.format(python / 1e6))
+    if resident is not None:
+        per_window = (resident_memory() - resident) / windows
+        print('resident memory per window: {:.1f} MB'.format(per_window / 1e6))
+        assert per_window <= memory_limit * 1e6, ('each window takes ' + str(per_window / 1e6) +
+                                                  ' MB, more than ' + str(memory_limit))
+    assert python <= memory_limit * 1e6
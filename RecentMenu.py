@@ -1,9 +1,10 @@
 import os
 import platform
 
-import pymolpro
 from PyQt5.QtWidgets import QMenu, QAction
 
+from recent_projects import recent_projects_index
+
 
 class RecentMenuAction(QAction):
     def __init__(self, parent, window_manager, filename: str):
@@ -26,16 +27,29 @@ class RecentMenu(QMenu):
         self.setTitle('Recent projects')
         self.recentProjects = []
         self.windowManager = window_manager
+        self.aboutToShow.connect(self.show_availability)
         self.refresh()
 
     def refresh(self, max_items=9):
         self.recentProjects.clear()
         self.clear()
-        for i in range(1, max_items+1):
-            f = pymolpro.recent_project('molpro', i)
+        for i, f in enumerate(recent_projects_index().projects(max_items), 1):
             if f:
                 action = RecentMenuAction(self, self.windowManager, f)
                 self.recentProjects.append((f, action))
                 self.addAction(action)
                 if i < 10:
                     action.setShortcut('Ctrl+' + str(i))
+        self.show_availability()
+
+    def show_availability(self):
+        r"""
+        Hide the entries for projects that the background checks have found to be missing, and disable those not
+        responding
+        """
+        index = recent_projects_index()
+        index.poll()
+        for f, action in self.recentProjects:
+            summary = index.summary(f)
+            action.setEnabled(summary is None or (summary.get('exists', True) and summary.get('available', True)))
+            action.setVisible(not index.missing(f))
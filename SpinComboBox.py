@@ -18,6 +18,7 @@ class SpinComboBox(QComboBox):
                 self.labels.append('S=' + str(_spin_2) + '/2')
             else:
                 self.labels.append('S=' + str(_spin_2 // 2))
+        self.currentTextChanged.connect(self.on_text_changed)
         # if initial_spin_2 is not None:
         self.refresh(initial_spin_2)
 
@@ -38,7 +39,6 @@ class SpinComboBox(QComboBox):
             self.setCurrentText(self.labels[initial_spin_2] if initial_spin_2 < len(self.labels) else self.other_label)
         else:
             self.setCurrentText(self.auto_label)
-        self.currentTextChanged.connect(self.on_text_changed)
         self.initialising = False
 
     def on_text_changed(self, text):
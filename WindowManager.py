@@ -1,16 +1,25 @@
+import importlib
+import logging
 import os
 import shutil
+import sys
+import time
 
-from PyQt5.QtWidgets import QWidget, QFileDialog, QMessageBox
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QWidget, QFileDialog, QMessageBox, QApplication
 from utilities import force_suffix
 from settings import settings
 
+logger = logging.getLogger(__name__)
+
 
 class WindowManager:
     def __init__(self):
         self.openWindows = []
         self.emptyAction = None
         self.fullAction = None
+        self.opening = False
+        self.preload_modules = ['PyQt5.QtWebEngineWidgets', 'pymolpro', 'ProjectWindow']
 
     def register(self, widget: QWidget):
         if widget is None or (hasattr(widget, 'invalid') and widget.invalid):
@@ -38,7 +47,48 @@ class WindowManager:
     def set_full_action(self, fun):
         self.fullAction = fun
 
+    def preload(self):
+        r"""
+        Import the project window and the web engine while the application is otherwise idle, so that the first
+        project opens quickly without their cost being paid before the Chooser is shown.
+
+        The heaviest modules are imported one at a time, each in its own turn of the event loop, so that input is
+        handled between them. Each import is timed, and if one blocks the event loop for longer than the setting
+        ``stall_threshold``, a warning is logged and the rest of the preload is abandoned. Nothing is preloaded once a
+        project window is open or being opened, or while a dialog is open.
+        """
+        if 'preload_project_window' in settings and not int(settings['preload_project_window']):
+            return
+        if self.openWindows or self.opening or 'ProjectWindow' in sys.modules:
+            return
+        if QApplication.activeModalWidget() is not None:
+            QTimer.singleShot(1000, self.preload)
+            return
+        module = next((module for module in self.preload_modules if module not in sys.modules), None)
+        if module is None:
+            return
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning('Preloading ' + module + ' failed: ' + str(e))
+            return
+        duration = time.perf_counter() - start
+        threshold = float(settings['stall_threshold']) if 'stall_threshold' in settings else 2.0
+        if duration > threshold:
+            logger.warning('Preloading {} blocked the event loop for {:.2f} s; preload abandoned'.format(module, duration))
+            return
+        logger.debug('Preloaded {} in {:.2f} s'.format(module, duration))
+        QTimer.singleShot(0, self.preload)
+
     def new(self, data):
+        self.opening = True
+        try:
+            self._new(data)
+        finally:
+            self.opening = False
+
+    def _new(self, data):
         from ProjectWindow import ProjectWindow
         _dir = settings['project_directory'] if 'project_directory' in settings else os.path.curdir
         while True:
@@ -1,5 +1,7 @@
 import os
 import pathlib
+import tempfile
+import threading
 
 from lxml import etree
 from PyQt5.QtWidgets import QDialog, QComboBox, QDialogButtonBox, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, \
@@ -8,25 +10,151 @@ from pysjef import Project
 
 import settings
 from help import help_dialog
+from tool_discovery import tool_discovery
+
+
+default_backends_file = str(pathlib.Path.home() / '.sjef/molpro/backends.xml')
+
+
+class BackendRegistry:
+    r"""
+    In-memory model of a backends.xml file, with an index of backends by name.
+
+    The file is parsed again only when it has changed on disk, and is written atomically. Functions that change the
+    file are notified to subscribers, so that the views of it in open windows can be kept consistent.
+    """
+
+    def __init__(self, file=None):
+        self.file = str(file) if file else default_backends_file
+        self.signature = None
+        self.tree = None
+        self.index = {}
+        self.subscribers = []
+        self.lock = threading.RLock()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.file)
+            return stat.st_ino, stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        with self.lock:
+            signature = self._signature()
+            if self.tree is not None and signature == self.signature:
+                return
+            if signature is None:
+                self.tree = etree.ElementTree(etree.Element('backends'))
+            else:
+                self.tree = etree.parse(self.file)
+            self.signature = signature
+            self._reindex()
+
+    def _reindex(self):
+        self.index = {node.get('name'): node for node in self.tree.getroot().iter('backend')}
+
+    def names(self):
+        self.refresh()
+        return list(self.index.keys())
+
+    def __contains__(self, name):
+        self.refresh()
+        return name in self.index
+
+    def get(self, name):
+        r"""
+        :return: The attributes of the backend, or None if it does not exist
+        :rtype: dict
+        """
+        self.refresh()
+        return dict(self.index[name].attrib) if name in self.index else None
+
+    def add(self, attributes: dict):
+        with self.lock:
+            self.refresh()
+            node = etree.SubElement(self.tree.getroot(), 'backend')
+            for field, value in attributes.items():
+                node.set(field, value)
+            self._reindex()
+            self.write()
+
+    def update(self, name, attributes: dict):
+        r"""
+        Change fields of a backend. Fields given an empty value are removed.
+        """
+        with self.lock:
+            self.refresh()
+            node = self.index[name]
+            for field, value in attributes.items():
+                if value:
+                    node.set(field, value)
+                elif node.get(field):
+                    del node.attrib[field]
+            self._reindex()
+            self.write()
+
+    def remove(self, name):
+        with self.lock:
+            self.refresh()
+            node = self.index[name]
+            node.getparent().remove(node)
+            self._reindex()
+            self.write()
+
+    def write(self):
+        with self.lock:
+            directory = os.path.dirname(self.file)
+            os.makedirs(directory, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=directory, prefix='.backends.', suffix='.xml')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    self.tree.write(f, pretty_print=True, xml_declaration=True, encoding='utf-8')
+                os.replace(temporary, self.file)
+            except Exception:
+                os.remove(temporary)
+                raise
+            self.signature = self._signature()
+        for subscriber in list(self.subscribers):
+            subscriber()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+
+_backend_registries = {}
+
+
+def backend_registry(file=None):
+    r"""
+    The registry shared by everything that uses a backends file
+    """
+    file = str(file) if file else default_backends_file
+    if file not in _backend_registries:
+        _backend_registries[file] = BackendRegistry(file)
+    return _backend_registries[file]
 
 
 def sanitise_backends(parent):
     dot_molpro= pathlib.Path(settings.settings.filename).parent
     teaching_molpro_path = dot_molpro / 'teach' / 'bin' / 'molpro'
     teaching_molpro = teaching_molpro_path.exists()
-    regular_molpro = False
-    for path in os.environ['PATH'].split(os.pathsep):
-        regular_molpro = regular_molpro or (pathlib.Path(path) / 'molpro').exists()
+    regular_molpro = tool_discovery().locate('molpro') is not None
     if teaching_molpro:
         name = 'teach' if regular_molpro else 'local'
-        if name not in parent.project.backend_names():
+        registry = backend_registry()
+        if name not in registry:
             new_backend(name, name=name, molpro_path=str(teaching_molpro_path), molpro_options='{-m %m!Process memory}')
             parent.project.refresh_backends()
         else:
-            run_command = parent.project.backend_get(name, 'run_command')
+            run_command = registry.get(name).get('run_command', '')
             if str(teaching_molpro_path) not in run_command:
-                delete_backend(name)
-                new_backend(name, name=name, molpro_path=str(teaching_molpro_path), molpro_options='{-m %m!Process memory}')
+                definition = {'name': name, 'run_command': str(teaching_molpro_path) + ' {-m %m!Process memory}'}
+                registry.update(name, dict({field: '' for field in registry.get(name)}, **definition))  # replaced whole
                 parent.project.refresh_backends()
 
 
@@ -114,7 +242,7 @@ class BackendConfigurationEditor(QDialog):
         self.edit_combo.currentTextChanged.connect(self.edit)
         form_layout.addRow('Edit or delete:', self.edit_combo)
         self.new_combo = QComboBox()
-        self.new_combo.addItems([self.choose, 'local', 'remote linux', 'Slurm', 'Other'])
+        self.new_combo.addItems([self.choose, 'local', 'local pool', 'remote linux', 'Slurm', 'Other'])
         self.new_combo.currentTextChanged.connect(self.new)
         form_layout.addRow('New:', self.new_combo)
         self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Help)
@@ -125,8 +253,7 @@ class BackendConfigurationEditor(QDialog):
 
     @property
     def backends(self):
-        backends_ = [backend.get('name') for backend in (etree.parse(self.file).xpath('//backend'))]
-        return backends_
+        return backend_registry(self.file).names()
 
     def edit(self, text):
         if not text or text == self.choose: return
@@ -153,37 +280,33 @@ class BackendConfigurationEditor(QDialog):
             help_dialog('doc/backends.md', self)
 
 def delete_backend(name, file=None):
-    if file is None:
-        file = str(pathlib.Path.home() / '.sjef/molpro/backends.xml')
-    root = etree.parse(file)
-    node = root.xpath('//backend[@name="' + name + '"]')[0]
-    node.getparent().remove(node)
-    root.write(file, pretty_print=True, xml_declaration=True, encoding='utf-8')
+    backend_registry(file).remove(name)
 
 def new_backend(text='local', file=None, name=None, molpro_path='molpro', molpro_options=' {-n %n!MPI size} {-M %M!Total memory} {-m %m!Process memory} {-G %G!GA memory}'):
-    if file is None:
-        file = str(pathlib.Path.home() / '.sjef/molpro/backends.xml')
-    root = etree.parse(file)
-    n = etree.SubElement(root.getroot(), 'backend')
+    registry = backend_registry(file)
+    n = {}
     sequence = 1
-    backends_ = [backend.get('name') for backend in (etree.parse(file).xpath('//backend'))]
+    backends_ = registry.names()
     while text.replace(' ', '_') + '_' + str(sequence) in backends_:
         sequence += 1
     name_ = text.replace(' ', '_') + '_' + str(sequence) if name is None else name
-    n.set('name', name_)
-    n.set('run_command', molpro_path + ' ' + molpro_options)
+    n['name'] = name_
+    n['run_command'] = molpro_path + ' ' + molpro_options
     if text == 'remote linux' or text == 'Slurm':
-        n.set('host', 'someone@some.computer.somewhere')
+        n['host'] = 'someone@some.computer.somewhere'
     if text == 'Slurm':
-        n.set('run_command', 'your_job_submission_script')
-        n.set('run_jobnumber', 'Submitted batch job *([0-9]+)')
-        n.set('kill_command', 'scancel')
-        n.set('status_command', 'squeue -j')
-        n.set('status_running', ' (CF|CG|R|ST|S) *[0-9]')
-        n.set('status_waiting', ' (PD|SE) *[0-9]')
-    if text != 'local' and text != 'teach':
-        n.set('cache', '.cache/sjef')
-    root.write(file, pretty_print=True, xml_declaration=True, encoding='utf-8')
+        n['run_command'] = 'your_job_submission_script'
+        n['run_jobnumber'] = 'Submitted batch job *([0-9]+)'
+        n['kill_command'] = 'scancel'
+        n['status_command'] = 'squeue -j'
+        n['status_running'] = ' (CF|CG|R|ST|S) *[0-9]'
+        n['status_waiting'] = ' (PD|SE) *[0-9]'
+    if text == 'local pool':
+        n['run_command'] = molpro_path + ' {-n %n!MPI size} {-m %m!Process memory}'
+        n['local_pool'] = 'true'
+    if text != 'local' and text != 'teach' and text != 'local pool':
+        n['cache'] = '.cache/sjef'
+    registry.add(n)
     return name_
 
 
@@ -194,10 +317,10 @@ class BackendEditor(QDialog):
         self.parent = parent
         self.setWindowTitle('Configure backend ' + backend)
         layout = QVBoxLayout()
-        et = etree.parse(parent.file).xpath('//backend[@name="' + backend + '"]')[0]
+        et = backend_registry(parent.file).get(backend)
         self.fields = {field: QLineEdit(et.get(field)) for field in
                        ['name', 'run_command', 'host', 'cache', 'kill_command', 'status_command', 'run_jobnumber',
-                        'status_running', 'status_waiting']}
+                        'status_running', 'status_waiting', 'local_pool']}
         for e in self.fields.values():
             e.setFixedWidth(400)
             e.setCursorPosition(0)
@@ -218,14 +341,8 @@ class BackendEditor(QDialog):
         self.setLayout(layout)
 
     def act(self):
-        root = etree.parse(self.parent.file)
-        backend_node = root.xpath('//backend[@name="' + self.backend + '"]')[0]
-        for field, editor in self.fields.items():
-            if editor.text():
-                backend_node.set(field, editor.text())
-            elif backend_node.get(field):
-                del backend_node.attrib[field]
-        root.write(self.parent.file, pretty_print=True, xml_declaration=True, encoding='utf-8')
+        backend_registry(self.parent.file).update(self.backend,
+                                                  {field: editor.text() for field, editor in self.fields.items()})
         self.parent.reset(self.parent.choose)
         self.close()
 
@@ -233,10 +350,7 @@ class BackendEditor(QDialog):
         if button == self.buttons.button(QDialogButtonBox.Discard):
             if QMessageBox.question(self, 'Confirm', 'Are you sure you want to delete backend ' + self.backend + '?',
                                     QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-                root = etree.parse(self.parent.file)
-                node = root.xpath('//backend[@name="' + self.backend + '"]')[0]
-                node.getparent().remove(node)
-                root.write(self.parent.file, pretty_print=True, xml_declaration=True, encoding='utf-8')
+                backend_registry(self.parent.file).remove(self.backend)
                 self.parent.reset(self.parent.choose)
                 self.close()
         elif button == self.buttons.button(QDialogButtonBox.Help):
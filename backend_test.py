@@ -0,0 +1,38 @@
+import os
+
+from backend import BackendRegistry, backend_registry, new_backend, delete_backend
+
+
+def test_registry(tmpdir):
+    file = str(tmpdir / 'backends.xml')
+    registry = BackendRegistry(file)
+    assert registry.names() == []
+    registry.add({'name': 'local', 'run_command': 'molpro'})
+    assert os.path.isfile(file)
+    assert registry.get('local') == {'name': 'local', 'run_command': 'molpro'}
+    signature = registry.signature
+
+    registry.update('local', {'run_command': 'molpro -n 2', 'host': 'somewhere', 'cache': ''})
+    assert registry.get('local') == {'name': 'local', 'run_command': 'molpro -n 2', 'host': 'somewhere'}
+    assert registry.signature != signature
+    assert BackendRegistry(file).get('local') == registry.get('local')
+
+    other = BackendRegistry(file)
+    other.update('local', {'name': 'renamed'})
+    assert registry.names() == ['renamed']  # reloaded because the file changed
+    registry.remove('renamed')
+    assert other.names() == []
+
+
+def test_new_backend(tmpdir):
+    file = str(tmpdir / 'backends.xml')
+    notified = []
+    backend_registry(file).subscribe(lambda: notified.append(True))
+    assert new_backend('remote linux', file) == 'remote_linux_1'
+    assert new_backend('remote linux', file) == 'remote_linux_2'
+    assert backend_registry(file).get('remote_linux_2')['cache'] == '.cache/sjef'
+    assert backend_registry(file).get(new_backend('local pool', file))['local_pool'] == 'true'
+    assert len(notified) == 3
+    delete_backend('remote_linux_1', file)
+    assert backend_registry(file).names() == ['remote_linux_2', 'local_pool_1']
+    assert len(notified) == 4
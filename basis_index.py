@@ -0,0 +1,51 @@
+import re
+
+
+class BasisIndex:
+    r"""
+    The basis sets of a basis registry, indexed by quality, hamiltonian and whether they are designed for correlating
+    core electrons, so that the choices offered in guided mode can be found without scanning the registry.
+    Lists keep the order of the registry.
+    """
+
+    def __init__(self, registry):
+        r"""
+        :param registry: Dictionary of basis set name to its properties, including ``quality`` and ``type``, as
+            given by ``pymolpro.Project.basis_registry()``
+        """
+        self.names = [name for name in registry if name is not None]
+        self.quality = {name: registry[name]['quality'] for name in self.names}
+        self.hamiltonian = {name: re.sub(r'\(.*', '', registry[name]['type']) for name in self.names}
+        self.core_valence = {name: 'CV' in name for name in self.names}
+        self.hamiltonians = set(self.hamiltonian.values())
+        self.selections = {}
+
+    def select(self, quality=None, hamiltonian=None, core_correlation='large'):
+        r"""
+        :param quality: Basis quality, eg 'TZ', or None for all
+        :param hamiltonian: Hamiltonian type, eg 'PP', or None for all
+        :param core_correlation: 'small' to choose only core-valence basis sets; otherwise all
+        :return: The names of the matching basis sets
+        :rtype: list
+        """
+        small_core = core_correlation == 'small'
+        key = (quality, hamiltonian, small_core)
+        if key not in self.selections:
+            self.selections[key] = [name for name in self.names if
+                                    (quality is None or self.quality[name] == quality) and
+                                    (hamiltonian is None or self.hamiltonian[name] == hamiltonian) and
+                                    (not small_core or self.core_valence[name])]
+        return list(self.selections[key])
+
+
+_indexes = {}
+
+
+def basis_index(registry):
+    r"""
+    The index of a basis registry, shared by every window that has a registry with the same basis sets
+    """
+    key = tuple((name, registry[name]['quality'], registry[name]['type']) for name in registry if name is not None)
+    if key not in _indexes:
+        _indexes[key] = BasisIndex(registry)
+    return _indexes[key]
@@ -0,0 +1,30 @@
+from basis_index import BasisIndex, basis_index
+
+registry = {
+    'cc-pVDZ': {'quality': 'DZ', 'type': 'AE(ORBITAL)'},
+    'cc-pVTZ': {'quality': 'TZ', 'type': 'AE'},
+    'cc-pCVTZ': {'quality': 'TZ', 'type': 'AE'},
+    'cc-pVTZ-PP': {'quality': 'TZ', 'type': 'PP(ECP)'},
+    'cc-pwCVTZ-PP': {'quality': 'TZ', 'type': 'PP'},
+    'cc-pVTZ-DK': {'quality': 'TZ', 'type': 'DK'},
+}
+
+
+def test_select():
+    index = BasisIndex(registry)
+    assert index.hamiltonians == {'AE', 'PP', 'DK'}
+    assert index.select() == list(registry.keys())
+    assert index.select('TZ', 'AE') == ['cc-pVTZ', 'cc-pCVTZ']
+    assert index.select('TZ', 'AE', 'mixed') == ['cc-pVTZ', 'cc-pCVTZ']
+    assert index.select('TZ', 'AE', 'small') == ['cc-pCVTZ']
+    assert index.select(None, 'PP', 'small') == ['cc-pwCVTZ-PP']
+    assert index.select('DZ') == ['cc-pVDZ']
+    assert index.select('QZ', 'AE') == []
+    selection = index.select('TZ', 'AE')
+    selection.append('changed')
+    assert index.select('TZ', 'AE') == ['cc-pVTZ', 'cc-pCVTZ']  # callers cannot change the index
+
+
+def test_shared():
+    assert basis_index(registry) is basis_index(dict(registry))
+    assert basis_index(registry) is not basis_index({'cc-pVDZ': registry['cc-pVDZ']})
@@ -0,0 +1,70 @@
+import time
+
+_unknown = object()
+
+
+class Coalescer:
+    r"""
+    Runs an action in response to bursts of events, at most once per interval, and only if a signature of the state
+    that the action depends on has changed since the action last ran.
+
+    ``trigger()`` is called for each event. When it cannot act straight away it returns how long to wait before
+    calling ``poll()``, which the caller arranges with a timer.
+    """
+
+    def __init__(self, signature, action, interval=1.0, clock=time.monotonic):
+        r"""
+        :param signature: Called to find the signature of the current state
+        :param action: Called when the signature has changed
+        :param interval: Shortest time, in seconds, between successive checks of the signature
+        :param clock: Source of the time in seconds
+        """
+        self.signature = signature
+        self.action = action
+        self.interval = interval
+        self.clock = clock
+        self.last_signature = _unknown
+        self.last_check = None
+        self.pending = False
+
+    def trigger(self):
+        r"""
+        Note that an event has happened
+
+        :return: Seconds to wait before calling ``poll()``, or None if there is nothing left to do
+        :rtype: float
+        """
+        self.pending = True
+        return self.poll()
+
+    def poll(self):
+        r"""
+        Check the signature, and run the action if it has changed, if an event is pending and the interval has passed
+
+        :return: Seconds to wait before calling ``poll()`` again, or None if there is nothing left to do
+        :rtype: float
+        """
+        if not self.pending:
+            return None
+        now = self.clock()
+        if self.last_check is not None and now < self.last_check + self.interval:
+            return self.last_check + self.interval - now
+        self.pending = False
+        self.last_check = now
+        signature = self.signature()
+        if signature != self.last_signature:
+            self.last_signature = signature
+            self.action()
+        return None
+
+    def record(self):
+        r"""
+        Note that the action has been run by other means, so that the current state needs no further action
+        """
+        self.last_signature = self.signature()
+
+    def invalidate(self):
+        r"""
+        Make the next check run the action, whatever the signature
+        """
+        self.last_signature = _unknown
@@ -0,0 +1,48 @@
+from coalescer import Coalescer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_coalescer():
+    clock = Clock()
+    state = {'files': 1}
+    actions = []
+    checks = []
+
+    def signature():
+        checks.append(clock.now)
+        return state['files']
+
+    coalescer = Coalescer(signature, lambda: actions.append(clock.now), interval=1.0, clock=clock)
+    assert coalescer.trigger() is None
+    assert actions == [100.0]
+    for i in range(10):  # a burst of events
+        clock.now += 0.05
+        wait = coalescer.trigger()
+    assert abs(wait - 0.5) < 1e-9
+    assert len(checks) == 1
+    clock.now += wait
+    assert coalescer.poll() is None
+    assert len(checks) == 2 and actions == [100.0]  # nothing has changed
+    assert coalescer.poll() is None and len(checks) == 2  # nothing pending
+
+    state['files'] = 2
+    clock.now += 5
+    coalescer.trigger()
+    assert actions == [100.0, clock.now]
+
+    state['files'] = 3
+    coalescer.record()  # the action was run directly
+    clock.now += 5
+    coalescer.trigger()
+    assert len(actions) == 2
+    coalescer.invalidate()
+    clock.now += 5
+    coalescer.trigger()
+    assert len(actions) == 3
@@ -0,0 +1,147 @@
+import math
+import re
+
+import numpy
+
+# iteration tables in molpro output: the pattern of the header line, and the columns of the iteration number, total
+# energy, energy change and gradient in the rows that follow
+tables = [
+    {'kind': 'SCF', 'header': re.compile(r'^\s*ITER\s+ETOT\s+DE\s+GRAD\b'), 'energy': 1, 'change': 2, 'gradient': 3},
+    {'kind': 'SCF', 'header': re.compile(r'^\s*ITERATION\s+DDIFF\s+GRAD\s+ENERGY\b'), 'energy': 3, 'change': None,
+     'gradient': 2},
+    {'kind': 'CC', 'header': re.compile(r'^\s*ITER\.\s+SQ\.NORM\s+CORR\.ENERGY\s+TOTAL ENERGY\s+ENERGY CHANGE\b'),
+     'energy': 3, 'change': 4, 'gradient': 6},
+    {'kind': 'OPTG', 'header': re.compile(r'^\s*ITER\.\s+ENERGY\(OLD\)\s+ENERGY\(NEW\)\s+DE\s+GRADMAX\b'),
+     'energy': 2, 'change': 3, 'gradient': 4},
+]
+
+program_pattern = re.compile(r'^\s*PROGRAM \*\s*([^(]*?)\s*(\(|  |$)', flags=re.IGNORECASE)
+
+
+def number(field):
+    return float(field.replace('D', 'E').replace('d', 'e'))
+
+
+class Series:
+    r"""
+    The iterations of one iterative calculation, kept in a numpy buffer that grows by doubling, so that appending a
+    point is cheap and ``iteration``, ``energy``, ``change`` and ``gradient`` are numpy arrays, views of the buffer
+    made without copying. A value missing from the output is NaN.
+    """
+
+    def __init__(self, kind, name, capacity=64):
+        self.kind = kind
+        self.name = name
+        self.buffer = numpy.full((4, capacity), math.nan)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def iteration(self):
+        return self.buffer[0, :self.length]
+
+    @property
+    def energy(self):
+        return self.buffer[1, :self.length]
+
+    @property
+    def change(self):
+        return self.buffer[2, :self.length]
+
+    @property
+    def gradient(self):
+        return self.buffer[3, :self.length]
+
+    def append(self, iteration, energy, change, gradient):
+        if self.length == self.buffer.shape[1]:
+            buffer = numpy.full((4, 2 * self.length), math.nan)
+            buffer[:, :self.length] = self.buffer
+            self.buffer = buffer
+        self.buffer[:, self.length] = (iteration, energy, change, gradient)
+        self.length += 1
+
+
+class ConvergenceParser:
+    r"""
+    Finds the iteration tables of SCF, coupled-cluster and geometry-optimisation steps in molpro output, fed with the
+    output a piece at a time as it is written. ``version`` is incremented whenever a point is added.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.series = []
+        self.version = getattr(self, 'version', -1) + 1  # changes on reset too
+        self.remainder = b''
+        self.table = None
+        self.program = None
+
+    def feed(self, data: bytes):
+        r"""
+        :param data: Output that follows what has been fed before
+        :return: Whether any points were added
+        :rtype: bool
+        """
+        lines = (self.remainder + data).split(b'\n')
+        self.remainder = lines.pop()
+        version = self.version
+        for line in lines:
+            self.parse_line(line.decode('utf-8', errors='replace'))
+        return self.version != version
+
+    def parse_line(self, line):
+        if self.table is not None:
+            fields = line.split()
+            try:
+                if not fields or not fields[0].isdigit():
+                    raise ValueError
+                table = self.table
+                self.series[-1].append(
+                    int(fields[0]), number(fields[table['energy']]),
+                    number(fields[table['change']]) if table['change'] is not None else math.nan,
+                    abs(number(fields[table['gradient']])) if table['gradient'] is not None else math.nan)
+                self.version += 1
+                return
+            except (ValueError, IndexError):
+                self.table = None
+        match = program_pattern.match(line)
+        if match:
+            self.program = match.group(1) if match.group(1) else None
+            return
+        for table in tables:
+            if table['header'].match(line):
+                self.table = table
+                name = table['kind'] if table['kind'] == 'OPTG' or not self.program else self.program
+                self.series.append(Series(table['kind'], name + ' ' + str(1 + sum(s.name.startswith(name + ' ') for s in
+                                                                         self.series))))
+                return
+
+
+def decimate(values, width):
+    r"""
+    Reduce a series to at most about twice the given number of points for drawing, keeping the smallest and largest
+    value in each of ``width`` intervals, so that no spike is lost. The work is done by numpy, so that its cost per
+    point is small.
+
+    :param values: The series
+    :param width: Number of intervals, typically the width of the plot in pixels
+    :return: Indices of the points to draw, in order
+    :rtype: list
+    """
+    n = len(values)
+    if n <= 2 * width:
+        return list(range(n))
+    values = numpy.asarray(values, dtype=float)
+    starts = numpy.arange(width) * n // width  # each interval has at least two points
+    bucket = numpy.repeat(numpy.arange(width), numpy.diff(numpy.append(starts, n)))
+    with numpy.errstate(invalid='ignore'):
+        lows = numpy.fmin.reduceat(values, starts)
+        highs = numpy.fmax.reduceat(values, starts)
+    indices = []
+    for extreme in (lows, highs):
+        candidates = numpy.flatnonzero(values == extreme[bucket])  # never true in an interval of NaN only
+        indices.append(candidates[numpy.unique(bucket[candidates], return_index=True)[1]])  # first in each interval
+    return numpy.unique(numpy.concatenate(indices)).tolist()
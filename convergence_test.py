@@ -0,0 +1,68 @@
+import math
+
+from convergence import ConvergenceParser, Series, decimate
+
+output_file = 'malonaldehyde.molpro/run/13.molpro/13.out'
+
+ccsd_output = b'''
+ PROGRAM * CCSD (Closed-shell coupled cluster)     Authors: C. Hampel, H.-J. Werner, 1991, M. Deegan, P.J. Knowles, 1992
+
+ ITER.      SQ.NORM     CORR.ENERGY   TOTAL ENERGY   ENERGY CHANGE        DEN1      VAR(S)    VAR(P)  DIIS     TIME  TIME/IT
+   1      1.04419530    -0.20928461  -100.22880869    -0.00863063    -0.19933434  0.33D-03  0.18D-02  1  1     0.09     0.05
+   2      1.04777413    -0.20998185  -100.22950593    -0.00069724    -0.20766005  0.45D-05  0.20D-03  2  2     0.13     0.04
+   3      1.04904431    -0.21003616  -100.22956024    -0.00005431    -0.20857282  0.32D-05  0.14D-04  3  3     0.16     0.04
+
+ Norm of t1 vector:      0.03212112      S-energy:    -0.00000000      T1 diagnostic:  0.00803028
+'''
+
+
+def test_parse_in_pieces():
+    with open(output_file, 'rb') as f:
+        content = f.read()
+    whole = ConvergenceParser()
+    assert whole.feed(content)
+    pieces = ConvergenceParser()
+    for i in range(0, len(content), 101):
+        pieces.feed(content[i:i + 101])
+    assert [series.name for series in pieces.series] == [series.name for series in whole.series] == [
+        'Restricted Hartree-Fock 1', 'OPTG 1']
+    scf, optg = pieces.series
+    assert len(scf) == 13 and scf.kind == 'SCF'
+    assert scf.energy[-1] == -265.38325290 and scf.gradient[-1] == 0.77e-7
+    assert len(optg) == 25 and optg.energy[-1] == -265.47202042 and optg.change[-1] == -0.00000015
+    assert list(optg.iteration) == list(range(1, 26))
+    version = pieces.version
+    assert not pieces.feed(b'\n nothing new\n')
+    assert pieces.version == version
+
+
+def test_coupled_cluster():
+    parser = ConvergenceParser()
+    parser.feed(ccsd_output[:300])
+    parser.feed(ccsd_output[300:])
+    assert len(parser.series) == 1
+    series = parser.series[0]
+    assert series.name == 'CCSD 1' and series.kind == 'CC'
+    assert list(series.energy) == [-100.22880869, -100.22950593, -100.22956024]
+    assert series.gradient[1] == 0.45e-5
+    parser.reset()
+    assert not parser.series
+
+
+def test_decimate():
+    values = [math.sin(i / 100) for i in range(100000)]
+    values[54321] = 10
+    indices = decimate(values, 200)
+    assert len(indices) <= 400
+    assert 54321 in indices
+    assert indices == sorted(indices)
+    assert decimate(values[:50], 200) == list(range(50))
+
+
+def test_series_growth():
+    series = Series('SCF', 'RHF 1', capacity=2)
+    for i in range(1, 6):
+        series.append(i, -100.0 - i, math.nan, 10.0 ** -i)
+    assert len(series) == 5 and series.buffer.shape[1] == 8
+    assert list(series.iteration) == [1, 2, 3, 4, 5] and series.energy[-1] == -105.0
+    assert all(math.isnan(change) for change in series.change)
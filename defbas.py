@@ -96,3 +96,5 @@ periodic_table = [
     "Nh", "Fl", "Mc", "Lv", "Ts", "Og",
     "Ua", "Ub", "Uc", "Ud", "Ue", "Uf", "Ug", "Uh",
 ]
+
+atomic_numbers = {symbol: number + 1 for number, symbol in enumerate(periodic_table)}
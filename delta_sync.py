@@ -0,0 +1,113 @@
+import gzip
+import logging
+import pathlib
+import shlex
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+def ssh_runner(host, command):
+    r"""
+    Run a command on a remote host, over the persistent connection if there is one
+
+    :return: Standard output of the command
+    :rtype: bytes
+    """
+    from ssh_multiplex import ssh_pool
+    if ssh_pool() is not None:
+        result = ssh_pool().run(host, command)
+    else:
+        result = subprocess.run(['ssh', host, command], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, timeout=30)
+    if result.returncode != 0:
+        raise OSError('Remote command failed on ' + host + ': ' + result.stderr.decode(errors='replace'))
+    return result.stdout
+
+
+def remote_cache_path(cache, local_path):
+    r"""
+    The location on a remote backend of a file in a project, following the sjef convention that the project is
+    placed in the cache directory under its absolute local path name
+    """
+    local_path = pathlib.Path(local_path).resolve().as_posix()
+    return str(pathlib.PurePosixPath(cache if cache else '.cache/sjef') / local_path.lstrip('/'))
+
+
+class AppendOnlyFetcher:
+    r"""
+    Follow a growing remote file, transferring only the bytes appended since the last fetch.  If the remote file has
+    shrunk, it is assumed to have been restarted, and is fetched again in full.
+
+    Nothing is written locally: the local copy of the file belongs to sjef, which synchronises it itself, and the
+    fetched bytes are only for display.
+    """
+
+    def __init__(self, host, remote_path, compress=False, runner=None):
+        self.host = host
+        self.remote_path = remote_path
+        self.compress = compress
+        self.runner = runner if runner else ssh_runner
+        self.offset = 0
+
+    def command(self, offset):
+        remote = shlex.quote(self.remote_path)
+        return ('test -f ' + remote + ' || exit 0; size=$(wc -c < ' + remote + '); echo $size; '
+                + 'if [ $size -ge ' + str(offset) + ' ]; then tail -c +' + str(offset + 1) + ' ' + remote
+                + (' | gzip -c' if self.compress else '') + '; fi')
+
+    def fetch(self, offset=None):
+        r"""
+        Fetch what has been appended to the remote file
+
+        :param offset: Where in the file to start, if not where the previous fetch ended
+        :return: The offset in the file of the new data, and the new data
+        :rtype: (int, bytes)
+        """
+        offset = self.offset if offset is None else offset
+        reply = self.runner(self.host, self.command(offset))
+        if not reply:
+            return offset, b''
+        header, _, data = reply.partition(b'\n')
+        remote_size = int(header.strip())
+        if remote_size < offset:
+            logger.debug('remote file ' + self.remote_path + ' has shrunk; fetching in full')
+            return self.fetch(0)
+        if self.compress:
+            data = gzip.decompress(data) if data else b''
+        self.offset = offset + len(data)
+        return offset, data
+
+
+class RemoteOutputFollower:
+    r"""
+    Follow the growing output files of a job that is running on a remote backend
+    """
+
+    def __init__(self, host, cache, run_directory, stem, suffixes=('out', 'log', 'xml'), compress=False, runner=None):
+        self.run_directory = str(run_directory)
+        self.fetchers = {}
+        for suffix in suffixes:
+            local_path = pathlib.Path(run_directory) / (stem + '.' + suffix)
+            self.fetchers[suffix] = AppendOnlyFetcher(host, remote_cache_path(cache, local_path), compress=compress,
+                                                      runner=runner)
+
+    def poll(self, offsets=None):
+        r"""
+        Fetch new data for every followed file
+
+        :param offsets: For each suffix, where in the file to start, eg how much of it is already shown. Otherwise
+            each file is fetched from where the previous fetch ended.
+        :return: For each suffix for which there is new data, the offset of the data in the file and the data
+        :rtype: dict
+        """
+        result = {}
+        for suffix, fetcher in self.fetchers.items():
+            try:
+                offset, data = fetcher.fetch((offsets or {}).get(suffix))
+            except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+                logger.debug('fetch of ' + fetcher.remote_path + ' failed: ' + str(e))
+                continue
+            if data:
+                result[suffix] = (offset, data)
+        return result
@@ -0,0 +1,47 @@
+import os
+import subprocess
+
+import pytest
+
+from delta_sync import AppendOnlyFetcher, RemoteOutputFollower, remote_cache_path
+
+
+def local_shell(host, command):
+    return subprocess.run(['sh', '-c', command], stdout=subprocess.PIPE, check=True).stdout
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_append_only(tmpdir, compress):
+    remote = tmpdir / 'remote.out'
+    fetcher = AppendOnlyFetcher('host', str(remote), compress=compress, runner=local_shell)
+    assert fetcher.fetch() == (0, b'')
+
+    with open(remote, 'w') as f:
+        f.write('first line\n')
+    assert fetcher.fetch() == (0, b'first line\n')
+    assert fetcher.fetch() == (11, b'')
+
+    with open(remote, 'a') as f:
+        f.write('second line\n')
+    assert fetcher.fetch() == (11, b'second line\n')
+    assert fetcher.fetch(6) == (6, b'line\nsecond line\n')
+    assert os.listdir(tmpdir) == ['remote.out']  # nothing written locally
+
+    with open(remote, 'w') as f:
+        f.write('restarted\n')
+    assert fetcher.fetch() == (0, b'restarted\n')
+
+
+def test_follower(tmpdir):
+    run_directory = tmpdir / 'project.molpro' / 'run' / '1.molpro'
+    os.makedirs(run_directory)
+    remote_run_directory = remote_cache_path(str(tmpdir / 'cache'), run_directory)
+    assert remote_run_directory.startswith(str(tmpdir / 'cache'))
+    os.makedirs(remote_run_directory)
+    with open(remote_run_directory + '/1.out', 'w') as f:
+        f.write('output')
+    follower = RemoteOutputFollower('host', str(tmpdir / 'cache'), run_directory, '1', runner=local_shell)
+    assert follower.poll() == {'out': (0, b'output')}
+    assert follower.poll() == {}
+    assert follower.poll({'out': 3}) == {'out': (3, b'put')}
+    assert os.listdir(run_directory) == []
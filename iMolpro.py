@@ -1,12 +1,25 @@
+import multiprocessing
+import sys
+
+import startup_profile
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()  # the project catalogue indexes in a pool of processes
+    startup_profile.install_from_argv(sys.argv)
+
 import pathlib
 
-from PyQt5.QtCore import QEvent
+from PyQt5.QtCore import QEvent, QCoreApplication, Qt, QTimer
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QMessageBox
-import sys
 
 from Chooser import Chooser
-from ProjectWindow import ProjectWindow
 from WindowManager import WindowManager
+from ssh_multiplex import ssh_pool
+from tool_discovery import tool_discovery, viewer_paths
+from login_environment import login_path, refresh_login_path
+from settings import settings
+import instrumentation
+from stall_detector import start_stall_detector
 import os
 import platform
 import logging
@@ -16,6 +29,7 @@ if __name__ == '__main__':
     class App(QApplication):
         def event(self, e):
             if e.type() == QEvent.FileOpen and os.path.splitext(e.file())[1] == '.molpro':
+                from ProjectWindow import ProjectWindow
                 window_manager.register(ProjectWindow(e.file(), window_manager))
             else:
                 return super().event(e)
@@ -46,6 +60,7 @@ if __name__ == '__main__':
                             format='%(asctime)s %(levelname)-8s %(name)s %(funcName)s() %(pathname)s:%(lineno)d %(message)s',
                             datefmt='%Y-%m-%d %H:%M:%S')
     logger.info('iMolpro starting...')
+    instrumentation.install()
 
     if hasattr(sys, '_MEIPASS') and platform.uname().system != 'Windows':
         sys.stdout = open('/tmp/iMolpro.stdout', 'w')
@@ -57,14 +72,18 @@ if __name__ == '__main__':
         if 'FONTCONFIG_FILE' not in os.environ:
             os.environ['FONTCONFIG_FILE'] = '/etc/fonts/fonts.conf'
 
+    login_path_stale = False
     try:
         if platform.uname().system == 'Windows':
             os.environ['PATH'] = os.path.dirname(os.path.abspath(__file__)) + ';' + os.environ['PATH']
             if 'CONDA_PREFIX' not in os.environ:
                 os.environ['CONDA_PREFIX'] = os.path.dirname(os.path.abspath(__file__))
-        elif 'PATH' in os.environ and 'SHELL' in os.environ:
-            os.environ['PATH'] = os.popen(os.environ['SHELL'] + " -l -c 'echo $PATH'").read() + ':' + os.environ[
-                'PATH']  # make PATH just as if running from shell
+        elif login_path() is not None:
+            if 'login_path_cache' in settings and not int(settings['login_path_cache']):
+                path, login_path_stale = login_path().query(), False
+            else:
+                path, login_path_stale = login_path().path()
+            os.environ['PATH'] = path + ':' + os.environ['PATH']  # make PATH just as if running from shell
     except Exception as e:
         msg = QMessageBox()
         msg.setText('Error in setting PATH')
@@ -86,20 +105,41 @@ if __name__ == '__main__':
             if process_id == console_process_id:
                 ctypes.windll.user32.ShowWindow(console_window, 2)
 
+    if ssh_pool():
+        ssh_pool().install_shim()
+        ssh_pool().start_monitor()
+    tool_discovery().rescan_in_background(viewer_paths)
+
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)  # allows QtWebEngineWidgets to be imported later
     app = App(sys.argv)
     if platform.uname().system == 'Windows':
         font = app.font()
         font.setPointSize(7)
         app.setFont(font)
 
+    stall_detector = start_stall_detector(app)
+
     window_manager = WindowManager()
     chooser = Chooser(window_manager)
     chooser.quitButton.clicked.connect(app.quit)
     window_manager.set_empty_action(chooser.activate)
     window_manager.set_full_action(chooser.hide)
 
+    if sys.argv[1:]:
+        from ProjectWindow import ProjectWindow
     for arg in sys.argv[1:]:
         window_manager.register(ProjectWindow(arg, window_manager))
+    startup_profile.mark('windows constructed')
+    QTimer.singleShot(0, lambda: startup_profile.finish('first window shown'))
+    if not sys.argv[1:]:
+        QTimer.singleShot(1000, window_manager.preload)
+    if login_path_stale:
+        QTimer.singleShot(0, refresh_login_path)
 
     app.exec()
+    if stall_detector:
+        stall_detector.stop()
+    instrumentation.finish()
+    if ssh_pool():
+        ssh_pool().close_all()
     logger.info('... iMolpro stopping')
@@ -0,0 +1,223 @@
+import bisect
+import collections
+import functools
+import importlib
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+environment_variable = 'IMOLPRO_INSTRUMENT'
+
+# upper edges, in seconds, of the bins of the histograms of call durations
+histogram_edges = [1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 1e-1, 3e-1, 1.0, 3.0, 10.0]
+
+# (module, attribute) of the entry points that are timed
+targets = [
+    ('molpro_input', 'InputSpecification.parse'),
+    ('molpro_input', 'canonicalise'),
+    ('defbas', 'Defbas.search'),
+    ('utilities', 'factory_vibration_set'),
+    ('utilities', 'factory_orbital_set'),
+    ('ProjectWindow', 'factory_vibration_set'),
+    ('ProjectWindow', 'factory_orbital_set'),
+    ('ProjectWindow', 'ProjectWindow.embedded_vod'),
+    ('ProjectWindow', 'ProjectWindow.refresh_output_tabs'),
+    ('ProjectWindow', 'ProjectWindow.visualise_input'),
+] + [('pymolpro', 'Project.' + method) for method in [
+    'filename', 'status', 'property_get', 'property_set', 'run', 'kill', 'clean', 'run_needed', 'xpath_search',
+    'geometry', 'registry', 'procedures_registry', 'basis_registry', 'backend_names', 'backend_get',
+    'refresh_backends', 'import_file', 'import_input', 'copy', 'move', 'trash']]
+
+
+class Instrumentation:
+    r"""
+    Counts and times of calls to instrumented functions, kept as a histogram of durations for each function, and as a
+    list of recent calls that can be written as a trace for the Chrome trace viewer (chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, max_events=200000):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.statistics = {}
+        self.events = collections.deque(maxlen=max_events)
+        self.installed = []
+
+    def record(self, name, start, duration):
+        r"""
+        :param name: The function called
+        :param start: The time of the call, from :func:`time.perf_counter`
+        :param duration: The time taken, in seconds
+        """
+        with self.lock:
+            if name not in self.statistics:
+                self.statistics[name] = {'calls': 0, 'total': 0.0, 'maximum': 0.0,
+                                         'histogram': [0] * (len(histogram_edges) + 1)}
+            statistics = self.statistics[name]
+            statistics['calls'] += 1
+            statistics['total'] += duration
+            statistics['maximum'] = max(statistics['maximum'], duration)
+            statistics['histogram'][bisect.bisect_left(histogram_edges, duration)] += 1
+            self.events.append((name, start - self.start, duration, threading.get_ident()))
+
+    def wrap(self, function, name):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter() - start)
+
+        timed.instrumented = function
+        return timed
+
+    def instrument(self, owner, attribute, name):
+        r"""
+        Replace a function, method or property by one that records its calls
+
+        :param owner: The module or class that holds the attribute
+        :param attribute: The name of the attribute
+        :param name: The name under which the calls are recorded
+        """
+        original = None
+        for namespace in (owner.__mro__ if isinstance(owner, type) else [owner]):
+            if attribute in vars(namespace):
+                original = vars(namespace)[attribute]
+                break
+        if original is None or hasattr(original, 'instrumented') or (
+                isinstance(original, property) and hasattr(original.fget, 'instrumented')):
+            return
+        if isinstance(original, property):
+            replacement = property(self.wrap(original.fget, name), original.fset, original.fdel, original.__doc__)
+        elif isinstance(original, (staticmethod, classmethod)):
+            replacement = type(original)(self.wrap(original.__func__, name))
+        elif callable(original):
+            replacement = self.wrap(original, name)
+        else:
+            return
+        setattr(owner, attribute, replacement)
+        self.installed.append((owner, attribute, original))
+
+    def install(self, targets=targets):
+        r"""
+        Instrument the given entry points, importing their modules if necessary
+
+        :param targets: (module, attribute) pairs, where attribute is a function name, or a class and method name
+            separated by a dot
+        """
+        for module_name, attribute in targets:
+            try:
+                owner = importlib.import_module(module_name)
+                *classes, attribute_ = attribute.split('.')
+                for class_name in classes:
+                    owner = getattr(owner, class_name)
+                self.instrument(owner, attribute_, attribute if module_name != 'pymolpro' else 'pymolpro.' + attribute)
+            except (ImportError, AttributeError, TypeError) as e:  # TypeError for extension types
+                logger.debug('Cannot instrument ' + module_name + '.' + attribute + ': ' + str(e))
+
+    def uninstall(self):
+        for owner, attribute, original in reversed(self.installed):
+            setattr(owner, attribute, original)
+        self.installed.clear()
+
+    def summary(self):
+        r"""
+        :return: For each instrumented function that has been called, the number of calls, the total, mean and maximum
+            time, and the histogram of times, with the most expensive in total first
+        :rtype: list of dict
+        """
+        with self.lock:
+            rows = [dict(statistics, name=name, histogram=list(statistics['histogram'])) for name, statistics in
+                    self.statistics.items()]
+        for row in rows:
+            row['mean'] = row['total'] / row['calls']
+        return sorted(rows, key=lambda row: -row['total'])
+
+    def trace(self):
+        r"""
+        :return: The recorded calls in the Chrome trace event format
+        :rtype: dict
+        """
+        pid = os.getpid()
+        with self.lock:
+            events = list(self.events)
+        return {'traceEvents': [{'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'ts': start * 1e6,
+                                 'dur': duration * 1e6, 'pid': pid, 'tid': tid} for name, start, duration, tid in
+                                events],
+                'displayTimeUnit': 'ms',
+                'otherData': {'histogram_edges_seconds': histogram_edges,
+                              'summary': {row['name']: row for row in self.summary()}}}
+
+    def write_trace(self, filename):
+        temporary = str(filename) + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.trace(), f)
+        os.replace(temporary, filename)
+        logger.info('Instrumentation trace written to ' + str(filename))
+
+
+_instrumentation = None
+
+
+def enabled():
+    r"""
+    Whether instrumentation has been asked for, with the environment variable IMOLPRO_INSTRUMENT or the setting
+    ``instrumentation``
+    """
+    if os.environ.get(environment_variable, '0') not in ['', '0']:
+        return True
+    from settings import settings
+    try:
+        return 'instrumentation' in settings and bool(int(settings['instrumentation']))
+    except (TypeError, ValueError):
+        return False
+
+
+def trace_file():
+    r"""
+    The file to which the trace is written when iMolpro stops: the value of IMOLPRO_INSTRUMENT if that is not just a
+    flag, else ``iMolpro.trace.json`` next to the settings
+    """
+    value = os.environ.get(environment_variable, '0')
+    if value not in ['', '0', '1']:
+        return value
+    from settings import settings
+    return str(pathlib.Path(settings.filename).parent / 'iMolpro.trace.json')
+
+
+def instrumentation():
+    r"""
+    The instrumentation of this process, or None if it is not enabled
+    """
+    return _instrumentation
+
+
+def install():
+    r"""
+    If instrumentation is enabled, instrument the entry points
+
+    :return: The instrumentation, or None if not enabled
+    :rtype: Instrumentation
+    """
+    global _instrumentation
+    if _instrumentation is None and enabled():
+        _instrumentation = Instrumentation()
+        _instrumentation.install()
+        logger.info('Instrumentation installed')
+    return _instrumentation
+
+
+def finish():
+    r"""
+    Write the trace, if instrumentation is enabled
+    """
+    if _instrumentation is not None:
+        try:
+            _instrumentation.write_trace(trace_file())
+        except OSError as e:
+            logger.warning('Cannot write instrumentation trace: ' + str(e))
@@ -0,0 +1,89 @@
+import json
+import types
+
+import instrumentation
+from instrumentation import Instrumentation, histogram_edges
+
+
+class Worker:
+    def __init__(self):
+        self.value_ = 3
+
+    def work(self, n):
+        return sum(range(n))
+
+    @property
+    def value(self):
+        return self.value_
+
+
+def test_instrument_method_and_property():
+    recorder = Instrumentation()
+    recorder.instrument(Worker, 'work', 'Worker.work')
+    recorder.instrument(Worker, 'value', 'Worker.value')
+    recorder.instrument(Worker, 'work', 'Worker.work')  # not wrapped twice
+    worker = Worker()
+    assert worker.work(10) == 45
+    assert worker.work(100) == 4950
+    assert worker.value == 3
+    summary = {row['name']: row for row in recorder.summary()}
+    assert summary['Worker.work']['calls'] == 2
+    assert summary['Worker.value']['calls'] == 1
+    assert sum(summary['Worker.work']['histogram']) == 2
+    assert len(summary['Worker.work']['histogram']) == len(histogram_edges) + 1
+    recorder.uninstall()
+    worker.work(10)
+    assert not hasattr(Worker.work, 'instrumented')
+    assert {row['name']: row for row in recorder.summary()}['Worker.work']['calls'] == 2
+
+
+def test_instrument_module_function():
+    module = types.ModuleType('module')
+    module.double = lambda x: 2 * x
+    recorder = Instrumentation()
+    recorder.instrument(module, 'double', 'double')
+    assert module.double(4) == 8
+    assert recorder.summary()[0]['name'] == 'double'
+    recorder.uninstall()
+
+
+def test_histogram_and_trace(tmp_path):
+    recorder = Instrumentation(max_events=2)
+    recorder.record('a', recorder.start, 2e-5)
+    recorder.record('a', recorder.start + 1, 0.5)
+    recorder.record('b', recorder.start + 2, 20.0)
+    rows = recorder.summary()
+    assert [row['name'] for row in rows] == ['b', 'a']
+    assert rows[1]['histogram'][1] == 1 and rows[1]['histogram'][10] == 1
+    assert rows[0]['histogram'][-1] == 1
+    assert rows[1]['maximum'] == 0.5
+    file = tmp_path / 'trace.json'
+    recorder.write_trace(file)
+    with open(file, 'r') as f:
+        trace = json.load(f)
+    assert len(trace['traceEvents']) == 2  # only the most recent are kept
+    assert trace['traceEvents'][-1]['name'] == 'b'
+    assert trace['traceEvents'][-1]['ph'] == 'X'
+    assert trace['traceEvents'][-1]['dur'] == 20.0e6
+    assert trace['otherData']['summary']['a']['calls'] == 2
+
+
+def test_install_targets():
+    recorder = Instrumentation()
+    recorder.install([('molpro_input', 'canonicalise'), ('molpro_input', 'InputSpecification.parse'),
+                      ('not_a_module', 'f'), ('molpro_input', 'no_such_function')])
+    try:
+        import molpro_input
+        molpro_input.InputSpecification('geometry={He}\nhf\n')
+        molpro_input.equivalent('hf', 'hf')
+        summary = {row['name']: row['calls'] for row in recorder.summary()}
+        assert summary['InputSpecification.parse'] == 1
+        assert summary['canonicalise'] == 2
+    finally:
+        recorder.uninstall()
+
+
+def test_enabled(monkeypatch, tmp_path):
+    monkeypatch.setenv(instrumentation.environment_variable, str(tmp_path / 'trace.json'))
+    assert instrumentation.enabled()
+    assert instrumentation.trace_file() == str(tmp_path / 'trace.json')
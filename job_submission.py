@@ -0,0 +1,165 @@
+import concurrent.futures
+import contextlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+descriptions = {'run': 'submitting', 'kill': 'killing', 'clean': 'cleaning'}
+
+
+class Operation:
+    r"""
+    A run, kill or clean of one project, carried out by the :class:`JobSubmitter`
+    """
+
+    def __init__(self, filename, name):
+        self.filename = filename
+        self.name = name
+        self.submitted = time.monotonic()
+        self.started = None
+        self.cancelled = False
+        self.future = None
+
+    @property
+    def description(self):
+        r"""
+        What is happening, for the status bar, eg 'submitting… 3s'
+        """
+        text = descriptions.get(self.name, self.name) + '…'
+        if self.cancelled:
+            return text + ' cancelling'
+        if self.started is None:
+            return text + ' waiting'
+        return text + ' ' + str(int(time.monotonic() - self.started)) + 's'
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class JobSubmitter:
+    r"""
+    Carries out the submission, killing and cleaning of jobs in a pool of threads shared by all project windows, so
+    that the ssh, file synchronisation and scheduler round-trips of remote backends do not hold up the windows, and
+    several projects can be submitted at once.
+
+    Operations on the same project are done one at a time, in the order they were asked for. A submission can be
+    cancelled: if it has not started it is dropped, and otherwise the job is killed as soon as it has been submitted.
+    """
+
+    def __init__(self, workers=4, environment=None):
+        r"""
+        :param workers: Number of operations that can be carried out at once
+        :param environment: Called to give a context manager that sets up the process environment for each
+            operation, eg putting the multiplexing ssh wrapper on ``PATH``
+        """
+        self.environment = environment if environment is not None else contextlib.nullcontext
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='JobSubmitter')
+        self.lock = threading.Lock()
+        self.operations = {}  # for each project, the operation in progress followed by those waiting
+
+    def submit(self, project, name, callback=None, **kwargs):
+        r"""
+        Start an operation on a project, or queue it behind those already asked for on the same project. A queued
+        operation is given to the pool only when its predecessor has finished, so no worker is kept waiting.
+
+        :param project: The project, having methods run, kill and clean
+        :param name: 'run', 'kill' or 'clean'
+        :param callback: Called, in a worker thread, with the operation and the exception raised, or None, when the
+            operation has finished or been cancelled
+        :param kwargs: Passed to the project's method
+        :rtype: Operation
+        """
+        filename = project.filename(run=-1)
+        operation = Operation(filename, name)
+        operation.future = concurrent.futures.Future()
+        task = (project, operation, callback, kwargs)
+        with self.lock:
+            queue = self.operations.setdefault(filename, [])
+            queue.append(task)
+            start = len(queue) == 1
+        if start:
+            self._start(task)
+        return operation
+
+    def _start(self, task):
+        try:
+            self.executor.submit(self._perform, *task)
+        except RuntimeError as e:  # shut down
+            logger.debug(task[1].name + ' ' + task[1].filename + ' not started: ' + str(e))
+
+    def _perform(self, project, operation, callback, kwargs):
+        error = None
+        try:
+            if not operation.cancelled:
+                operation.started = time.monotonic()
+                logger.debug(operation.name + ' ' + operation.filename)
+                with self.environment():
+                    getattr(project, operation.name)(**kwargs)
+                    if operation.cancelled and operation.name == 'run':
+                        logger.debug('kill cancelled submission ' + operation.filename)
+                        project.kill()
+        except Exception as e:
+            logger.warning(operation.name + ' ' + operation.filename + ' failed: ' + str(e))
+            error = e
+        finally:
+            with self.lock:
+                queue = self.operations.get(operation.filename, [])
+                if queue and queue[0][1] is operation:
+                    queue.pop(0)
+                following = queue[0] if queue else None
+                if not queue:
+                    self.operations.pop(operation.filename, None)
+            if following is not None:
+                self._start(following)
+        if callback is not None:
+            try:
+                callback(operation, error)
+            except Exception as e:
+                logger.debug('callback after ' + operation.name + ' ' + operation.filename + ': ' + str(e))
+        operation.future.set_result(error)
+        return error
+
+    def current(self, filename):
+        r"""
+        :return: The operation on the project that is in progress or waiting, if any
+        :rtype: Operation
+        """
+        with self.lock:
+            queue = self.operations.get(filename)
+            return queue[0][1] if queue else None
+
+    def cancel(self, filename):
+        r"""
+        Cancel the submissions of a project that are in progress or waiting
+
+        :return: Whether there was a submission to cancel
+        :rtype: bool
+        """
+        with self.lock:
+            operations = [task[1] for task in self.operations.get(filename, []) if
+                          task[1].name == 'run' and not task[1].cancelled]
+            for operation in operations:
+                operation.cancelled = True
+        return bool(operations)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_job_submitter = None
+
+
+def job_submitter():
+    r"""
+    The submitter shared by all project windows
+    """
+    global _job_submitter
+    if _job_submitter is None:
+        from settings import settings
+        from ssh_multiplex import ssh_pool
+        _job_submitter = JobSubmitter(
+            workers=int(settings['submission_workers']) if 'submission_workers' in settings else 4,
+            environment=ssh_pool().shim_on_path if ssh_pool() else None)
+    return _job_submitter
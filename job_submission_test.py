@@ -0,0 +1,80 @@
+import threading
+
+from job_submission import JobSubmitter
+
+
+class SlowProject:
+    def __init__(self, name, release=None):
+        self.name = name
+        self.release = release
+        self.calls = []
+        self.started = threading.Event()
+
+    def filename(self, run=0):
+        return '/projects/' + self.name + '.molpro'
+
+    def run(self, force=False):
+        self.started.set()
+        if self.release is not None:
+            assert self.release.wait(5)
+        self.calls.append(('run', force))
+
+    def kill(self):
+        self.calls.append('kill')
+
+    def clean(self):
+        raise RuntimeError('cannot clean')
+
+
+def test_parallel_submission():
+    release = threading.Event()
+    submitter = JobSubmitter(workers=4)
+    projects = [SlowProject(str(i), release) for i in range(3)]
+    finished = []
+    operations = [submitter.submit(project, 'run', lambda operation, error: finished.append((operation, error)),
+                                   force=True) for project in projects]
+    for project in projects:
+        assert project.started.wait(5)  # all being submitted at once
+    assert submitter.current(projects[0].filename(run=-1)).description.startswith('submitting… ')
+    release.set()
+    for operation in operations:
+        operation.future.result(5)
+    assert all(project.calls == [('run', True)] for project in projects)
+    assert len(finished) == 3 and all(error is None for operation, error in finished)
+    assert submitter.current(projects[0].filename(run=-1)) is None
+
+
+def test_order_errors_and_cancellation():
+    release = threading.Event()
+    submitter = JobSubmitter(workers=4)
+    project = SlowProject('a', release)
+    errors = []
+    first = submitter.submit(project, 'run')
+    assert project.started.wait(5)
+    second = submitter.submit(project, 'run')  # waits for the first
+    clean = submitter.submit(project, 'clean', lambda operation, error: errors.append(error))
+    assert submitter.current(project.filename(run=-1)) is first
+    assert submitter.cancel(project.filename(run=-1))
+    assert 'cancelling' in second.description
+    release.set()
+    for operation in [first, second, clean]:
+        operation.future.result(5)
+    assert project.calls == [('run', False), 'kill']  # the first was killed once submitted, the second dropped
+    assert isinstance(errors[0], RuntimeError)
+    assert not submitter.cancel(project.filename(run=-1))
+
+
+def test_queued_operations_hold_no_worker():
+    release = threading.Event()
+    submitter = JobSubmitter(workers=2)
+    slow = SlowProject('slow', release)
+    first = submitter.submit(slow, 'run')
+    assert slow.started.wait(5)
+    queued = [submitter.submit(slow, 'kill') for i in range(3)]
+    other = SlowProject('other')
+    submitter.submit(other, 'run').future.result(5)  # a worker is still free
+    assert other.calls == [('run', False)]
+    release.set()
+    for operation in [first] + queued:
+        operation.future.result(5)
+    assert slow.calls == [('run', False), 'kill', 'kill', 'kill']
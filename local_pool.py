@@ -0,0 +1,227 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def is_pool_backend(attributes):
+    r"""
+    :param attributes: The attributes of a backend, as in the backends file
+    :return: Whether the backend is marked as a local pool backend by its ``local_pool`` attribute
+    :rtype: bool
+    """
+    return bool(attributes) and str(attributes.get('local_pool', '')).strip().lower() in ('1', 'true', 'yes')
+
+
+def available_cores():
+    return os.cpu_count() or 1
+
+
+def available_memory():
+    r"""
+    Physical memory of the machine
+
+    :return: Memory in bytes, or None if it cannot be determined
+    :rtype: int
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class LocalPool:
+    r"""
+    Scheduler for jobs submitted to a local pool backend.
+
+    Submitted projects are queued by priority, and launched when a slot becomes free, with the number of MPI
+    processes and the memory per process chosen so that the running jobs together fit the machine.
+    """
+
+    def __init__(self, cores=None, memory=None, max_jobs=None, memory_fraction=0.8, project_factory=None,
+                 poll_interval=2.0, settle_time=5.0):
+        self.cores = cores if cores else available_cores()
+        self.memory = memory if memory else available_memory()
+        self.max_jobs = max_jobs if max_jobs else max(1, self.cores // 4)
+        self.memory_fraction = memory_fraction
+        self.project_factory = project_factory if project_factory else _pymolpro_project
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.queue = []
+        self.queued = {}
+        self.running = {}
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    @property
+    def cores_per_job(self):
+        return max(1, self.cores // self.max_jobs)
+
+    @property
+    def memory_per_process(self):
+        r"""
+        Memory for each MPI process of a job, in the form accepted by molpro -m
+
+        :return: Memory specification, or None if the machine's memory is not known
+        :rtype: str
+        """
+        if not self.memory:
+            return None
+        megawords = int(self.memory * self.memory_fraction / self.max_jobs / self.cores_per_job / 8 / 1000000)
+        return str(max(1, megawords)) + 'M'
+
+    def submit(self, filename, backend, priority=0, force=False, callback=None):
+        r"""
+        Place a project in the queue.  A project that is already queued is requeued with the new priority.
+
+        :param filename: Project bundle
+        :param backend: Name of the pool backend to run with
+        :param priority: Jobs with higher priority are launched first
+        :param force: Passed to the project's run()
+        :param callback: Called, in the scheduler thread, with the project bundle and the exception raised, or None,
+            when the job has been launched or has failed to launch
+        """
+        with self.condition:
+            if filename in self.running:
+                raise ValueError('Project ' + filename + ' is already running in the local pool')
+            self.queued[filename] = {'backend': backend, 'priority': priority, 'force': force, 'callback': callback,
+                                     'sequence': next(self.sequence)}
+            heapq.heappush(self.queue, (-priority, self.queued[filename]['sequence'], filename))
+            self.condition.notify()
+        self.start()
+
+    def reprioritise(self, filename, priority):
+        with self.condition:
+            job = self.queued.get(filename)
+        if job is not None:
+            self.submit(filename, job['backend'], priority=priority, force=job['force'], callback=job['callback'])
+
+    def cancel(self, filename):
+        r"""
+        Remove a project from the queue, or kill it if it is already running
+
+        :return: True if the project was known to the pool
+        :rtype: bool
+        """
+        with self.condition:
+            if filename in self.queued:
+                del self.queued[filename]
+                self.condition.notify()
+                return True
+            project = self.running[filename]['project'] if filename in self.running else None
+        if project is None:
+            return False
+        project.kill()
+        return True
+
+    def state(self, filename):
+        with self.condition:
+            if filename in self.queued:
+                return 'queued'
+            if filename in self.running:
+                return 'running'
+
+    def position(self, filename):
+        r"""
+        :return: 1-based position of the project in the queue, or None if it is not queued
+        :rtype: int
+        """
+        with self.condition:
+            if filename not in self.queued:
+                return None
+            live = sorted(entry for entry in self.queue if entry[2] in self.queued and
+                          entry[1] == self.queued[entry[2]]['sequence'])
+            return [entry[2] for entry in live].index(filename) + 1
+
+    def start(self):
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._schedule, name='LocalPool', daemon=True)
+                self.thread.start()
+
+    def schedule_once(self):
+        r"""
+        Reap finished jobs, and launch as many queued jobs as there are free slots
+        """
+        with self.condition:
+            now = time.monotonic()
+            for filename, job in list(self.running.items()):
+                if job['project'] is None or now - job['launched'] < self.settle_time:
+                    continue
+                try:
+                    status = job['project'].status
+                except Exception as e:
+                    logger.warning('Cannot get status of ' + filename + ': ' + str(e))
+                    status = 'unknown'
+                if status not in ['running', 'waiting']:
+                    logger.debug('local pool job finished: ' + filename + ' ' + status)
+                    del self.running[filename]
+            launches = []
+            while self.queue and len(self.running) + len(launches) < self.max_jobs:
+                priority, sequence, filename = heapq.heappop(self.queue)
+                if filename not in self.queued or self.queued[filename]['sequence'] != sequence:
+                    continue  # cancelled or requeued
+                launches.append((filename, self.queued.pop(filename)))
+            for filename, job in launches:
+                self.running[filename] = {'project': None, 'launched': now}
+        for filename, job in launches:
+            self._launch(filename, job)
+
+    def _launch(self, filename, job):
+        error = None
+        try:
+            project = self.project_factory(filename)
+            project.backend_parameter_set(job['backend'], 'n', str(self.cores_per_job))
+            if self.memory_per_process:
+                project.backend_parameter_set(job['backend'], 'm', self.memory_per_process)
+            logger.debug('local pool launching ' + filename + ' n=' + str(self.cores_per_job) + ' m=' + str(
+                self.memory_per_process))
+            with self.condition:
+                self.running[filename]['project'] = project
+            project.run(backend=job['backend'], force=job['force'])
+        except Exception as e:
+            logger.error('Local pool could not launch ' + filename + ': ' + str(e))
+            error = e
+            with self.condition:
+                self.running.pop(filename, None)
+        if job['callback'] is not None:
+            try:
+                job['callback'](filename, error)
+            except Exception as e:
+                logger.debug('callback after launching ' + filename + ': ' + str(e))
+
+    def _schedule(self):
+        while True:
+            self.schedule_once()
+            with self.condition:
+                if not self.queue and not self.running:
+                    self.thread = None
+                    return
+                self.condition.wait(self.poll_interval)
+
+
+def _pymolpro_project(filename):
+    from pymolpro import Project
+    return Project(filename)
+
+
+_local_pool = None
+
+
+def local_pool():
+    r"""
+    The pool shared by all project windows
+    """
+    global _local_pool
+    if _local_pool is None:
+        from settings import settings
+        _local_pool = LocalPool(
+            cores=int(settings['local_pool_cores']) if 'local_pool_cores' in settings else None,
+            max_jobs=int(settings['local_pool_jobs']) if 'local_pool_jobs' in settings else None,
+            memory_fraction=float(
+                settings['local_pool_memory_fraction']) if 'local_pool_memory_fraction' in settings else 0.8)
+    return _local_pool
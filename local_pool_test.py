@@ -0,0 +1,82 @@
+from local_pool import LocalPool, is_pool_backend
+
+
+class FakeProject:
+    launched = []
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.parameters = {}
+        self.status = 'unevaluated'
+
+    def backend_parameter_set(self, backend, parameter, value):
+        self.parameters[parameter] = value
+
+    def run(self, backend=None, force=False):
+        self.status = 'running'
+        FakeProject.launched.append(self)
+
+    def kill(self):
+        self.status = 'killed'
+
+
+def test_pool_backends():
+    assert is_pool_backend({'name': 'overnight', 'run_command': 'molpro', 'local_pool': 'true'})
+    assert not is_pool_backend({'name': 'local_pool_1', 'run_command': 'molpro'})
+    assert not is_pool_backend({'name': 'local', 'local_pool': ''})
+    assert not is_pool_backend(None)
+
+
+def test_launch_failure():
+    class BrokenProject(FakeProject):
+        def run(self, backend=None, force=False):
+            raise RuntimeError('cannot launch')
+
+    pool = LocalPool(cores=4, memory=None, max_jobs=2, project_factory=BrokenProject, settle_time=0)
+    pool.start = lambda: None
+    launched = []
+    pool.submit('a', 'local_pool_1', callback=lambda filename, error: launched.append((filename, error)))
+    pool.schedule_once()
+    assert len(launched) == 1 and launched[0][0] == 'a' and isinstance(launched[0][1], RuntimeError)
+    assert pool.state('a') is None
+
+
+def test_resources():
+    pool = LocalPool(cores=16, memory=64 * 1000000000, max_jobs=2, memory_fraction=0.5, project_factory=FakeProject)
+    assert pool.cores_per_job == 8
+    assert pool.memory_per_process == '250M'
+
+
+def test_schedule():
+    FakeProject.launched = []
+    pool = LocalPool(cores=4, memory=None, max_jobs=2, project_factory=FakeProject, settle_time=0)
+    pool.start = lambda: None  # drive the scheduler by hand
+    for name, priority in [('a', 0), ('b', 0), ('c', 5), ('d', 1)]:
+        pool.submit(name, 'local_pool_1', priority=priority)
+    assert pool.position('c') == 1
+    assert pool.position('a') == 3
+    pool.schedule_once()
+    assert [p.filename for p in FakeProject.launched] == ['c', 'd']
+    assert FakeProject.launched[0].parameters['n'] == '2'
+    assert pool.state('c') == 'running'
+    assert pool.state('a') == 'queued'
+
+    assert pool.cancel('a')
+    assert pool.state('a') is None
+    pool.schedule_once()
+    assert len(FakeProject.launched) == 2
+
+    assert pool.cancel('c')
+    pool.schedule_once()
+    assert [p.filename for p in FakeProject.launched] == ['c', 'd', 'b']
+    assert pool.state('c') is None
+
+
+def test_reprioritise():
+    pool = LocalPool(cores=1, memory=None, max_jobs=1, project_factory=FakeProject)
+    pool.start = lambda: None
+    pool.submit('a', 'local_pool_1')
+    pool.submit('b', 'local_pool_1', force=True)
+    pool.reprioritise('b', 3)
+    assert pool.position('b') == 1
+    assert pool.queued['b']['force']
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import pathlib
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+rc_files = ['/etc/profile', '/etc/zprofile', '/etc/zshenv', '/etc/bashrc', '/etc/bash.bashrc', '~/.profile',
+            '~/.bash_profile', '~/.bash_login', '~/.bashrc', '~/.zprofile', '~/.zshenv', '~/.zshrc', '~/.zlogin',
+            '~/.cshrc', '~/.tcshrc', '~/.login', '~/.config/fish/config.fish']
+
+
+class LoginPath:
+    r"""
+    The ``PATH`` that a login shell would set, as needed when iMolpro is started from a desktop launcher rather than
+    from a shell.
+
+    Starting a login shell can take seconds when its start-up files are heavy, so the result is kept in a cache file,
+    valid as long as the shell, the modification times of the shell start-up files and the inherited ``PATH`` are the
+    same as when it was made. A stale cached value can be used straight away while a fresh one is found in the
+    background.
+    """
+
+    def __init__(self, shell, cache_file, inherited_path=None, timeout=30):
+        self.shell = shell
+        self.cache_file = str(cache_file)
+        self.inherited_path = inherited_path if inherited_path is not None else os.environ.get('PATH', '')
+        self.timeout = timeout
+        self.thread = None
+
+    def key(self):
+        mtimes = {}
+        for file in rc_files:
+            try:
+                mtimes[file] = os.stat(os.path.expanduser(file)).st_mtime_ns
+            except OSError:
+                pass
+        return {'shell': self.shell, 'rc_files': mtimes, 'PATH': self.inherited_path}
+
+    def cached(self):
+        r"""
+        :return: The cached login ``PATH`` and whether it is still valid, or None if there is no cached value
+        :rtype: (str, bool)
+        """
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            return cache['path'], cache['key'] == self.key()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def query(self):
+        r"""
+        Run the login shell to find its ``PATH``, and store the result in the cache
+
+        :return: The login ``PATH``
+        :rtype: str
+        """
+        key = self.key()
+        result = subprocess.run([self.shell, '-l', '-c', 'echo $PATH'], stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout,
+                                env=dict(os.environ, PATH=self.inherited_path))  # as in the cache key
+        path = result.stdout.decode(errors='replace').strip().splitlines()[-1] if result.stdout.strip() else ''
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temporary = self.cache_file + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump({'key': key, 'path': path}, f)
+            os.replace(temporary, self.cache_file)
+        except OSError as e:
+            logger.warning('Cannot write ' + self.cache_file + ': ' + str(e))
+        return path
+
+    def path(self):
+        r"""
+        The login ``PATH``, from the cache if there is a cached value, even a stale one, or otherwise by running the
+        login shell
+
+        :return: The login ``PATH``, and whether it needs to be refreshed
+        :rtype: (str, bool)
+        """
+        cached = self.cached()
+        if cached is not None:
+            return cached[0], not cached[1]
+        return self.query(), False
+
+    def refresh_in_background(self, callback=None):
+        r"""
+        Run the login shell in a background thread
+
+        :param callback: Called, in the background thread, with the old and new login ``PATH`` if it has changed
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        cached = self.cached()
+        old = cached[0] if cached is not None else None
+
+        def refresh():
+            try:
+                new = self.query()
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning('Cannot find login shell PATH: ' + str(e))
+                return
+            logger.debug('login shell PATH refreshed')
+            if new != old and callback is not None:
+                callback(old, new)
+
+        self.thread = threading.Thread(target=refresh, name='LoginPath', daemon=True)
+        self.thread.start()
+
+
+_login_path = None
+
+
+def login_path():
+    r"""
+    The login ``PATH`` cache for the user's shell, or None if there is no shell to consult
+    """
+    global _login_path
+    if _login_path is None and 'SHELL' in os.environ and 'PATH' in os.environ:
+        from settings import settings
+        _login_path = LoginPath(os.environ['SHELL'], pathlib.Path(settings.filename).parent / 'login_path.json')
+    return _login_path
+
+
+def set_login_path(old, new):
+    r"""
+    Put a new login ``PATH`` in the environment in place of the old one
+    """
+    if old and old in os.environ['PATH']:
+        os.environ['PATH'] = os.environ['PATH'].replace(old, new, 1)
+    else:
+        os.environ['PATH'] = new + os.pathsep + os.environ['PATH']
+
+
+def refresh_login_path():
+    r"""
+    Find the login ``PATH`` again in the background, and update the environment when it arrives
+    """
+    if login_path() is not None:
+        login_path().refresh_in_background(_updated)
+
+
+def _updated(old, new):
+    set_login_path(old, new)
+    from tool_discovery import tool_discovery
+    tool_discovery().rescan()
@@ -0,0 +1,61 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from login_environment import LoginPath, set_login_path
+
+
+@pytest.fixture
+def fake_shell(tmpdir):
+    if sys.platform.startswith('win'):
+        pytest.skip('the login shell is not consulted on Windows')
+    shell = tmpdir / 'fake-shell'
+    with open(shell, 'w') as f:
+        f.write('#!/bin/sh\necho "banner from rc file"\necho "/login/bin:/opt/bin"\necho called >> ' + str(
+            tmpdir / 'calls') + '\n')
+    os.chmod(shell, stat.S_IRWXU)
+    yield str(shell), tmpdir
+
+
+def calls(tmpdir):
+    with open(tmpdir / 'calls', 'r') as f:
+        return len(f.readlines())
+
+
+def test_cache(fake_shell):
+    shell, tmpdir = fake_shell
+    login_path = LoginPath(shell, tmpdir / 'cache.json', inherited_path='/usr/bin')
+    assert login_path.cached() is None
+    assert login_path.path() == ('/login/bin:/opt/bin', False)
+    assert calls(tmpdir) == 1
+    assert LoginPath(shell, tmpdir / 'cache.json', inherited_path='/usr/bin').path() == ('/login/bin:/opt/bin', False)
+    assert calls(tmpdir) == 1
+    assert LoginPath(shell, tmpdir / 'cache.json', inherited_path='/bin').path() == ('/login/bin:/opt/bin', True)
+    assert calls(tmpdir) == 1
+
+    changes = []
+    login_path.refresh_in_background(lambda old, new: changes.append((old, new)))
+    login_path.thread.join()
+    assert calls(tmpdir) == 2
+    assert changes == []
+
+
+def test_inherited_path(tmpdir):
+    if sys.platform.startswith('win'):
+        pytest.skip('the login shell is not consulted on Windows')
+    shell = tmpdir / 'profile-shell'
+    with open(shell, 'w') as f:
+        f.write('#!/bin/sh\necho "/profile/bin:$PATH"\n')
+    os.chmod(shell, stat.S_IRWXU)
+    login_path = LoginPath(str(shell), tmpdir / 'cache.json', inherited_path='/usr/bin:/bin')
+    assert login_path.query() == '/profile/bin:/usr/bin:/bin'
+
+
+def test_set_login_path(monkeypatch):
+    monkeypatch.setenv('PATH', os.pathsep.join(['/shim', '/old/bin', '/usr/bin']))
+    set_login_path('/old/bin', '/new/bin')
+    assert os.environ['PATH'] == os.pathsep.join(['/shim', '/new/bin', '/usr/bin'])
+    set_login_path(None, '/first/bin')
+    assert os.environ['PATH'].startswith('/first/bin' + os.pathsep)
@@ -1,3 +1,4 @@
+import copy
 import logging
 import os
 import pathlib
@@ -40,6 +41,7 @@ job_type_steps = {
     'Hessian': [{'command': 'frequencies', 'directives': [{'command': 'thermo'}]}],
 }
 job_type_steps['Optimise + vib frequencies'] = job_type_steps['Geometry optimisation'] + job_type_steps['Hessian']
+job_type_commands = [s['command'].lower() for t in job_type_steps.values() for s in t]
 job_type_aliases = {
     '{optg}': 'optg',
     '{freq}': 'frequencies',
@@ -65,12 +67,159 @@ initial_orbital_methods = ['HF', 'KS']
 
 supported_methods = []
 
+basis_quality_patterns = {q: re.compile(r'.*V\(?.*' + l, flags=re.IGNORECASE) for q, l in
+                          {2: 'D', 3: 'T', 4: 'Q', 5: '5', 6: '6', 7: '7'}.items()}
+
+
+def _tracked(value, root):
+    if isinstance(value, (_TrackedDict, _TrackedList)) and value.root is root:
+        return value
+    if isinstance(value, dict):
+        return _TrackedDict(value, root)
+    if isinstance(value, list):
+        return _TrackedList(value, root)
+    return value
+
+
+class _TrackedDict(dict):
+    r"""
+    A dict that counts changes to itself and to the dicts and lists inside it, in the ``version`` of the outermost
+    one, so that values derived from the contents can be cached until the next change. Copies are plain dicts.
+    """
+
+    def __init__(self, items=(), root=None):
+        super().__init__()
+        self.root = self if root is None else root
+        self.version = 0
+        for key, value in dict(items).items():
+            dict.__setitem__(self, key, _tracked(value, self.root))
+
+    def changed(self):
+        self.root.version += 1
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, _tracked(value, self.root))
+        self.changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, _tracked(value, self.root))
+        self.changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        self.changed()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.changed()
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self.changed()
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {copy.deepcopy(key, memo): copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class _TrackedList(list):
+    r"""
+    A list inside a :class:`_TrackedDict`, that counts changes in the ``version`` of the outermost dict
+    """
+
+    def __init__(self, items=(), root=None):
+        super().__init__(_tracked(value, root) for value in items)
+        self.root = root
+
+    def changed(self):
+        self.root.version += 1
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, [_tracked(v, self.root) for v in value] if isinstance(index, slice) else
+                         _tracked(value, self.root))
+        self.changed()
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self.changed()
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self.changed()
+        return self
+
+    def append(self, value):
+        list.append(self, _tracked(value, self.root))
+        self.changed()
+
+    def extend(self, values):
+        list.extend(self, [_tracked(value, self.root) for value in values])
+        self.changed()
+
+    def insert(self, index, value):
+        list.insert(self, index, _tracked(value, self.root))
+        self.changed()
+
+    def remove(self, value):
+        list.remove(self, value)
+        self.changed()
+
+    def pop(self, *args):
+        self.changed()
+        return list.pop(self, *args)
+
+    def clear(self):
+        list.clear(self)
+        self.changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self.changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self.changed()
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
 
 class InputSpecification(UserDict):
     hartree_fock_methods = ['RHF', 'RKS', 'UHF', 'UKS', 'LDF-RHF', 'LDF-UHF']
 
     def __init__(self, input=None, allowed_methods=[], debug=False, specification=None, directory=None):
         super(InputSpecification, self).__init__()
+        self.data = _TrackedDict()
+        self.derived_cache = {}
         self.allowed_methods = list(set(allowed_methods).union(set(supported_methods)))
         self.directory = directory
         # print('self.allowed_methods',self.allowed_methods)
@@ -410,6 +559,32 @@ class InputSpecification(UserDict):
     #             # print('removing', step)
     #             del self['steps'][step]
 
+    def derived(self, name, evaluate, file=None):
+        r"""
+        Evaluate a property derived from the specification, or take it from the cache if neither the specification nor
+        the file that it depends on have changed since it was last evaluated
+
+        :param name: The name of the property
+        :param evaluate: Function that evaluates the property
+        :param file: A file that the property depends on
+        :return: The property
+        """
+        data = self.data
+        if not isinstance(data, _TrackedDict):  # replaced, eg by UserDict.copy()
+            return evaluate()
+        key = data.version
+        if file is not None:
+            try:
+                stat = os.stat(file)
+                key = (key, str(file), stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                key = (key, str(file))
+        if name in self.derived_cache and self.derived_cache[name][0] is data and self.derived_cache[name][1] == key:
+            return self.derived_cache[name][2]
+        value = evaluate()
+        self.derived_cache[name] = (data, key, value)
+        return value
+
     @property
     def job_type(self):
         r"""
@@ -417,17 +592,21 @@ class InputSpecification(UserDict):
         :return: job type, or None if the input is complex
         :rtype: str
         """
-        for job_type_ in job_type_steps:
-            ok = True
-            last_idx = None
-            for step in job_type_steps[job_type_]:
-                commands = [s['command'].lower() for s in self['steps']]
-                idx = commands.index(step['command'].lower()) if step['command'].lower() in commands else -1
-                if idx < 0 or (last_idx is not None and last_idx != idx - 1):
-                    ok = False
-                last_idx = idx
-            if ok: job_type = job_type_
-        return job_type
+
+        def evaluate():
+            commands = [s['command'].lower() for s in self['steps']]
+            for job_type_ in job_type_steps:
+                ok = True
+                last_idx = None
+                for step in job_type_steps[job_type_]:
+                    idx = commands.index(step['command'].lower()) if step['command'].lower() in commands else -1
+                    if idx < 0 or (last_idx is not None and last_idx != idx - 1):
+                        ok = False
+                    last_idx = idx
+                if ok: job_type = job_type_
+            return job_type
+
+        return self.derived('job_type', evaluate)
 
     @job_type.setter
     def job_type(self, new_job_type):
@@ -452,18 +631,20 @@ class InputSpecification(UserDict):
         :return: If the input implements a single method, its command name. Otherwise, None
         :rtype: str
         """
-        methods = []
-        if 'steps' in self:
-            for i in range(len(self['steps'])):
-                command = self['steps'][i]['command'].lower()
-                if command not in [s['command'].lower() for t in job_type_steps.values() for s in t]:
-                    methods.append(command)
-                    if command not in [m.lower() for m in self.hartree_fock_methods] and methods[0] in [m.lower() for m
-                                                                                                        in
-                                                                                                        self.hartree_fock_methods]:
-                        del methods[0]
-        # print('methods',methods)
-        if len(methods) == 1: return methods[0]
+
+        def evaluate():
+            methods = []
+            if 'steps' in self:
+                for i in range(len(self['steps'])):
+                    command = self['steps'][i]['command'].lower()
+                    if command not in job_type_commands:
+                        methods.append(command)
+                        if command not in hartree_fock_commands and methods[0] in hartree_fock_commands:
+                            del methods[0]
+            if len(methods) == 1: return methods[0]
+
+        hartree_fock_commands = [m.lower() for m in self.hartree_fock_methods]
+        return self.derived('method', evaluate)
 
     @method.setter
     def method(self, method):
@@ -487,11 +668,16 @@ class InputSpecification(UserDict):
     def method_options(self):
         r"""Get the options for a single-method job
         """
-        if 'steps' in self:
-            for step in self['steps']:
-                if self.method == step['command'] and 'options' in step:
-                    return step['options']
-        return []
+
+        def evaluate():
+            if 'steps' in self:
+                method = self.method
+                for step in self['steps']:
+                    if method == step['command'] and 'options' in step:
+                        return step['options']
+
+        options = self.derived('method_options', evaluate)
+        return options if options is not None else []
 
     @method_options.setter
     def method_options(self, options):
@@ -512,19 +698,21 @@ class InputSpecification(UserDict):
 
     @property
     def basis_quality(self):
-        quality_letters = {2: 'D', 3: 'T', 4: 'Q', 5: '5', 6: '6', 7: '7'}
-        if 'basis' in self:
-            bases = [self['basis']['default']]
-            if 'elements' in self['basis']: bases += self['basis']['elements'].values()
-            qualities = []
-            for basis in bases:
-                quality = 0
-                for q, l in quality_letters.items():
-                    if re.match(r'.*V\(?.*' + l, basis, flags=re.IGNORECASE): quality = q
-                qualities.append(quality)
-            if all(quality == qualities[0] for quality in qualities):
-                return qualities[0]
-        return 0
+        def evaluate():
+            if 'basis' in self:
+                bases = [self['basis']['default']]
+                if 'elements' in self['basis']: bases += self['basis']['elements'].values()
+                qualities = []
+                for basis in bases:
+                    quality = 0
+                    for q, pattern in basis_quality_patterns.items():
+                        if pattern.match(basis): quality = q
+                    qualities.append(quality)
+                if all(quality == qualities[0] for quality in qualities):
+                    return qualities[0]
+            return 0
+
+        return self.derived('basis_quality', evaluate)
 
     @property
     def basis_hamiltonian(self):
@@ -539,10 +727,14 @@ class InputSpecification(UserDict):
 
     @property
     def density_functional(self):
-        if self.method is not None and self.method.lower() in [m.lower() for m in
-                                                               self.hartree_fock_methods] and 'ks' in self.method.lower():
-            if self.method_options is not None and self.method_options:
-                return self.method_options[0].upper()
+        def evaluate():
+            method = self.method
+            if method is not None and method.lower() in [m.lower() for m in
+                                                         self.hartree_fock_methods] and 'ks' in method.lower():
+                if self.method_options is not None and self.method_options:
+                    return self.method_options[0].upper()
+
+        return self.derived('density_functional', evaluate)
 
     @density_functional.setter
     def density_functional(self, density_functional):
@@ -560,18 +752,18 @@ class InputSpecification(UserDict):
         :return:
         :rtype: int
         """
-        # TODO set up a cache if input has not changed and geometry file has not changed
-        from defbas import periodic_table
         if 'geometry' not in self: return 0
-        # print('enter open_shell_electrons')
-        if 'geometry_external' in self and self['geometry_external']:
-            # print('geometry',self['geometry'])
-            # print('directory',self.directory)
-            # print(pathlib.Path(self.directory if self.directory is not None else '.') / self['geometry'])
+        geometry_file = pathlib.Path(self.directory if self.directory is not None else '.') / self['geometry'] if (
+                'geometry_external' in self and self['geometry_external']) else None
+        return self.derived('open_shell_electrons', lambda: self.evaluate_open_shell_electrons(geometry_file),
+                            geometry_file)
+
+    def evaluate_open_shell_electrons(self, geometry_file):
+        from defbas import periodic_table, atomic_numbers
+        if geometry_file is not None:
             try:
-                with open(pathlib.Path(self.directory if self.directory is not None else '.') / self['geometry'],
-                          'r') as f:
-                    geometry = ''.join(f.readlines())
+                with open(geometry_file, 'r') as f:
+                    geometry = f.read()
             except:
                 return 0
         else:
@@ -586,7 +778,7 @@ class InputSpecification(UserDict):
             if line_number >= start_line and line.strip():
                 word = line.strip().replace(' ', ',').split(',')[0]
                 word = re.sub(r'\d.*$', '', word[0].upper() + word[1:].lower())
-                atomic_number = periodic_table.index(word) + 1
+                atomic_number = atomic_numbers[word] if word in atomic_numbers else periodic_table.index(word) + 1
                 total_nuclear_charge += atomic_number
         charge = int(self['variables']['charge']) if 'variables' in self and 'charge' in self['variables'] and \
                                                      self['variables']['charge'] != '' and self['variables'][
@@ -749,3 +941,212 @@ def equivalent(input1, input2, debug=False):
         logger.debug('equivalent: canonicalise(input2)=', canonicalise(input2))
         logger.debug('will return this', canonicalise(input1).lower() == canonicalise(input2).lower())
     return canonicalise(input1).lower() == canonicalise(input2).lower()
+
+
+default_methods = ['RHF', 'UHF', 'RKS', 'UKS', 'HF', 'KS', 'MP2', 'RMP2', 'UMP2', 'CCSD', 'CCSD(T)', 'UCCSD',
+                   'UCCSD(T)', 'RCCSD', 'RCCSD(T)', 'QCISD', 'QCISD(T)', 'BCCD', 'BCCD(T)', 'CASSCF', 'MCSCF', 'MRCI',
+                   'RS2', 'RS2C', 'CIS', 'EOM', 'LMP2', 'LCCSD', 'LCCSD(T)', 'PNO-LMP2', 'PNO-LCCSD', 'PNO-LCCSD(T)',
+                   'OPTG', 'FREQUENCIES', 'THERMO', 'OCC']
+
+
+def read_records(paths):
+    r"""
+    Read the inputs or specifications to be processed from the command line
+
+    :param paths: Files of JSON lines (``-`` for standard input), YAML files, directories of ``.inp`` files, or
+        individual ``.inp`` files. A JSON or YAML record is a mapping with either ``input``, the text of a Molpro input,
+        or ``specification``, a mapping as held by :class:`InputSpecification`, or is itself such a specification;
+        it may have an ``id``.
+    :return: Generator of records, each a dict with ``id`` and one of ``input`` or ``specification``
+    """
+    import json
+    import sys
+
+    def record(item, default_id):
+        if not isinstance(item, dict):
+            return {'id': default_id, 'error': 'record is not a mapping'}
+        result = {'id': str(item['id']) if 'id' in item else default_id}
+        if 'input' in item:
+            result['input'] = item['input']
+        elif 'specification' in item:
+            result['specification'] = item['specification']
+        else:
+            result['specification'] = {k: v for k, v in item.items() if k != 'id'}
+        return result
+
+    for path in paths:
+        if path != '-' and os.path.isdir(path):
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories.sort()
+                for file in sorted(files):
+                    if file.endswith('.inp'):
+                        file = os.path.join(directory, file)
+                        with open(file, 'r') as f:
+                            yield {'id': file, 'input': f.read()}
+        elif path.endswith('.inp'):
+            with open(path, 'r') as f:
+                yield {'id': path, 'input': f.read()}
+        elif path.endswith('.yaml') or path.endswith('.yml'):
+            import yaml
+            with open(path, 'r') as f:
+                for number, document in enumerate(yaml.safe_load_all(f)):
+                    for index, item in enumerate(document if isinstance(document, list) else [document]):
+                        yield record(item, path + ':' + str(number) + ':' + str(index))
+        else:
+            f = sys.stdin if path == '-' else open(path, 'r')
+            try:
+                for number, line in enumerate(f):
+                    if line.strip():
+                        try:
+                            yield record(json.loads(line), path + ':' + str(number + 1))
+                        except ValueError as e:
+                            yield {'id': path + ':' + str(number + 1), 'error': 'invalid JSON: ' + str(e)}
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+
+
+def validate(specification):
+    r"""
+    :return: The reasons why a specification cannot be made into a job for guided mode
+    :rtype: list
+    """
+    errors = []
+    if not len(specification):
+        return ['input could not be parsed']
+    if 'geometry' not in specification or not specification['geometry']:
+        errors.append('no geometry')
+    if 'basis' not in specification or 'default' not in specification['basis'] or not specification['basis'][
+        'default']:
+        errors.append('no basis')
+    if specification.get('hamiltonian') not in hamiltonians:
+        errors.append('unknown hamiltonian ' + str(specification.get('hamiltonian')))
+    if 'steps' not in specification or not specification['steps']:
+        errors.append('no calculation steps')
+    else:
+        allowed = [m.lower() for m in specification.allowed_methods + specification.hartree_fock_methods]
+        for step in specification['steps']:
+            command = re.sub('^df-', '', step['command'].lower())
+            if command not in allowed and command not in job_type_commands:
+                errors.append('unknown method ' + step['command'])
+    return errors
+
+
+def process_record(record):
+    r"""
+    Take one record through parsing, validation, generation of the input, and a check that the generated input is
+    equivalent to the original
+
+    :param record: As given by :func:`read_records`
+    :return: The result, with ``id``, ``ok``, ``input``, ``errors``, ``equivalent``, ``method`` and ``job_type``
+    :rtype: dict
+    """
+    import contextlib
+    import io
+    result = {'id': record['id'], 'ok': False, 'input': None, 'errors': [], 'equivalent': None, 'method': None,
+              'job_type': None}
+    if 'error' in record:
+        result['errors'].append(record['error'])
+        return result
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            if 'input' in record:
+                specification = InputSpecification(record['input'])
+            else:
+                specification = InputSpecification(specification=record['specification'])
+            result['errors'] += validate(specification)
+            result['input'] = specification.input()
+            result['method'] = specification.method
+            result['job_type'] = specification.job_type if 'steps' in specification else None
+            original = record['input'] if 'input' in record else result['input']
+            result['equivalent'] = equivalent(original, InputSpecification(result['input']))
+            if not result['equivalent']:
+                result['errors'].insert(0, 'input cannot be represented in guided mode')
+    except Exception as e:
+        result['errors'].append(type(e).__name__ + ': ' + str(e))
+    if messages.getvalue().strip():
+        result['errors'].append(messages.getvalue().strip())
+    result['ok'] = not result['errors']
+    return result
+
+
+def _initialise_worker(methods):
+    global supported_methods
+    supported_methods = methods
+
+
+def main(argv=None):
+    r"""
+    Command-line entry point: ``python -m molpro_input --help``
+    """
+    import argparse
+    import json
+    import multiprocessing
+    import sys
+    import time
+    parser = argparse.ArgumentParser(prog='python -m molpro_input',
+                                     description='Parse, validate and regenerate Molpro inputs for guided mode.')
+    parser.add_argument('paths', nargs='+',
+                        help='Files of JSON lines (- for standard input), YAML files, .inp files, or directories '
+                             'searched for .inp files')
+    parser.add_argument('-o', '--output', default='-', help='File for the results as JSON lines (default stdout)')
+    parser.add_argument('-w', '--write-inputs', metavar='DIRECTORY',
+                        help='Write each generated input into this directory')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes (default: number of CPUs; 1 to work in this process)')
+    parser.add_argument('-m', '--methods', default=','.join(default_methods),
+                        help='Comma-separated methods that are recognised (default: %(default)s)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Do not write the summary to stderr')
+    args = parser.parse_args(argv)
+
+    methods = [m.strip().upper() for m in args.methods.split(',') if m.strip()]
+    if args.write_inputs:
+        os.makedirs(args.write_inputs, exist_ok=True)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    summary = {'records': 0, 'ok': 0, 'failed': 0, 'not_equivalent': 0, 'invalid': 0}
+    start = time.perf_counter()
+    pool = None
+    methods_ = supported_methods
+    try:
+        records = read_records(args.paths)
+        if args.jobs == 1:
+            _initialise_worker(methods)
+            results = map(process_record, records)
+        else:
+            pool = multiprocessing.Pool(args.jobs, initializer=_initialise_worker, initargs=(methods,))
+            results = pool.imap(process_record, records, chunksize=16)
+        for result in results:
+            summary['records'] += 1
+            if result['ok']:
+                summary['ok'] += 1
+            elif result['input'] is None:
+                summary['failed'] += 1
+            elif result['equivalent'] is False:
+                summary['not_equivalent'] += 1
+            else:
+                summary['invalid'] += 1
+            if args.write_inputs and result['input'] is not None:
+                name = re.sub(r'[^\w.-]+', '_', os.path.splitext(os.path.basename(result['id']))[0]
+                              if result['id'].endswith('.inp') else result['id']).strip('_') or 'input'
+                with open(os.path.join(args.write_inputs, name + '.inp'), 'w') as f:
+                    f.write(result['input'])
+            output.write(json.dumps(result) + '\n')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _initialise_worker(methods_)
+        if output is not sys.stdout:
+            output.close()
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    if not args.quiet:
+        sys.stderr.write(' '.join(k + '=' + str(v) for k, v in summary.items()) + '\n')
+    return 0 if summary['ok'] == summary['records'] else 1
+
+
+if __name__ == '__main__':
+    import sys
+    import molpro_input
+
+    sys.exit(molpro_input.main())
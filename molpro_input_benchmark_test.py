@@ -0,0 +1,140 @@
+r"""
+Performance benchmarks for parsing, generating, canonicalising and comparing inputs with molpro_input.
+
+Times are measured with pytest-benchmark, and the peak memory allocated by one call with tracemalloc. Each time is
+divided by the time of a fixed pure-python reference calculation on the same machine, and compared with the
+stored baseline in molpro_input_benchmark_baseline.json; a test fails if it is slower than the baseline by more than
+MOLPRO_INPUT_BENCHMARK_THRESHOLD (default 3), or allocates more than MOLPRO_INPUT_BENCHMARK_MEMORY_THRESHOLD
+(default 1.5) times the baseline. Set MOLPRO_INPUT_BENCHMARK_UPDATE=1 to store the results as the new baseline.
+"""
+import json
+import os
+import pathlib
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import molpro_input
+from molpro_input import InputSpecification, canonicalise, equivalent
+
+baseline_file = pathlib.Path(__file__).parent / 'molpro_input_benchmark_baseline.json'
+threshold = float(os.environ.get('MOLPRO_INPUT_BENCHMARK_THRESHOLD', '3'))
+memory_threshold = float(os.environ.get('MOLPRO_INPUT_BENCHMARK_MEMORY_THRESHOLD', '1.5'))
+update_baseline = bool(os.environ.get('MOLPRO_INPUT_BENCHMARK_UPDATE'))
+
+
+def generated_geometry(atoms):
+    elements = ['C', 'H', 'O', 'N', 'H', 'H']
+    return '\n'.join([str(atoms), 'generated'] + [
+        '{} {:.6f} {:.6f} {:.6f}'.format(elements[i % len(elements)], 1.1 * (i % 10), 1.3 * ((i // 10) % 10),
+                                         1.5 * (i // 100)) for i in range(atoms)])
+
+
+def generated_input(atoms, steps):
+    body = ['{rks,b3lyp}', 'ccsd', '{optg,savexyz=optimised.xyz}', '{frequencies\nthermo}']
+    return ('geometry={\n' + generated_geometry(atoms) + '\n}\nbasis={default=cc-pVTZ,h=cc-pVDZ}\n' +
+            '\n'.join(body[i % len(body)] for i in range(steps)) + '\n')
+
+
+corpus = {
+    'tiny': 'geometry={He}\nhf\n',
+    'water': 'geometry={O;H,O,0.96;H,O,0.96,H,104.5}\nbasis=cc-pVTZ\n{rhf}\nccsd(t)\n',
+    'hundred_atoms': generated_input(100, 4),
+    'thousand_atoms': generated_input(1000, 8),
+    'three_thousand_atoms': generated_input(3000, 16),
+}
+timed_cases = ['hundred_atoms', 'thousand_atoms', 'three_thousand_atoms']  # the others are too quick to time reliably
+
+
+def prepare(operation, text):
+    r"""
+    :return: The function to benchmark, and its arguments
+    """
+    if operation == 'parse':
+        return InputSpecification, (text,)
+    if operation == 'input':
+        return InputSpecification(text).input, ()
+    if operation == 'canonicalise':
+        return canonicalise, (text,)
+    if operation == 'equivalent':
+        return equivalent, (text, InputSpecification(text).input())
+
+
+def reference_time(repeat=5):
+    r"""
+    Time of a fixed calculation, used to make the benchmark times comparable between machines
+    """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        sum(i * i for i in range(100000))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_allocation(function, args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return reference_time()
+
+
+@pytest.fixture(scope='module')
+def baseline():
+    try:
+        with open(baseline_file, 'r') as f:
+            baseline_ = json.load(f)
+    except FileNotFoundError:
+        baseline_ = {}
+    results = {}
+    yield baseline_, results
+    if update_baseline and results:
+        with open(baseline_file, 'w') as f:
+            json.dump(dict(baseline_, **results), f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+@pytest.fixture(autouse=True)
+def methods(monkeypatch):
+    monkeypatch.setattr(molpro_input, 'supported_methods',
+                        ['RHF', 'CCSD', 'CCSD(T)', 'RKS', 'CASSCF', 'MRCI', 'UHF', 'UKS', 'OCC', 'OPTG', 'FREQUENCIES', 'THERMO'])
+
+
+@pytest.mark.parametrize('case', list(corpus.keys()))
+@pytest.mark.parametrize('operation', ['parse', 'input', 'canonicalise', 'equivalent'])
+def test_benchmark(benchmark, reference, baseline, operation, case):
+    baseline_, results = baseline
+    key = operation + '/' + case
+    function, args = prepare(operation, corpus[case])
+    benchmark.group = operation
+    result = benchmark(function, *args)
+    if operation == 'equivalent':
+        assert result
+
+    peak = peak_allocation(function, args)
+    benchmark.extra_info['peak_allocation_bytes'] = peak
+    results[key] = {'peak_allocation_bytes': peak}
+    if key in baseline_ and not update_baseline:
+        assert peak <= baseline_[key]['peak_allocation_bytes'] * memory_threshold + 1024, (
+                key + ' allocates ' + str(peak) + ' bytes, more than ' + str(memory_threshold) +
+                ' times the baseline ' + str(baseline_[key]['peak_allocation_bytes']))
+
+    if benchmark.stats is None or case not in timed_cases:
+        return
+    relative_time = benchmark.stats.stats.median / reference
+    benchmark.extra_info['relative_time'] = relative_time
+    results[key]['relative_time'] = relative_time
+    if key in baseline_ and 'relative_time' in baseline_[key] and not update_baseline:
+        assert relative_time <= baseline_[key]['relative_time'] * threshold, (
+                key + ' takes ' + str(relative_time) + ' reference times, more than ' + str(threshold) +
+                ' times the baseline ' + str(baseline_[key]['relative_time']))
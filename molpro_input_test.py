@@ -268,3 +268,86 @@ def test_open_shell_electrons(methods, tmpdir):
         specification = InputSpecification(re.sub('{.*}', str(open_shell_xyz_file), test))
         assert specification.open_shell_electrons == outcome
         os.remove(open_shell_xyz_file)
+
+
+def test_derived_properties_cached(methods, tmpdir):
+    import copy
+    specification = InputSpecification('geometry={He}\nbasis=cc-pVDZ\nrks,b3lyp\nccsd\n')
+    assert specification.method == 'ccsd'
+    version = specification.data.version
+    for i in range(3):
+        assert specification.method == 'ccsd'
+        assert specification.basis_quality == 2
+        assert specification.open_shell_electrons == 0
+    assert specification.data.version == version  # reading does not change anything
+    specification['steps'][1]['command'] = 'mrci'  # changes inside nested containers are noticed
+    assert specification.method == 'mrci'
+    specification['steps'].pop()
+    assert specification.method == 'rks'
+    assert specification.density_functional == 'B3LYP'
+    specification.method_options[0] = 'pbe'
+    assert specification.density_functional == 'PBE'
+    specification['basis']['default'] = 'cc-pVTZ'
+    assert specification.basis_quality == 3
+    specification.data.clear()
+    assert specification.method is None
+
+    copied = copy.deepcopy(specification.data)
+    assert type(copied) is dict
+    specification = InputSpecification('geometry={Li}\nhf\n')
+    assert type(copy.deepcopy(specification['steps'])) is list
+    assert copy.deepcopy(specification) == specification
+    assert specification.copy() == specification
+    assert specification.copy().open_shell_electrons == 1
+
+
+def test_open_shell_electrons_follows_geometry_file(methods, tmpdir):
+    geometry_file = tmpdir / 'cached.xyz'
+    with open(geometry_file, 'w') as f:
+        f.write('1\n\nLi 0 0 0\n')
+    specification = InputSpecification('geometry=cached.xyz\nhf\n', directory=str(tmpdir))
+    assert specification.open_shell_electrons == 1
+    assert specification.spin == -1
+    with open(geometry_file, 'w') as f:
+        f.write('2\n\nLi 0 0 0\nH 1 0 0\n')
+    assert specification.open_shell_electrons == 0
+    assert specification.spin == -2
+    os.remove(geometry_file)
+    assert specification.open_shell_electrons == 0
+
+
+def test_command_line(tmpdir, capsys):
+    import json
+    import molpro_input
+    directory = tmpdir / 'inputs'
+    directory.mkdir()
+    with open(directory / 'ok.inp', 'w') as f:
+        f.write('geometry={He}\nbasis=cc-pVTZ\nrhf\nccsd\n')
+    with open(directory / 'nobasis.inp', 'w') as f:
+        f.write('geometry={He}\nrhf\n')
+    with open(directory / 'complex.inp', 'w') as f:
+        f.write('geometry={He}\nbasis=cc-pVTZ\ndo i=1,3\nrhf\nenddo\n')
+    records = tmpdir / 'records.jsonl'
+    with open(records, 'w') as f:
+        f.write(json.dumps({'id': 'neon', 'input': 'geometry={Ne}\nbasis=cc-pVDZ\nrhf\nmp2\n'}) + '\n')
+        f.write(json.dumps({'geometry': 'He', 'basis': {'default': 'cc-pVDZ'}, 'steps': [{'command': 'uhf'}],
+                            'hamiltonian': 'AE'}) + '\n')
+        f.write('not json\n')
+    for jobs in ['1', '2']:
+        output = tmpdir / ('results' + jobs + '.jsonl')
+        assert molpro_input.main([str(directory), str(records), '-j', jobs, '-o', str(output),
+                                  '-w', str(tmpdir / 'generated')]) == 1
+        with open(output, 'r') as f:
+            results = {result['id']: result for result in (json.loads(line) for line in f)}
+        assert len(results) == 6
+        assert results[str(directory / 'ok.inp')]['ok']
+        assert results[str(directory / 'ok.inp')]['method'] == 'ccsd'
+        assert results[str(directory / 'nobasis.inp')]['errors'] == ['no basis']
+        assert not results[str(directory / 'complex.inp')]['equivalent']
+        assert results['neon']['ok'] and results['neon']['method'] == 'mp2'
+        assert results[str(records) + ':2']['ok']
+        assert results[str(records) + ':2']['input'] == 'geometry={\nHe\n}\nbasis=cc-pVDZ\n{uhf}\n'
+        assert 'invalid JSON' in results[str(records) + ':3']['errors'][0]
+        assert 'records=6 ok=3 failed=1 not_equivalent=1 invalid=1' in capsys.readouterr().err
+    assert (tmpdir / 'generated' / 'ok.inp').exists()
+    assert (tmpdir / 'generated' / 'neon.inp').exists()
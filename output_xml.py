@@ -0,0 +1,212 @@
+import logging
+import os
+import xml.etree.ElementTree
+
+logger = logging.getLogger(__name__)
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def property_value(text):
+    r"""
+    :return: The value of a property: a number, a list of numbers if there are several, or else the text itself
+    """
+    if text is None:
+        return None
+    try:
+        values = [float(field) for field in text.split()]
+    except ValueError:
+        return text
+    return values[0] if len(values) == 1 else values
+
+
+class ResultsXML:
+    r"""
+    The properties, job steps and final geometry in a molpro xml output file, found by a streaming parse that keeps
+    only what is extracted, so that memory does not grow with the size of the file.
+
+    The file may still be being written: an unclosed root element, or an element cut short at the end of the file, is
+    not an error. ``update()`` reads just what has been appended since the previous read.
+
+    ``properties`` and ``jobsteps`` are lists of rows, and ``table()`` gives either as a dictionary of columns, suitable
+    for ``pandas.DataFrame`` or ``numpy.array``.
+    """
+
+    property_columns = ['jobstep', 'command', 'name', 'method', 'principal', 'stateSymmetry', 'stateNumber', 'value']
+    jobstep_columns = ['index', 'command', 'commandset', 'parent', 'depth', 'start', 'end', 'cpu', 'system', 'real']
+
+    def __init__(self, xml_file, chunk_size=1 << 16):
+        self.xml_file = str(xml_file)
+        self.chunk_size = chunk_size
+        self.reset()
+        self.update()
+
+    def reset(self):
+        self.parser = xml.etree.ElementTree.XMLPullParser(events=('start', 'end'))
+        self.position = 0
+        self.signature = None
+        self.broken = False
+        self.properties = []
+        self.jobsteps = []
+        self.atoms = []
+        self.bonds = []
+        self.elements = []
+        self.open_jobsteps = []
+        self.molecule_atoms = []
+        self.molecule_bonds = []
+
+    def update(self):
+        r"""
+        Read what has been added to the file since it was last read, starting again if it has been replaced
+
+        :return: Whether anything new was read
+        :rtype: bool
+        """
+        try:
+            stat = os.stat(self.xml_file)
+        except OSError:
+            return False
+        if self.signature is not None and (stat.st_size < self.position or stat.st_ino != self.signature[0] or (
+                stat.st_size == self.position and stat.st_mtime_ns != self.signature[1])):
+            self.reset()  # replaced, not appended to
+        if stat.st_size == self.position:
+            return False
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        try:
+            with open(self.xml_file, 'rb') as f:
+                f.seek(self.position)
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    self.position += len(chunk)
+                    if not self.broken:
+                        self.parser.feed(chunk)
+                        self._handle(self.parser.read_events())
+        except OSError as e:
+            logger.debug('reading ' + self.xml_file + ': ' + str(e))
+        except (xml.etree.ElementTree.ParseError, ValueError) as e:
+            logger.debug('reading ' + self.xml_file + ': ' + str(e))
+            self.broken = True
+        return True
+
+    def _handle(self, events):
+        for event, element in events:
+            tag = local_name(element.tag)
+            if event == 'start':
+                self.elements.append(element)
+                if tag == 'jobstep':
+                    self.jobsteps.append({'index': len(self.jobsteps), 'command': element.get('command'),
+                                          'commandset': element.get('commandset'),
+                                          'parent': self.open_jobsteps[-1] if self.open_jobsteps else None,
+                                          'depth': len(self.open_jobsteps), 'start': None, 'end': None, 'cpu': None,
+                                          'system': None, 'real': None})
+                    self.open_jobsteps.append(len(self.jobsteps) - 1)
+                continue
+            self.elements.pop()
+            if tag == 'property':
+                jobstep = self.open_jobsteps[-1] if self.open_jobsteps else None
+                self.properties.append({'jobstep': jobstep,
+                                        'command': self.jobsteps[jobstep]['command'] if jobstep is not None else None,
+                                        'name': element.get('name'), 'method': element.get('method'),
+                                        'principal': element.get('principal') == 'true',
+                                        'stateSymmetry': element.get('stateSymmetry'),
+                                        'stateNumber': element.get('stateNumber'),
+                                        'value': property_value(element.get('value'))})
+            elif tag == 'time' and self.open_jobsteps:
+                jobstep = self.jobsteps[self.open_jobsteps[-1]]
+                jobstep.update(start=element.get('start'), end=element.get('end'))
+                for key in ('cpu', 'system', 'real'):
+                    jobstep[key] = property_value(element.get(key))
+            elif tag == 'jobstep' and self.open_jobsteps:
+                self.open_jobsteps.pop()
+            elif tag == 'atom' and element.get('x3') is not None:
+                self.molecule_atoms.append((element.get('id'), element.get('elementType'), float(element.get('x3')),
+                                            float(element.get('y3')), float(element.get('z3'))))
+            elif tag == 'bond' and element.get('atomRefs2'):
+                self.molecule_bonds.append(element.get('atomRefs2').split())
+            elif tag == 'molecule':
+                if self.molecule_atoms:
+                    ids = {atom[0]: i for i, atom in enumerate(self.molecule_atoms)}
+                    self.atoms = [atom[1:] for atom in self.molecule_atoms]
+                    self.bonds = [(ids[a], ids[b]) for a, b in self.molecule_bonds if a in ids and b in ids]
+                self.molecule_atoms = []
+                self.molecule_bonds = []
+            if self.elements:
+                self.elements[-1].remove(element)  # what is needed has been taken
+
+    def table(self, kind='properties'):
+        r"""
+        :param kind: 'properties' or 'jobsteps'
+        :return: The rows as a dictionary of columns
+        :rtype: dict
+        """
+        rows = self.properties if kind == 'properties' else self.jobsteps
+        columns = self.property_columns if kind == 'properties' else self.jobstep_columns
+        return {column: [row[column] for row in rows] for column in columns}
+
+    def values(self, name, principal=True):
+        r"""
+        :param name: Property name, eg 'Energy' or 'Dipole moment'
+        :param principal: Whether to take only the principal values
+        :return: The values of the property, in the order they appear in the output
+        :rtype: list
+        """
+        return [row['value'] for row in self.properties if
+                row['name'] == name and (row['principal'] or not principal)]
+
+    @property
+    def energy(self):
+        r"""
+        The last principal energy, or if there is none, the first energy
+        """
+        energies = self.values('Energy')
+        if energies:
+            return energies[-1]
+        energies = self.values('Energy', principal=False)
+        return energies[0] if energies else None
+
+    @property
+    def dipole(self):
+        r"""
+        The last principal dipole moment
+        """
+        dipoles = self.values('Dipole moment')
+        return dipoles[-1] if dipoles else None
+
+    @property
+    def cpu_time(self):
+        r"""
+        Total CPU time of the top-level job steps
+        """
+        return sum(jobstep['cpu'] for jobstep in self.jobsteps if jobstep['depth'] == 0 and jobstep['cpu'])
+
+
+_completion = {}
+
+
+def xml_complete(xml_file, tail=256):
+    r"""
+    Whether a molpro xml output file has been finished, judged by whether it ends with the closing root element. Only
+    the end of the file is read, and the answer is remembered until the file's size or modification time changes.
+
+    :param xml_file: The file
+    :param tail: Number of bytes read from the end
+    :rtype: bool
+    """
+    xml_file = str(xml_file)
+    try:
+        stat = os.stat(xml_file)
+    except OSError:
+        _completion.pop(xml_file, None)
+        return False
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if xml_file in _completion and _completion[xml_file][0] == signature:
+        return _completion[xml_file][1]
+    try:
+        with open(xml_file, 'rb') as f:
+            f.seek(max(0, stat.st_size - tail))
+            complete = f.read().rstrip().endswith(b'</molpro>')
+    except OSError:
+        return False
+    _completion[xml_file] = (signature, complete)
+    return complete
@@ -0,0 +1,86 @@
+import tracemalloc
+
+from output_xml import ResultsXML
+
+xml_file = 'malonaldehyde.molpro/run/13.molpro/13.xml'
+
+
+def test_results():
+    results = ResultsXML(xml_file)
+    assert abs(results.energy - -265.47202042161) < 1e-10
+    assert len(results.dipole) == 3
+    assert results.jobsteps[0]['command'] == 'RHF-SCF' and results.jobsteps[0]['real'] == 1.26
+    assert results.jobsteps[2]['parent'] == 1 and results.jobsteps[2]['depth'] == 1
+    assert results.cpu_time > 0
+    table = results.table()
+    assert set(table) == set(results.property_columns)
+    assert len(table['value']) == len(results.properties) == 182
+    assert table['name'][0] == 'Energy' and table['value'][0] == -265.383252898427
+    assert len(results.table('jobsteps')['cpu']) == len(results.jobsteps)
+    assert len(results.atoms) == 10 and results.atoms[0][0] == 'O'
+    assert not results.update()
+
+
+def test_growing_file(tmpdir):
+    with open(xml_file, 'rb') as f:
+        content = f.read()
+    file = tmpdir / 'growing.xml'
+    cut = content.index(b'value="-265.383252898427"/>') + 10  # inside the first energy
+    with open(file, 'wb') as f:
+        f.write(content[:cut])
+    results = ResultsXML(file, chunk_size=1000)
+    assert results.energy is None and len(results.atoms) == 10
+    with open(file, 'ab') as f:
+        f.write(content[cut:len(content) // 2])
+    assert results.update()
+    assert results.values('Energy')[0] == -265.383252898427
+    properties = len(results.properties)
+    with open(file, 'ab') as f:
+        f.write(content[len(content) // 2:content.rindex(b'</molpro>')])  # root not closed
+    assert results.update()
+    assert len(results.properties) > properties
+    assert results.properties == ResultsXML(xml_file).properties
+    with open(file, 'wb') as f:
+        f.write(content[:cut])
+    assert results.update() and results.energy is None  # rewritten from the start
+
+
+def test_memory(tmpdir):
+    with open(xml_file, 'rb') as f:
+        content = f.read()
+    head = content[:content.index(b'<jobstep')]
+    body = content[content.index(b'<jobstep'):content.rindex(b'</job>')]
+    overheads = []
+    for repeats in [5, 40]:
+        file = tmpdir / (str(repeats) + '.xml')
+        with open(file, 'wb') as f:
+            f.write(head + body * repeats)
+        tracemalloc.start()
+        results = ResultsXML(file)
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(results.properties) == repeats * 182
+        overheads.append(peak - size)
+    assert overheads[1] < 2 * overheads[0]  # beyond what is extracted, memory does not grow with the file
+
+
+def test_xml_complete(tmpdir, monkeypatch):
+    import builtins
+    import output_xml
+    assert output_xml.xml_complete(xml_file)
+    with open(xml_file, 'rb') as f:
+        content = f.read()
+    file = tmpdir / 'running.xml'
+    with open(file, 'wb') as f:
+        f.write(content[:content.rindex(b'</molpro>')])
+    assert not output_xml.xml_complete(file)
+    opened = []
+    real_open = builtins.open
+    monkeypatch.setattr(builtins, 'open', lambda *args, **kwargs: opened.append(args[0]) or real_open(*args, **kwargs))
+    assert not output_xml.xml_complete(file)
+    assert not opened  # unchanged, so not read again
+    monkeypatch.undo()
+    with open(file, 'ab') as f:
+        f.write(b'</molpro>\n\n')
+    assert output_xml.xml_complete(file)
+    assert not output_xml.xml_complete(tmpdir / 'missing.xml')
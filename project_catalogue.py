@@ -0,0 +1,295 @@
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+
+from recent_projects import latest_run_directory, read_status, read_output_summary
+
+logger = logging.getLogger(__name__)
+
+schema = r"""
+create table if not exists projects (
+    filename text primary key,
+    root text,
+    signature text,
+    status text,
+    energy real,
+    formula text,
+    atoms integer,
+    input text,
+    geometry text,
+    indexed real
+);
+create index if not exists projects_root on projects (root);
+create table if not exists roots (
+    root text primary key,
+    indexed real
+);
+"""
+
+
+def find_projects(root):
+    r"""
+    Walk a directory tree for project bundles, without descending into them
+
+    :param root: Directory at the top of the tree
+    :return: Generator of the paths of the bundles
+    """
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name, reverse=True)
+        except OSError as e:
+            logger.debug('Cannot scan ' + directory + ': ' + str(e))
+            continue
+        for entry in entries:
+            try:
+                if not entry.is_dir() or entry.is_symlink():
+                    continue
+            except OSError:
+                continue
+            if entry.name.endswith('.molpro'):
+                yield entry.path
+            elif not entry.name.startswith('.'):
+                stack.append(entry.path)
+
+
+def project_signature(filename):
+    r"""
+    Something that changes whenever the project's input, status or latest output changes, found without reading
+    any of them
+
+    :rtype: str
+    """
+    bundle = pathlib.Path(filename)
+    parts = []
+    for file in [bundle / 'Info.plist', bundle / (bundle.stem + '.inp')]:
+        try:
+            stat = os.stat(file)
+            parts.append([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            parts.append(None)
+    run = latest_run_directory(filename)
+    try:
+        stat = os.stat(run / (run.name.split('.')[0] + '.xml')) if run else None
+        parts.append([run.name, stat.st_mtime_ns, stat.st_size])
+    except OSError:
+        parts.append([run.name] if run else None)
+    return json.dumps(parts)
+
+
+def formula(atoms):
+    r"""
+    :param atoms: (element, x, y, z) for each atom
+    :return: Chemical formula in Hill order
+    :rtype: str
+    """
+    counts = {}
+    for atom in atoms:
+        element = atom[0].capitalize()
+        counts[element] = counts.get(element, 0) + 1
+    order = (['C', 'H'] if 'C' in counts else []) + sorted(element for element in counts if
+                                                             'C' not in counts or element not in ['C', 'H'])
+    return ''.join(element + (str(counts[element]) if counts[element] > 1 else '') for element in order)
+
+
+def index_project(filename):
+    r"""
+    Read what the catalogue holds about a project: its input, status, and the energy and geometry at the end of the
+    output of its latest run. Runs in a worker process.
+
+    :rtype: dict
+    """
+    bundle = pathlib.Path(filename)
+    entry = {'filename': str(filename), 'signature': project_signature(filename), 'status': read_status(filename),
+             'energy': None, 'formula': None, 'atoms': None, 'input': None, 'geometry': None}
+    try:
+        with open(bundle / (bundle.stem + '.inp'), 'r') as f:
+            entry['input'] = f.read()
+    except (OSError, UnicodeDecodeError):
+        pass
+    run = latest_run_directory(filename)
+    if run:
+        energy, atoms, bonds = read_output_summary(run / (run.name.split('.')[0] + '.xml'))
+        entry['energy'] = energy
+        if atoms:
+            entry['formula'] = formula(atoms)
+            entry['atoms'] = len(atoms)
+            entry['geometry'] = json.dumps(atoms)
+    return entry
+
+
+class ProjectCatalogue:
+    r"""
+    A local SQLite catalogue of the project bundles found under chosen directory trees, for searching many projects
+    without opening them. Re-indexing reads again only the projects whose input, status or output have changed.
+    """
+
+    columns = ['filename', 'root', 'signature', 'status', 'energy', 'formula', 'atoms', 'input', 'geometry',
+               'indexed']
+
+    def __init__(self, database):
+        self.database = str(database)
+        os.makedirs(os.path.dirname(os.path.abspath(self.database)), exist_ok=True)
+        with self.connect() as connection:
+            connection.executescript(schema)
+
+    @contextlib.contextmanager
+    def connect(self):
+        r"""
+        A connection to the database for one transaction, committed if the block succeeds, and closed afterwards
+        """
+        with contextlib.closing(sqlite3.connect(self.database, timeout=30)) as connection:
+            connection.row_factory = sqlite3.Row
+            with connection:
+                yield connection
+
+    def roots(self):
+        r"""
+        :return: The directory trees that have been indexed
+        :rtype: list
+        """
+        with self.connect() as connection:
+            return [row['root'] for row in connection.execute('select root from roots order by root')]
+
+    def remove_root(self, root):
+        root = os.path.abspath(os.path.expanduser(str(root)))
+        with self.connect() as connection:
+            connection.execute('delete from roots where root = ?', (root,))
+            connection.execute('delete from projects where root = ?', (root,))
+
+    def update(self, roots=None, workers=None, progress=None, batch=200):
+        r"""
+        Bring the catalogue up to date with the projects under directory trees, reading in a pool of processes those
+        that are new or have changed, and forgetting those that have gone
+
+        :param roots: Directories to index, by default those indexed before
+        :param workers: Number of processes; 1 to read in this process; by default the number of CPUs
+        :param progress: Called with the numbers of projects found and read so far
+        :param batch: Number of projects written in each transaction
+        :return: Numbers of projects found, read, and removed
+        :rtype: dict
+        """
+        import concurrent.futures
+        import multiprocessing
+        roots = [os.path.abspath(os.path.expanduser(str(root))) for root in roots] if roots else self.roots()
+        counts = {'found': 0, 'read': 0, 'removed': 0}
+        executor = None
+        try:
+            for root in roots:
+                with self.connect() as connection:
+                    known = {row['filename']: row['signature'] for row in
+                             connection.execute('select filename, signature from projects where root = ?', (root,))}
+                changed = []
+                for filename in find_projects(root):
+                    counts['found'] += 1
+                    if known.pop(filename, None) != project_signature(filename):
+                        changed.append(filename)
+                if workers == 1 or len(changed) < 2:
+                    entries = map(index_project, changed)
+                else:
+                    if executor is None:
+                        executor = concurrent.futures.ProcessPoolExecutor(
+                            max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+                    entries = executor.map(index_project, changed, chunksize=16)
+                pending = []
+                for entry in entries:
+                    entry.update(root=root, indexed=time.time())
+                    pending.append(entry)
+                    counts['read'] += 1
+                    if len(pending) >= batch:
+                        self._write(pending)
+                        pending = []
+                        if progress is not None:
+                            progress(counts['found'], counts['read'])
+                self._write(pending)
+                with self.connect() as connection:
+                    connection.executemany('delete from projects where filename = ?', [(f,) for f in known])
+                    connection.execute('insert or replace into roots (root, indexed) values (?, ?)',
+                                       (root, time.time()))
+                counts['removed'] += len(known)
+                if progress is not None:
+                    progress(counts['found'], counts['read'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        logger.info('Project catalogue updated: ' + str(counts))
+        return counts
+
+    def _write(self, entries):
+        if not entries:
+            return
+        with self.connect() as connection:
+            connection.executemany(
+                'insert or replace into projects (' + ', '.join(self.columns) + ') values (' + ', '.join(
+                    '?' * len(self.columns)) + ')', [[entry[column] for column in self.columns] for entry in entries])
+
+    def search(self, text='', limit=500):
+        r"""
+        :param text: Words that must each appear in the file name, formula, status or input of the project
+        :param limit: Largest number of results
+        :return: The matching projects, most recently indexed first
+        :rtype: list of dict
+        """
+        words = text.split()
+        condition = ' and '.join(['(filename like ? or formula like ? or status like ? or input like ?)'] * len(words))
+        parameters = [parameter for word in words for parameter in ['%' + word + '%'] * 4]
+        with self.connect() as connection:
+            rows = connection.execute(
+                'select filename, status, energy, formula, atoms, input, geometry from projects' + (
+                    ' where ' + condition if words else '') + ' order by indexed desc, filename limit ?',
+                parameters + [limit]).fetchall()
+        results = [dict(row) for row in rows]
+        for result in results:
+            result['geometry'] = json.loads(result['geometry']) if result['geometry'] else None
+        return results
+
+    def __len__(self):
+        with self.connect() as connection:
+            return connection.execute('select count(*) from projects').fetchone()[0]
+
+
+_project_catalogue = None
+
+
+def project_catalogue():
+    r"""
+    The catalogue kept next to the settings
+    """
+    global _project_catalogue
+    if _project_catalogue is None:
+        from settings import settings
+        _project_catalogue = ProjectCatalogue(pathlib.Path(settings.filename).parent / 'projects.sqlite')
+    return _project_catalogue
+
+
+def main(argv=None):
+    r"""
+    Command-line entry point, for indexing large trees outside iMolpro: ``python -m project_catalogue --help``
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m project_catalogue',
+                                     description='Index the Molpro projects under directory trees.')
+    parser.add_argument('roots', nargs='*', help='Directories to index (default: those indexed before)')
+    parser.add_argument('-d', '--database', help='Catalogue file (default: projects.sqlite next to the settings)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('-s', '--search', help='Instead of indexing, print the projects that match')
+    args = parser.parse_args(argv)
+    catalogue = ProjectCatalogue(args.database) if args.database else project_catalogue()
+    if args.search is not None:
+        for result in catalogue.search(args.search):
+            print(result['filename'], result['status'], result['formula'] or '', result['energy'] or '')
+        return 0
+    print(catalogue.update(args.roots, workers=args.jobs))
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    import project_catalogue as catalogue_module
+
+    sys.exit(catalogue_module.main())
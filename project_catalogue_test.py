@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+from project_catalogue import ProjectCatalogue, find_projects, formula, index_project
+
+
+def test_index_project():
+    entry = index_project('malonaldehyde.molpro')
+    assert entry['status'] == 'completed'
+    assert abs(entry['energy'] - -265.47202042161) < 1e-10
+    assert entry['formula'] == 'C3H5O2'
+    assert entry['atoms'] == 10
+    assert 'geometry' in entry['input'].lower()
+    assert formula([('O', 0, 0, 0), ('H', 0, 0, 1), ('H', 0, 1, 0)]) == 'H2O'
+
+
+def test_catalogue(tmpdir):
+    tree = tmpdir / 'projects'
+    for directory in ['a', 'b/c']:
+        os.makedirs(tree / directory)
+        shutil.copytree('malonaldehyde.molpro', tree / directory / 'malonaldehyde.molpro')
+    shutil.copytree('malonaldehyde.molpro', tree / 'b' / 'water.molpro')
+    assert len(list(find_projects(tree))) == 3
+
+    catalogue = ProjectCatalogue(tmpdir / 'catalogue.sqlite')
+    progress = []
+    assert catalogue.update([tree], workers=2, progress=lambda found, read: progress.append((found, read))) == {
+        'found': 3, 'read': 3, 'removed': 0}
+    assert progress[-1] == (3, 3)
+    assert len(catalogue) == 3
+    assert catalogue.roots() == [str(tree)]
+    assert catalogue.update(workers=1) == {'found': 3, 'read': 0, 'removed': 0}
+
+    with open(tree / 'a' / 'malonaldehyde.molpro' / 'malonaldehyde.inp', 'a') as f:
+        f.write('\n! changed\n')
+    shutil.rmtree(tree / 'b' / 'c')
+    assert catalogue.update(workers=1) == {'found': 2, 'read': 1, 'removed': 1}
+
+    results = catalogue.search('C3H5O2')
+    assert len(results) == 2
+    assert results[0]['status'] == 'completed' and results[0]['geometry'][0][0] == 'O'
+    assert [result['filename'] for result in catalogue.search('water completed')] == [
+        str(tree / 'b' / 'water.molpro')]
+    assert catalogue.search('changed')[0]['filename'] == str(tree / 'a' / 'malonaldehyde.molpro')
+    assert not catalogue.search('benzene')
+    catalogue.remove_root(tree)
+    assert len(catalogue) == 0
+
+
+def test_connections_closed(tmpdir):
+    import sqlite3
+    catalogue = ProjectCatalogue(tmpdir / 'catalogue.db')
+    with catalogue.connect() as connection:
+        connection.execute('insert into roots (root, indexed) values (?, ?)', ('/somewhere', 0.0))
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute('select 1')  # closed
+    assert catalogue.roots() == ['/somewhere']  # committed
@@ -0,0 +1,282 @@
+import logging
+import os
+import pathlib
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RecentProjects:
+    r"""
+    The list of recently-used projects kept by sjef, read in one go from its file, and read again only when the file
+    has changed
+    """
+
+    def __init__(self, suffix='molpro', file=None):
+        self.suffix = suffix
+        self.file = str(file) if file else str(pathlib.Path.home() / '.sjef' / suffix / 'projects')
+        self.signature = None
+        self.projects_ = None
+        self.lock = threading.Lock()
+
+    def projects(self, max_items=None):
+        r"""
+        :param max_items: The largest number of projects to return
+        :return: The projects, most recent first
+        :rtype: list
+        """
+        with self.lock:
+            try:
+                stat = os.stat(self.file)
+                signature = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                signature = None
+            if self.projects_ is None or signature != self.signature:
+                self.projects_ = self._read() if signature is not None else self._query()
+                self.signature = signature
+            return self.projects_[:max_items] if max_items else list(self.projects_)
+
+    def _read(self):
+        try:
+            with open(self.file, 'r') as f:
+                return [line.strip() for line in f.read().splitlines() if line.strip()]
+        except OSError as e:
+            logger.warning('Cannot read ' + self.file + ': ' + str(e))
+            return []
+
+    def _query(self, max_items=20):
+        import pymolpro
+        projects_ = []
+        for i in range(1, max_items + 1):
+            f = pymolpro.recent_project(self.suffix, i)
+            if not f:
+                break
+            projects_.append(f)
+        return projects_
+
+
+_recent_projects = None
+
+
+def recent_projects(max_items=None):
+    r"""
+    The recently-used molpro projects, most recent first
+    """
+    global _recent_projects
+    if _recent_projects is None:
+        _recent_projects = RecentProjects()
+    return _recent_projects.projects(max_items)
+
+
+status_names = {0: 'unknown', 1: 'running', 2: 'waiting', 3: 'completed', 4: 'unevaluated', 5: 'killed'}
+
+
+def latest_run_directory(filename):
+    r"""
+    :return: The most recent run directory of a project bundle, or None if it has not been run
+    :rtype: pathlib.Path
+    """
+    runs = []
+    try:
+        for entry in os.scandir(pathlib.Path(filename) / 'run'):
+            stem, _, suffix = entry.name.partition('.')
+            if suffix == 'molpro' and stem.isdigit():
+                runs.append((int(stem), entry.path))
+    except OSError:
+        return None
+    return pathlib.Path(max(runs)[1]) if runs else None
+
+
+def read_status(filename):
+    import re
+    try:
+        with open(pathlib.Path(filename) / 'Info.plist', 'r') as f:
+            match = re.search(r'<key>_status</key>\s*<string>(\d+)</string>', f.read())
+    except OSError:
+        return 'unknown'
+    return status_names.get(int(match.group(1)), 'unknown') if match else 'unevaluated'
+
+
+def read_output_summary(xml_file):
+    r"""
+    Find the last principal energy, and the last geometry with its bonds, in a molpro xml output file, tolerating a
+    file that is still being written
+
+    :return: energy, atoms as (element, x, y, z), and bonds as pairs of atom indices
+    :rtype: (float, list, list)
+    """
+    from output_xml import ResultsXML
+    results = ResultsXML(xml_file)
+    return results.energy, results.atoms, results.bonds
+
+
+def summarise_project(filename, previous=None, thumbnailer=None):
+    r"""
+    Summarise a project for display: whether it exists, the status and principal energy of its most recent run, and
+    a thumbnail of the structure. The xml output is read again only if it has changed since the previous summary.
+
+    :param filename: Project bundle
+    :param previous: An earlier summary of the same project
+    :param thumbnailer: Called with the atoms and bonds to produce a thumbnail
+    :rtype: dict
+    """
+    filename = os.path.expanduser(filename)
+    if not os.path.isdir(filename):
+        return {'exists': False}
+    summary = {'exists': True, 'status': read_status(filename)}
+    run = latest_run_directory(filename)
+    xml_file = run / (run.name.split('.')[0] + '.xml') if run else None
+    try:
+        stat = os.stat(xml_file) if xml_file else None
+        summary['signature'] = [str(xml_file), stat.st_mtime_ns, stat.st_size] if stat else None
+    except OSError:
+        summary['signature'] = None
+    if previous and previous.get('signature') == summary['signature'] and 'atoms' in previous:
+        for key in ('energy', 'atoms', 'bonds', 'thumbnail'):
+            if key in previous:
+                summary[key] = previous[key]
+    elif summary['signature']:
+        summary['energy'], summary['atoms'], summary['bonds'] = read_output_summary(xml_file)
+    if thumbnailer is not None and summary.get('atoms') and summary.get('thumbnail') is None:
+        try:
+            summary['thumbnail'] = thumbnailer(summary['atoms'], summary['bonds'])
+        except Exception as e:
+            logger.debug('thumbnail of ' + filename + ': ' + str(e))
+    return summary
+
+
+class RecentProjectsIndex:
+    r"""
+    Summaries of the recently-used projects, found in a pool of background threads so that a project on a slow or
+    missing network mount cannot stall the caller.
+
+    ``refresh()`` starts checks of the current recent projects, and ``poll()`` collects the results. A check that has
+    not finished within ``timeout`` seconds makes the project appear unavailable until it does. As in sjef, projects
+    that the checks have found no longer exist are left out of ``projects()``. Summaries other than
+    thumbnails are kept in a cache file, so that they can be shown straight away in the next session.
+    """
+
+    def __init__(self, recent=None, cache_file=None, workers=4, timeout=5.0, thumbnailer=None):
+        import concurrent.futures
+        self.recent = recent if recent else RecentProjects()
+        self.cache_file = str(cache_file) if cache_file else None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                              thread_name_prefix='RecentProjectsIndex')
+        self.timeout = timeout
+        self.thumbnailer = thumbnailer
+        self.summaries = self._load()
+        self.pending = {}
+        self.version = 0
+
+    def _load(self):
+        import json
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        import json
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file + '.tmp', 'w') as f:
+                json.dump({filename: {key: value for key, value in summary.items() if key != 'thumbnail'} for
+                           filename, summary in self.summaries.items()}, f)
+            os.replace(self.cache_file + '.tmp', self.cache_file)
+        except OSError as e:
+            logger.debug('Cannot write ' + self.cache_file + ': ' + str(e))
+
+    def projects(self, max_items=None):
+        r"""
+        :param max_items: The largest number of projects to return
+        :return: The recent projects, most recent first, other than those found to be missing
+        :rtype: list
+        """
+        projects_ = [filename for filename in self.recent.projects() if not self.missing(filename)]
+        return projects_[:max_items] if max_items else projects_
+
+    def missing(self, filename):
+        r"""
+        :return: Whether the latest check found that the project does not exist
+        :rtype: bool
+        """
+        return not self.summaries.get(filename, {}).get('exists', True)
+
+    def refresh(self, max_items=None):
+        r"""
+        Start background checks of the recent projects, other than those already being checked
+        """
+        import time
+        for filename in self.recent.projects(max_items):  # including those missing, in case they come back
+            if filename not in self.pending:
+                self.pending[filename] = (
+                    self.executor.submit(summarise_project, filename, self.summaries.get(filename), self.thumbnailer),
+                    time.monotonic())
+
+    def poll(self):
+        r"""
+        Collect the results of finished checks, and mark as unavailable the projects whose checks have timed out.
+        ``version`` is incremented whenever a summary changes.
+
+        :return: Whether any summary has changed
+        :rtype: bool
+        """
+        import time
+        changed = False
+        for filename, (future, submitted) in list(self.pending.items()):
+            if future.done():
+                del self.pending[filename]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    logger.debug('checking ' + filename + ': ' + str(e))
+                    summary = {'exists': False}
+                summary['available'] = True
+                if summary != self.summaries.get(filename):
+                    self.summaries[filename] = summary
+                    changed = True
+            elif time.monotonic() - submitted > self.timeout and self.summaries.get(filename, {}).get('available',
+                                                                                                      True):
+                self.summaries[filename] = dict(self.summaries.get(filename, {}), available=False)
+                changed = True
+        if changed:
+            self.version += 1
+            if not self.pending:
+                self.save()
+        return changed
+
+    def summary(self, filename):
+        r"""
+        :return: The latest summary of the project, or None if there is none yet
+        :rtype: dict
+        """
+        return self.summaries.get(filename)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_recent_projects_index = None
+
+
+def recent_projects_index(thumbnailer=None):
+    r"""
+    The index shared by the Chooser and the recent-projects menus
+    """
+    global _recent_projects_index, _recent_projects
+    if _recent_projects_index is None:
+        if _recent_projects is None:
+            _recent_projects = RecentProjects()
+        from settings import settings
+        _recent_projects_index = RecentProjectsIndex(
+            _recent_projects, pathlib.Path(settings.filename).parent / 'recent_projects.json',
+            timeout=float(settings['recent_projects_timeout']) if 'recent_projects_timeout' in settings else 5.0,
+            thumbnailer=thumbnailer)
+    elif thumbnailer is not None:
+        _recent_projects_index.thumbnailer = thumbnailer
+    return _recent_projects_index
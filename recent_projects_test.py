@@ -0,0 +1,64 @@
+import os
+
+from recent_projects import RecentProjects, RecentProjectsIndex, summarise_project
+
+
+def test_recent_projects(tmpdir):
+    file = tmpdir / 'projects'
+    with open(file, 'w') as f:
+        f.write('/home/user/first.molpro\n/home/user/second.molpro\n\n/home/user/third.molpro\n')
+    recent = RecentProjects(file=file)
+    assert recent.projects() == ['/home/user/first.molpro', '/home/user/second.molpro', '/home/user/third.molpro']
+    assert recent.projects(2) == ['/home/user/first.molpro', '/home/user/second.molpro']
+
+    recent._read = lambda: ['cached']
+    assert recent.projects(2) == ['/home/user/first.molpro', '/home/user/second.molpro']  # file not read again
+
+    with open(file, 'w') as f:
+        f.write('/home/user/new.molpro\n/home/user/first.molpro\n')
+    os.utime(file, ns=(os.stat(file).st_mtime_ns + 10 ** 9,) * 2)
+    assert recent.projects() == ['cached']
+
+
+def test_summary():
+    summary = summarise_project('malonaldehyde.molpro', thumbnailer=lambda atoms, bonds: (len(atoms), len(bonds)))
+    assert summary['exists'] and summary['status'] == 'completed'
+    assert abs(summary['energy'] - -265.47202042161) < 1e-10
+    assert summary['atoms'][0][0] == 'O' and len(summary['atoms']) == 10
+    assert summary['thumbnail'] == (10, 10)
+    assert summarise_project('malonaldehyde.molpro', summary)['energy'] == summary['energy']
+    assert summarise_project('nonexistent.molpro') == {'exists': False}
+
+
+def test_index(tmpdir):
+    file = tmpdir / 'projects'
+    with open(file, 'w') as f:
+        f.write(os.path.abspath('malonaldehyde.molpro') + '\n' + str(tmpdir / 'missing.molpro') + '\n')
+    index = RecentProjectsIndex(RecentProjects(file=file), cache_file=tmpdir / 'cache.json')
+    index.refresh()
+    assert index.projects() == [os.path.abspath('malonaldehyde.molpro'), str(tmpdir / 'missing.molpro')]  # unchecked
+    for future, submitted in index.pending.values():
+        future.result()
+    assert index.poll()
+    assert index.version == 1
+    assert index.summary(os.path.abspath('malonaldehyde.molpro'))['status'] == 'completed'
+    assert not index.summary(str(tmpdir / 'missing.molpro'))['exists']
+    assert index.missing(str(tmpdir / 'missing.molpro'))
+    assert index.projects() == [os.path.abspath('malonaldehyde.molpro')]  # missing projects left out
+    assert os.path.exists(tmpdir / 'cache.json')
+    assert RecentProjectsIndex(RecentProjects(file=file), cache_file=tmpdir / 'cache.json').summary(
+        os.path.abspath('malonaldehyde.molpro'))['status'] == 'completed'
+
+
+def test_index_timeout(tmpdir):
+    import threading
+    file = tmpdir / 'projects'
+    with open(file, 'w') as f:
+        f.write('/stalled/mount/project.molpro\n')
+    release = threading.Event()
+    index = RecentProjectsIndex(RecentProjects(file=file), timeout=0)
+    index.pending['/stalled/mount/project.molpro'] = (index.executor.submit(release.wait), 0)
+    index.refresh()
+    assert index.poll()
+    assert not index.summary('/stalled/mount/project.molpro')['available']
+    release.set()
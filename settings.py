@@ -16,7 +16,12 @@ settings = FileBackedDictionary(
 def settings_edit(parent=None, callbacks={}):
     hide=['project_window_width','project_window_height']
     box = OptionsDialog({k: settings[k] for k in settings if k not in hide},
-                        ['CHEMSPIDER_API_KEY', 'orbital_transparency'], title='Settings',
+                        ['CHEMSPIDER_API_KEY', 'orbital_transparency', 'local_pool_cores', 'local_pool_jobs',
+                         'local_pool_memory_fraction', 'ssh_multiplexing', 'ssh_persist',
+                         'remote_fetch_interval', 'remote_fetch_compress', 'preload_project_window',
+                         'login_path_cache', 'recent_projects_timeout', 'instrumentation',
+                         'stall_threshold', 'convergence_frame_rate',
+                         'vod_rebuild_interval', 'submission_workers'], title='Settings',
                         parent=parent)
     result = box.exec()
     if result is not None:
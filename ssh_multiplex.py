@@ -0,0 +1,201 @@
+import contextlib
+import logging
+import os
+import pathlib
+import platform
+import shutil
+import stat
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SSHConnectionPool:
+    r"""
+    Persistent ssh sessions, one per remote host, shared by every ssh invocation made on behalf of iMolpro.
+
+    A master connection is opened for each host using OpenSSH connection multiplexing (ControlMaster), and an
+    ``ssh`` wrapper placed at the front of ``PATH`` makes the ssh commands issued by sjef for job submission, kill
+    and file synchronisation travel over that connection instead of each making a new handshake. The wrapper is on
+    ``PATH`` only while those operations are being carried out, and can be given to other subprocesses with
+    ``environment()``.
+
+    Connections to different hosts are checked and opened independently, so that a slow or unreachable host holds
+    up only those waiting for it.
+    """
+
+    def __init__(self, directory=None, ssh=None, persist=600, timeout=30):
+        self.directory = pathlib.Path(directory) if directory else pathlib.Path(
+            os.environ['HOME']) / '.molpro' / 'ssh'
+        self.ssh = ssh if ssh else shutil.which('ssh')
+        self.persist = persist
+        self.timeout = timeout
+        self.hosts = set()
+        self.lock = threading.Lock()
+        self.host_locks = {}
+        self.shim_directory = None
+        self.shim_users = 0
+        self.monitor_thread = None
+        self.monitor_stop = threading.Event()
+
+    @property
+    def control_path(self):
+        return str(self.directory / '%C')
+
+    def options(self, master='auto'):
+        return ['-o', 'ControlMaster=' + master, '-o', 'ControlPath=' + self.control_path, '-o',
+                'ControlPersist=' + str(self.persist)]
+
+    def _ssh(self, arguments, timeout=None):
+        return subprocess.run([self.ssh] + arguments, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, timeout=timeout if timeout else self.timeout)
+
+    def check(self, host):
+        r"""
+        :return: Whether a healthy master connection to the host exists
+        :rtype: bool
+        """
+        try:
+            return self._ssh(['-O', 'check', '-o', 'ControlPath=' + self.control_path, host]).returncode == 0
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug('ssh check ' + host + ': ' + str(e))
+            return False
+
+    def connect(self, host):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        os.chmod(self.directory, stat.S_IRWXU)
+        try:
+            result = self._ssh(self.options('yes') + ['-o', 'BatchMode=yes', '-f', '-N', host])
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning('Cannot open ssh connection to ' + host + ': ' + str(e))
+            return False
+        if result.returncode != 0:
+            logger.warning('Cannot open ssh connection to ' + host + ': ' + result.stderr.decode(errors='replace'))
+        return result.returncode == 0
+
+    def ensure(self, host):
+        r"""
+        Make sure that there is a working master connection to the host, reconnecting if necessary
+
+        :return: Whether the connection is available
+        :rtype: bool
+        """
+        if not host or '{' in host:
+            return False
+        with self.lock:
+            self.hosts.add(host)
+            host_lock = self.host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            if self.check(host):
+                return True
+            logger.debug('ssh master connection to ' + host + ' not available; reconnecting')
+            self.close(host)
+            return self.connect(host)
+
+    def close(self, host):
+        try:
+            self._ssh(['-O', 'exit', '-o', 'ControlPath=' + self.control_path, host])
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def close_all(self):
+        self.monitor_stop.set()
+        with self.lock:
+            hosts = list(self.hosts)
+            self.hosts.clear()
+        for host in hosts:
+            self.close(host)
+
+    def run(self, host, command, timeout=None):
+        r"""
+        Run a command on the remote host over the master connection
+
+        :return: The completed process, with stdout and stderr captured as bytes
+        :rtype: subprocess.CompletedProcess
+        """
+        self.ensure(host)
+        return self._ssh(self.options() + [host, command], timeout)
+
+    def install_shim(self):
+        r"""
+        Write the ``ssh`` wrapper that makes ssh commands run by sjef and rsync use the master connections. It is put
+        on ``PATH`` by ``shim_on_path()`` or ``environment()``.
+        """
+        if not self.ssh:
+            return False
+        bin_directory = self.directory / 'bin'
+        bin_directory.mkdir(parents=True, exist_ok=True)
+        shim = bin_directory / 'ssh'
+        with open(shim, 'w') as f:
+            f.write('#!/bin/sh\nexec "' + self.ssh + '" ' + ' '.join(
+                ['"' + option + '"' for option in self.options()]) + ' "$@"\n')
+        os.chmod(shim, stat.S_IRWXU)
+        self.shim_directory = str(bin_directory)
+        return True
+
+    def environment(self, environment=None):
+        r"""
+        :param environment: The environment for a subprocess, by default that of this process
+        :return: The environment with the ``ssh`` wrapper at the front of ``PATH``, if it has been installed
+        :rtype: dict
+        """
+        environment = dict(os.environ if environment is None else environment)
+        if self.shim_directory and self.shim_directory not in environment.get('PATH', '').split(os.pathsep):
+            environment['PATH'] = os.pathsep.join(
+                [self.shim_directory] + ([environment['PATH']] if environment.get('PATH') else []))
+        return environment
+
+    @contextlib.contextmanager
+    def shim_on_path(self):
+        r"""
+        Put the ``ssh`` wrapper at the front of this process's ``PATH`` while sjef, which runs its ssh and rsync
+        commands from within this process, carries out an operation. Nested and concurrent uses share the change,
+        which is undone when the last finishes.
+        """
+        with self.lock:
+            if self.shim_directory and self.shim_users == 0:
+                os.environ['PATH'] = self.environment()['PATH']
+            self.shim_users += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.shim_users -= 1
+                if self.shim_directory and self.shim_users == 0:
+                    os.environ['PATH'] = os.pathsep.join(
+                        [path for path in os.environ.get('PATH', '').split(os.pathsep) if path != self.shim_directory])
+
+    def start_monitor(self, interval=60):
+        r"""
+        Periodically check the connections in use, and reconnect any that have dropped
+        """
+        if self.monitor_thread is not None and self.monitor_thread.is_alive():
+            return
+        self.monitor_stop.clear()
+
+        def monitor():
+            while not self.monitor_stop.wait(interval):
+                for host in list(self.hosts):
+                    self.ensure(host)
+
+        self.monitor_thread = threading.Thread(target=monitor, name='SSHConnectionPool', daemon=True)
+        self.monitor_thread.start()
+
+
+_ssh_pool = None
+
+
+def ssh_pool():
+    r"""
+    The connection pool shared by all project windows, or None if multiplexing is disabled or unavailable
+    """
+    global _ssh_pool
+    if _ssh_pool is None and platform.system() != 'Windows':
+        from settings import settings
+        if 'ssh_multiplexing' not in settings or int(settings['ssh_multiplexing']):
+            _ssh_pool = SSHConnectionPool(
+                persist=int(settings['ssh_persist']) if 'ssh_persist' in settings else 600)
+            if not _ssh_pool.ssh:
+                _ssh_pool = None
+    return _ssh_pool
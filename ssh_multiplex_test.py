@@ -0,0 +1,108 @@
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from ssh_multiplex import SSHConnectionPool
+
+fake_ssh_source = r'''#!{python}
+# fake ssh: records its arguments, and simulates a master connection with a marker file
+import os, sys
+log, master = {log!r}, {master!r}
+args = sys.argv[1:]
+with open(log, 'a') as f:
+    f.write(' '.join(args) + '\n')
+if '-O' in args:
+    operation = args[args.index('-O') + 1]
+    if operation == 'check':
+        sys.exit(0 if os.path.exists(master) else 255)
+    if operation == 'exit' and os.path.exists(master):
+        os.remove(master)
+    sys.exit(0)
+if '-N' in args:
+    open(master, 'w').close()
+    sys.exit(0)
+print('ran ' + args[-1])
+'''
+
+
+@pytest.fixture
+def fake_ssh(tmpdir):
+    if sys.platform.startswith('win'):
+        pytest.skip('ssh multiplexing is not used on Windows')
+    ssh = tmpdir / 'fake-ssh'
+    with open(ssh, 'w') as f:
+        f.write(fake_ssh_source.format(python=sys.executable, log=str(tmpdir / 'log'), master=str(tmpdir / 'master')))
+    os.chmod(ssh, stat.S_IRWXU)
+    yield str(ssh), tmpdir
+
+
+def log_lines(tmpdir):
+    with open(tmpdir / 'log', 'r') as f:
+        return f.read().splitlines()
+
+
+def test_ensure_and_reconnect(fake_ssh):
+    ssh, tmpdir = fake_ssh
+    pool = SSHConnectionPool(directory=tmpdir / 'control', ssh=ssh)
+    assert pool.ensure('user@host')
+    assert os.path.exists(tmpdir / 'master')
+    assert len([line for line in log_lines(tmpdir) if '-N' in line]) == 1
+    assert pool.ensure('user@host')
+    assert len([line for line in log_lines(tmpdir) if '-N' in line]) == 1  # reused, not reconnected
+
+    os.remove(tmpdir / 'master')  # connection dropped
+    assert pool.ensure('user@host')
+    assert len([line for line in log_lines(tmpdir) if '-N' in line]) == 2
+
+    assert pool.run('user@host', 'squeue -j 1').stdout.decode().strip() == 'ran squeue -j 1'
+    assert 'ControlMaster=auto' in log_lines(tmpdir)[-1]
+
+    pool.close_all()
+    assert not os.path.exists(tmpdir / 'master')
+    assert not pool.ensure('{%user}@host')
+
+
+def test_shim(fake_ssh, monkeypatch):
+    ssh, tmpdir = fake_ssh
+    monkeypatch.setenv('PATH', os.environ['PATH'])
+    path = os.environ['PATH']
+    pool = SSHConnectionPool(directory=tmpdir / 'control', ssh=ssh)
+    assert pool.install_shim()
+    assert os.environ['PATH'] == path  # this process is left alone
+    environment = pool.environment()
+    assert environment['PATH'].split(os.pathsep)[0] == str(tmpdir / 'control' / 'bin')
+    output = subprocess.run(['ssh', 'host', 'pwd'], stdout=subprocess.PIPE, env=environment).stdout.decode()
+    assert output.strip() == 'ran pwd'
+    assert 'ControlPath=' + str(tmpdir / 'control' / '%C') in log_lines(tmpdir)[-1]
+
+    with pool.shim_on_path():
+        with pool.shim_on_path():
+            assert os.environ['PATH'] == environment['PATH']
+        assert os.environ['PATH'] == environment['PATH']
+    assert os.environ['PATH'] == path
+
+
+def test_hosts_independent(fake_ssh):
+    import threading
+    ssh, tmpdir = fake_ssh
+    pool = SSHConnectionPool(directory=tmpdir / 'control', ssh=ssh)
+    started, release = threading.Event(), threading.Event()
+    check = pool.check
+
+    def slow_check(host):
+        if host != 'slow':
+            return check(host)
+        started.set()
+        return release.wait(5)
+
+    pool.check = slow_check
+    slow = threading.Thread(target=pool.ensure, args=('slow',))
+    slow.start()
+    assert started.wait(5)
+    assert pool.ensure('user@host')  # not held up by the slow host
+    assert slow.is_alive()
+    release.set()
+    slow.join()
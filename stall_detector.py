@@ -0,0 +1,108 @@
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class StallDetector:
+    r"""
+    Detect when the event loop of the main thread has stopped turning, and log where the main thread is stuck.
+
+    The main thread calls :meth:`beat` from a timer. A background thread checks that beats keep arriving, and when
+    none has arrived for ``threshold`` seconds, it logs the Python stack of the main thread, and logs again with the
+    total time once the main thread is free.
+    """
+
+    def __init__(self, threshold=2.0, interval=None, thread_id=None):
+        r"""
+        :param threshold: Seconds without a beat before a stall is reported
+        :param interval: Seconds between checks by the background thread
+        :param thread_id: Identifier of the thread to watch, by default the thread creating the detector
+        """
+        self.threshold = threshold
+        self.interval = interval if interval is not None else threshold / 4
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stalls = collections.deque(maxlen=100)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def stack(self):
+        r"""
+        :return: The current stack of the watched thread, formatted as by :mod:`traceback`
+        :rtype: str
+        """
+        frame = sys._current_frames().get(self.thread_id)
+        return ''.join(traceback.format_stack(frame)) if frame is not None else ''
+
+    def check(self):
+        r"""
+        Look once for a stall, and report it
+
+        :return: Whether the watched thread is stalled
+        :rtype: bool
+        """
+        last_beat = self.last_beat
+        stalled_for = time.monotonic() - last_beat
+        if stalled_for < self.threshold:
+            if self.stalls and self.stalls[-1]['beat'] != last_beat and 'duration' not in self.stalls[-1]:
+                self.stalls[-1]['duration'] = last_beat - self.stalls[-1]['beat']
+                logger.warning('Event loop stalled for {:.2f} s'.format(self.stalls[-1]['duration']))
+            return False
+        if not self.stalls or self.stalls[-1]['beat'] != last_beat:
+            stack = self.stack()
+            self.stalls.append({'beat': last_beat, 'stack': stack})
+            logger.warning('Event loop has not turned for {:.2f} s; main thread stack:\n{}'.format(stalled_for, stack))
+        return True
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.beat()
+        self.stopping.clear()
+
+        def watch():
+            while not self.stopping.wait(self.interval):
+                self.check()
+
+        self.thread = threading.Thread(target=watch, name='StallDetector', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+
+def start_stall_detector(parent):
+    r"""
+    Watch the calling thread for stalls longer than the setting ``stall_threshold`` (seconds, default 2), unless it is
+    0, with a Qt timer to beat
+
+    :param parent: The QObject that owns the timer
+    :return: The stall detector, or None if disabled
+    :rtype: StallDetector
+    """
+    from settings import settings
+    try:
+        threshold = float(settings['stall_threshold']) if 'stall_threshold' in settings else 2.0
+    except (TypeError, ValueError):
+        threshold = 2.0
+    if threshold <= 0:
+        return None
+    from PyQt5.QtCore import QTimer
+    detector = StallDetector(threshold)
+    timer = QTimer(parent)
+    timer.timeout.connect(detector.beat)
+    timer.start(max(10, int(detector.interval * 1000)))
+    detector.timer = timer
+    detector.start()
+    return detector
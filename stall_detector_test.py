@@ -0,0 +1,42 @@
+import logging
+import time
+
+from stall_detector import StallDetector
+
+
+def blocking_handler(duration):
+    time.sleep(duration)
+
+
+def test_stall_reported_with_stack(caplog):
+    caplog.set_level(logging.WARNING, logger='stall_detector')
+    detector = StallDetector(threshold=0.2, interval=0.05)
+    detector.start()
+    try:
+        for i in range(4):
+            detector.beat()
+            time.sleep(0.05)
+        assert not detector.stalls
+        blocking_handler(0.6)
+        detector.beat()
+        time.sleep(0.2)
+    finally:
+        detector.stop()
+    assert len(detector.stalls) == 1
+    assert 'blocking_handler' in detector.stalls[0]['stack']
+    assert 0.5 < detector.stalls[0]['duration'] < 1.0
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('blocking_handler' in message for message in messages)
+    assert any(message.startswith('Event loop stalled for') for message in messages)
+
+
+def test_check_without_thread():
+    detector = StallDetector(threshold=0.1)
+    assert not detector.check()
+    detector.last_beat -= 1
+    assert detector.check()
+    assert detector.check()
+    assert len(detector.stalls) == 1  # one stall is reported once
+    detector.beat()
+    assert not detector.check()
+    assert detector.stalls[0]['duration'] >= 1
@@ -0,0 +1,113 @@
+import builtins
+import sys
+import time
+
+flag = '--profile-startup'
+
+
+class StartupProfile:
+    r"""
+    Record how long each module takes to import, in the manner of ``python -X importtime``, together with the time
+    at which named milestones of the start-up, such as the first window being shown, are reached.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.records = []
+        self.milestones = []
+        self.stack = []
+        self.original_import = None
+        self.output = None
+
+    def install(self):
+        if self.original_import is not None:
+            return
+        self.original_import = builtins.__import__
+        original_import = self.original_import
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            start = time.perf_counter()
+            self.stack.append(0.0)
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                cumulative = time.perf_counter() - start
+                children = self.stack.pop()
+                self.records.append((len(self.stack), name, cumulative - children, cumulative))
+                if self.stack:
+                    self.stack[-1] += cumulative
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def mark(self, milestone):
+        self.milestones.append((milestone, time.perf_counter() - self.start))
+
+    def report(self, top=20):
+        r"""
+        :param top: Number of most expensive top-level imports to summarise
+        :return: The import times of every module, a summary of the most expensive, and the milestones reached
+        :rtype: str
+        """
+        lines = ['import time: self [us] | cumulative | imported package']
+        for depth, name, self_time, cumulative in self.records:
+            lines.append('import time: {:>9} | {:>10} | {}{}'.format(int(self_time * 1e6), int(cumulative * 1e6),
+                                                                      '  ' * depth, name))
+        lines.append('')
+        lines.append('slowest top-level imports:')
+        for depth, name, self_time, cumulative in sorted((record for record in self.records if record[0] == 0),
+                                                         key=lambda record: -record[3])[:top]:
+            lines.append('{:8.3f} s  {}'.format(cumulative, name))
+        lines.append('')
+        for milestone, elapsed in self.milestones:
+            lines.append('{:8.3f} s  {}'.format(elapsed, milestone))
+        return '\n'.join(lines)
+
+
+profile = None
+
+
+def install_from_argv(argv):
+    r"""
+    If ``--profile-startup`` or ``--profile-startup=FILE`` is among the arguments, remove it and start profiling
+
+    :return: The profile, or None if profiling was not requested
+    :rtype: StartupProfile
+    """
+    global profile
+    for arg in argv[1:]:
+        if arg == flag or arg.startswith(flag + '='):
+            argv.remove(arg)
+            profile = StartupProfile()
+            profile.output = arg[len(flag) + 1:] if '=' in arg else None
+            profile.install()
+            break
+    return profile
+
+
+def mark(milestone):
+    if profile is not None:
+        profile.mark(milestone)
+
+
+def finish(milestone):
+    r"""
+    Record the final milestone, stop profiling, and write the report to the file given with the flag, or to stderr
+    """
+    global profile
+    if profile is None:
+        return
+    profile.mark(milestone)
+    profile.uninstall()
+    if profile.output:
+        with open(profile.output, 'w') as f:
+            f.write(profile.report() + '\n')
+    else:
+        sys.stderr.write(profile.report() + '\n')
+    profile = None
@@ -0,0 +1,28 @@
+import builtins
+
+import startup_profile
+
+
+def test_profile(tmpdir):
+    original_import = builtins.__import__
+    argv = ['iMolpro.py', '--profile-startup=' + str(tmpdir / 'profile.txt'), 'project.molpro']
+    profile = startup_profile.install_from_argv(argv)
+    assert argv == ['iMolpro.py', 'project.molpro']
+    assert builtins.__import__ is not original_import
+    import wave
+    startup_profile.mark('imported')
+    startup_profile.finish('finished')
+    assert builtins.__import__ is original_import
+    assert startup_profile.profile is None
+    assert [milestone for milestone, elapsed in profile.milestones] == ['imported', 'finished']
+    assert any(name == 'wave' for depth, name, self_time, cumulative in profile.records)
+    with open(tmpdir / 'profile.txt', 'r') as f:
+        report = f.read()
+    assert 'import time: self [us] | cumulative | imported package' in report
+    assert 'finished' in report
+
+
+def test_no_profile():
+    argv = ['iMolpro.py', 'project.molpro']
+    assert startup_profile.install_from_argv(argv) is None
+    assert argv == ['iMolpro.py', 'project.molpro']
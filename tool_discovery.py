@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+viewer_paths = [
+    '/Applications/Avogadro.app/Contents/MacOS',
+    '/Applications/Avogadro2.app/Contents/MacOS',
+    '/usr/local/bin',
+    '/usr/bin',
+    '/bin',
+]
+
+
+class ToolDiscovery:
+    r"""
+    Process-wide cache of the contents of the directories searched for external programs.
+
+    Each directory is listed once, and the listing is kept together with the directory's modification time. Lookups
+    are answered from the cache; once the cache is older than ``check_interval``, the directories are checked in a
+    background thread and any whose modification time has changed are listed again. A change of ``PATH`` is picked
+    up at the next lookup.
+    """
+
+    def __init__(self, check_interval=30.0):
+        self.check_interval = check_interval
+        self.listings = {}
+        self.checked = None
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @staticmethod
+    def path():
+        return [directory for directory in os.environ.get('PATH', '').split(os.pathsep) if directory]
+
+    @staticmethod
+    def _list(directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            return mtime, frozenset(os.listdir(directory))
+        except OSError:
+            return None, frozenset()
+
+    def _listing(self, directory):
+        with self.lock:
+            if directory in self.listings:
+                return self.listings[directory][1]
+        listing = self._list(directory)
+        with self.lock:
+            self.listings[directory] = listing
+        return listing[1]
+
+    def rescan(self, extra_paths=()):
+        r"""
+        List every directory in ``PATH`` or given, and list again every cached directory whose modification time has
+        changed
+
+        :param extra_paths: Further directories to list
+        """
+        with self.lock:
+            directories = list(dict.fromkeys(self.path() + list(extra_paths) + list(self.listings.keys())))
+        for directory in directories:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            with self.lock:
+                unchanged = directory in self.listings and self.listings[directory][0] == mtime
+            if not unchanged:
+                logger.debug('tool discovery: rescanning ' + directory)
+                listing = self._list(directory)
+                with self.lock:
+                    self.listings[directory] = listing
+        self.checked = time.monotonic()
+
+    def rescan_in_background(self, extra_paths=()):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self.rescan, args=(extra_paths,), name='ToolDiscovery',
+                                           daemon=True)
+            self.thread.start()
+
+    def locate(self, command, extra_paths=()):
+        r"""
+        Find a program, searching ``PATH`` and then any further directories given
+
+        :param command: Name of the program
+        :param extra_paths: Directories to search after those in ``PATH``
+        :return: Full path of the program, or None if it is not found
+        :rtype: str
+        """
+        if self.checked is None:
+            self.checked = time.monotonic()
+        elif time.monotonic() - self.checked > self.check_interval:
+            self.checked = time.monotonic()
+            self.rescan_in_background()
+        for directory in self.path() + list(extra_paths):
+            if command in self._listing(directory):
+                return os.path.join(directory, command)
+        return None
+
+    def locate_all(self, commands, extra_paths=()):
+        r"""
+        :return: The full path of each of the commands that is found
+        :rtype: dict
+        """
+        found = {}
+        for command in commands:
+            location = self.locate(command, extra_paths)
+            if location:
+                found[command] = location
+        return found
+
+
+_tool_discovery = None
+
+
+def tool_discovery():
+    r"""
+    The cache shared by all project windows
+    """
+    global _tool_discovery
+    if _tool_discovery is None:
+        _tool_discovery = ToolDiscovery()
+    return _tool_discovery
@@ -0,0 +1,35 @@
+import os
+import stat
+import time
+
+from tool_discovery import ToolDiscovery
+
+
+def make_program(directory, name):
+    os.makedirs(directory, exist_ok=True)
+    program = os.path.join(directory, name)
+    with open(program, 'w') as f:
+        f.write('#!/bin/sh\n')
+    os.chmod(program, stat.S_IRWXU)
+    return program
+
+
+def test_locate(tmpdir, monkeypatch):
+    first = str(tmpdir / 'first')
+    second = str(tmpdir / 'second')
+    extra = str(tmpdir / 'extra')
+    monkeypatch.setenv('PATH', first + os.pathsep + second)
+    make_program(second, 'molpro')
+    make_program(extra, 'jmol')
+    discovery = ToolDiscovery(check_interval=0)
+    assert discovery.locate('molpro') == os.path.join(second, 'molpro')
+    assert discovery.locate('jmol') is None
+    assert discovery.locate_all(['jmol', 'avogadro'], [extra]) == {'jmol': os.path.join(extra, 'jmol')}
+
+    make_program(first, 'molpro')
+    os.utime(first, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+    discovery.rescan()
+    assert discovery.locate('molpro') == os.path.join(first, 'molpro')
+
+    monkeypatch.setenv('PATH', second)
+    assert discovery.locate('molpro') == os.path.join(second, 'molpro')
@@ -1,12 +1,13 @@
+import codecs
 import os
 import json
+import tempfile
 from collections.abc import MutableMapping
 
-import numpy
 from PyQt5.Qt import Qt
-from PyQt5.QtCore import QTimer, QPoint, QCoreApplication
-from PyQt5.QtGui import QFont, QFontDatabase, QTextCursor, QCursor
-from PyQt5.QtWidgets import QPlainTextEdit, QMessageBox, QLabel, QMainWindow
+from PyQt5.QtCore import QTimer, QPoint, QCoreApplication, QRegularExpression, pyqtSignal
+from PyQt5.QtGui import QFont, QFontDatabase, QTextCursor, QCursor, QTextDocument, QTextCharFormat, QColor
+from PyQt5.QtWidgets import QPlainTextEdit, QMessageBox, QLabel, QMainWindow, QTextEdit
 
 from enum import Enum
 
@@ -23,6 +24,81 @@ class VimMode(Enum):
     org = 7
 
 
+def find_in_document(document: QTextDocument, pattern, position, reverse=False):
+    r"""
+    Find a string or regular expression in a document, without copying its text
+
+    :param document: The document to search
+    :param pattern: A string, or a compiled QRegularExpression
+    :param position: Forward searches start at this position, and backward searches find matches before it
+    :param reverse: Search backwards
+    :return: The position of the start of the match, or -1 if there is none
+    :rtype: int
+    """
+    flags = QTextDocument.FindCaseSensitively
+    if reverse:
+        flags |= QTextDocument.FindBackward
+    found = document.find(pattern, max(0, position), flags)
+    return -1 if found.isNull() else found.selectionStart()
+
+
+class MatchHighlighter:
+    r"""
+    Highlight every match of a pattern in a QPlainTextEdit.
+
+    Only the blocks in view are searched, again each time the view changes, so the cost does not grow with the size of
+    the document.
+    """
+
+    def __init__(self, editor: QPlainTextEdit, colour='#FFF176'):
+        self.editor = editor
+        self.pattern = None
+        self.format = QTextCharFormat()
+        self.format.setBackground(QColor(colour))
+        self.shown = None
+        editor.updateRequest.connect(self.update)
+
+    def set_pattern(self, text, regex=False):
+        r"""
+        :param text: The string, or regular expression, to highlight. If empty, or not a valid regular expression,
+            highlighting is removed.
+        :param regex: Whether text is a regular expression
+        :return: Whether the pattern is valid
+        :rtype: bool
+        """
+        self.pattern = QRegularExpression(text if regex else QRegularExpression.escape(text)) if text else None
+        valid = self.pattern is None or self.pattern.isValid()
+        if not valid:
+            self.pattern = None
+        self.shown = None
+        self.update()
+        return valid
+
+    def update(self, *args):
+        first = self.editor.cursorForPosition(QPoint(0, 0)).block()
+        last = self.editor.cursorForPosition(QPoint(0, self.editor.viewport().height())).block()
+        key = (self.pattern.pattern() if self.pattern is not None else None, first.blockNumber(), last.blockNumber(),
+               self.editor.document().revision())
+        if key == self.shown:
+            return
+        self.shown = key
+        selections = []
+        block = first
+        while self.pattern is not None and block.isValid() and block.blockNumber() <= last.blockNumber():
+            matches = self.pattern.globalMatch(block.text())
+            while matches.hasNext():
+                match = matches.next()
+                if match.capturedEnd() > match.capturedStart():
+                    selection = QTextEdit.ExtraSelection()
+                    selection.cursor = QTextCursor(block)
+                    selection.cursor.setPosition(block.position() + match.capturedStart())
+                    selection.cursor.setPosition(block.position() + match.capturedEnd(), QTextCursor.KeepAnchor)
+                    selection.format = self.format
+                    selections.append(selection)
+            block = block.next()
+        self.editor.setExtraSelections(selections)
+
+
 class QVimPlainTextEdit(QPlainTextEdit):
     def __init__(self, initial_mode=VimMode.normal):
         super().__init__()
@@ -31,7 +107,10 @@ class QVimPlainTextEdit(QPlainTextEdit):
         self.searching = False
         self.shiftKey = False
         self.searchReverse = False
+        self.searchRegex = False
         self.lastSearch = ''
+        self.lastSearchRegex = False
+        self.lastSearchPattern = ''
 
         self.statusLine = QLabel(self)
 
@@ -39,7 +118,10 @@ class QVimPlainTextEdit(QPlainTextEdit):
         # print('key', e.key(), self.vimMode, Qt.Key_Enter, Qt.Key_Return)
         if self.searching:
             if e.key() == Qt.Key_Enter or e.key() == Qt.Key_Return:
-                self.search_and_move(self.statusLine.text()[1:], self.searchReverse)
+                search_string = self.statusLine.text()[1:]
+                regex = search_string.startswith('\\v')  # vim's "very magic"
+                self.search_and_move(search_string[2:] if regex else search_string, self.searchReverse,
+                                     regex or None)
                 self.searching = False
                 self.statusLine.hide()
             else:
@@ -78,13 +160,14 @@ class QVimPlainTextEdit(QPlainTextEdit):
             elif e.key() == Qt.Key_N:
                 self.search_and_move(reverse=not self.searchReverse if self.shiftKey else self.searchReverse)
             elif e.key() == Qt.Key_O:
-                if not self.shiftKey:
-                    self.moveCursor(QTextCursor.Down)
-                self.moveCursor(QTextCursor.StartOfLine)
-                pos = self.textCursor().position()
-                self.setPlainText(self.toPlainText()[:pos] + '\n' + self.toPlainText()[pos:])
                 cursor = self.textCursor()
-                cursor.setPosition(pos)
+                if self.shiftKey:
+                    cursor.movePosition(QTextCursor.StartOfBlock)
+                    cursor.insertText('\n')
+                    cursor.movePosition(QTextCursor.PreviousBlock)
+                else:
+                    cursor.movePosition(QTextCursor.EndOfBlock)
+                    cursor.insertText('\n')
                 self.setTextCursor(cursor)
                 self.enterMode(VimMode.insert)
             elif e.key() == Qt.Key_R:
@@ -94,10 +177,8 @@ class QVimPlainTextEdit(QPlainTextEdit):
             elif e.key() == Qt.Key_V:
                 print('visual mode not implemented')
             elif e.key() == Qt.Key_X:
-                pos = self.textCursor().position()
-                self.setPlainText(self.toPlainText()[:pos] + self.toPlainText()[pos + 1:])
                 cursor = self.textCursor()
-                cursor.setPosition(pos)
+                cursor.deleteChar()
                 self.setTextCursor(cursor)
             elif e.key() == Qt.Key_0:
                 self.moveCursor(QTextCursor.StartOfLine)
@@ -141,14 +222,26 @@ class QVimPlainTextEdit(QPlainTextEdit):
             # print('shift off')
             self.shiftKey = False
 
-    def search_and_move(self, search_string=None, reverse=False):
+    def search_and_move(self, search_string=None, reverse=False, regex=None):
+        r"""
+        Move the cursor to the next match of the search string
+
+        :param search_string: What to search for. If not given, the previous search is repeated.
+        :param reverse: Search backwards
+        :param regex: Whether the search string is a regular expression. If not given, ``searchRegex`` is used.
+        """
         if search_string:
+            regex = self.searchRegex if regex is None else regex
+            if (search_string, regex) != (self.lastSearch, self.lastSearchRegex):
+                self.lastSearchPattern = QRegularExpression(search_string) if regex else search_string
             self.lastSearch = search_string
+            self.lastSearchRegex = regex
+        if not self.lastSearch:
+            return False
         # print('searching for', self.lastSearch, self.textCursor().position())
-        if reverse:
-            newpos = self.toPlainText().rfind(self.lastSearch, 0, self.textCursor().position())
-        else:
-            newpos = self.toPlainText().find(self.lastSearch, self.textCursor().position() + 1)
+        position = self.textCursor().position()
+        newpos = find_in_document(self.document(), self.lastSearchPattern, position if reverse else position + 1,
+                                  reverse)
         if newpos >= 0:
             # print('found', newpos, self.toPlainText()[newpos])
             cursor = self.textCursor()
@@ -165,15 +258,23 @@ class QVimPlainTextEdit(QPlainTextEdit):
 
 
 class EditFile(QVimPlainTextEdit):
+    r"""
+    Editor that keeps a file in step with its contents.
+
+    Every ``latency`` milliseconds, the file is written if the document has been modified since it was last written,
+    so that a burst of edits results in a single write. Writes are atomic. Changes made to the file by others are
+    detected from its inode, modification time and size, and the file is read only when these change.
+    """
+
     def __init__(self, filename: str, latency=1000):
         super().__init__(VimMode.insert)
-        self.fileTime = None
+        self.fileSignature = None
         self.filename = str(filename)
         if os.path.isfile(self.filename):
             self.load()
         else:
-            self.savedText = '\n'
-        self.setPlainText(self.savedText)
+            super().setPlainText('\n')
+            self.document().setModified(True)
         f = QFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
         f.setPointSize(12)
         self.setFont(f)
@@ -183,32 +284,72 @@ class EditFile(QVimPlainTextEdit):
         self.flushTimer.timeout.connect(self.sync)
         self.flushTimer.start(latency)
 
+    def signature(self):
+        try:
+            stat = os.stat(self.filename)
+            return stat.st_ino, stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
     def load(self):
+        signature = self.signature()
         with open(self.filename, 'r') as f:
-            self.savedText = f.read()
-        if not self.savedText or self.savedText[-1] != '\n': self.savedText += '\n'
-        super().setPlainText(self.savedText)
-        self.fileTime = os.path.getmtime(self.filename)
+            text = f.read()
+        if not text or text[-1] != '\n': text += '\n'
+        super().setPlainText(text)
+        self.document().setModified(False)
+        self.fileSignature = signature
+
+    def ensure_trailing_newline(self):
+        document = self.document()
+        if document.lastBlock().text() == '' and document.blockCount() > 1:
+            return
+        cursor = self.textCursor()
+        position, anchor = cursor.position(), cursor.anchor()
+        end = QTextCursor(document)
+        end.movePosition(QTextCursor.End)
+        end.joinPreviousEditBlock()
+        end.insertText('\n')
+        end.endEditBlock()
+        if self.textCursor().position() != position or self.textCursor().anchor() != anchor:
+            cursor.setPosition(anchor)
+            cursor.setPosition(position, QTextCursor.KeepAnchor)
+            self.setTextCursor(cursor)
+
+    def write(self):
+        target = os.path.realpath(self.filename)
+        directory = os.path.dirname(target)
+        try:
+            mode = os.stat(target).st_mode & 0o777
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(target) + '.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.toPlainText())
+            os.chmod(temporary, mode)
+            os.replace(temporary, target)
+        except Exception:
+            os.remove(temporary)
+            raise
+        self.document().setModified(False)
+        self.fileSignature = self.signature()
 
     def sync(self):
-        from time import time
-        if os.path.isfile(self.filename) and (not self.fileTime or self.fileTime < os.path.getmtime(self.filename)):
+        signature = self.signature()
+        if signature is not None and signature != self.fileSignature:
             self.load()
-        current = self.toPlainText()
-        if not current or current[-1] != '\n':
-            current += '\n'
-            cursor = self.textCursor()
-            super().setPlainText(current)
-            self.setTextCursor(cursor)
-            self.moveCursor(QTextCursor.Left)
-        if current != self.savedText:
-            with open(self.filename, 'w') as f:
-                f.write(current)
-            self.savedText = current
-            self.fileTime = os.path.getmtime(self.filename)
+            return
+        if not self.document().isModified():
+            return
+        self.ensure_trailing_newline()
+        self.write()
 
     def setPlainText(self, text):
         super().setPlainText(text)
+        self.document().setModified(True)
         self.sync()
 
 
@@ -235,38 +376,161 @@ class MainEditFile(QMainWindow):
 
 
 class ViewFile(QPlainTextEdit):
+    appended = pyqtSignal(int, object)  # offset in the file, and the bytes read from there
+
     def __init__(self, filename: str, latency=1000, point_size=10):
         super().__init__()
         self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
         self.latency = latency
         f = QFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
         f.setPointSize(point_size)
         self.setFont(f)
         self.modtime = 0.0
+        self.highlighter = MatchHighlighter(self)
         self.reset(filename)
 
     def refresh(self):
+        if os.path.isfile(self.filename):
+            stat = os.stat(self.filename)
+            if stat.st_mtime > self.modtime or stat.st_size != self.file_size:
+                self.modtime = stat.st_mtime
+                with open(self.filename, 'rb') as f:
+                    grown = 0 < self.file_size < stat.st_size and stat.st_ino == self.inode and f.read(
+                        len(self.head)) == self.head  # the same file, appended to
+                    self.file_size = stat.st_size
+                    if grown:
+                        if stat.st_size > self.position:  # and not already shown, eg fetched from a remote copy
+                            f.seek(self.position)
+                            self.append(self.position, f.read())
+                        return
+                    f.seek(0)
+                    data = f.read()
+                self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                self.position = len(data)
+                self.file_size = len(data)
+                self.inode = stat.st_ino
+                self.head = data[:256]
+                self.keep_scroll_position(lambda: self.setPlainText(self.decoder.decode(data)))
+                self.appended.emit(0, data)
+
+    def append(self, offset, data: bytes):
+        r"""
+        Add bytes that have been appended to the file, eg as they are fetched from a remote backend
+
+        :param offset: Position in the file of the start of data. Data that does not continue what has been shown
+        already is ignored, unless it is from the start of the file, which has then been restarted.
+        :param data: New contents
+        """
+        if offset == 0 and self.position and data:
+            self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            self.position = len(data)
+            self.keep_scroll_position(lambda: self.setPlainText(self.decoder.decode(data)))
+            self.appended.emit(0, data)
+            return
+        if offset != self.position or not data:
+            return
+        self.position += len(data)
+        self.appended.emit(offset, data)
+        text = self.decoder.decode(data)
+        if text:
+            def insert():
+                cursor = QTextCursor(self.document())
+                cursor.movePosition(QTextCursor.End)
+                cursor.insertText(text)
+
+            self.keep_scroll_position(insert)
+
+    def find(self, text, regex=False, reverse=False):
+        r"""
+        Highlight all matches of a string or regular expression, and scroll to the next one
+
+        :return: Whether there is a match
+        :rtype: bool
+        """
+        if not self.highlighter.set_pattern(text, regex) or not text:
+            return False
+        pattern = self.highlighter.pattern  # the same as is highlighted
+        position = self.textCursor().position()
+        found = find_in_document(self.document(), pattern, position if reverse else position + 1, reverse)
+        if found < 0:
+            found = find_in_document(self.document(), pattern, self.document().characterCount() if reverse else 0,
+                                     reverse)
+        if found < 0:
+            return False
+        cursor = self.textCursor()
+        cursor.setPosition(found)
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+        return True
+
+    def keep_scroll_position(self, change):
         scrollbar = self.verticalScrollBar()
         scrollbar_at_bottom = scrollbar.value() >= (scrollbar.maximum() - 1)
         scrollbar_prev_value = scrollbar.value()
-        if os.path.isfile(self.filename):
-            if os.path.getmtime(self.filename) > self.modtime:
-                self.modtime = os.path.getmtime(self.filename)
-                with open(self.filename, 'r') as f:
-                    self.setPlainText(f.read())
-            if scrollbar_at_bottom:
-                self.verticalScrollBar().setValue(scrollbar.maximum())
-            else:
-                self.verticalScrollBar().setValue(scrollbar_prev_value)
+        change()
+        if scrollbar_at_bottom:
+            self.verticalScrollBar().setValue(scrollbar.maximum())
+        else:
+            self.verticalScrollBar().setValue(scrollbar_prev_value)
 
     def reset(self, filename):
         self.filename = str(filename)
         self.savedText = ''
+        self.position = 0
+        self.file_size = 0
+        self.modtime = 0.0
+        self.inode = None
+        self.head = b''
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
         self.refreshTimer = QTimer()
         self.refreshTimer.timeout.connect(self.refresh)
         self.refreshTimer.start(self.latency)
 
 
+element_colours = {'H': '#E0E0E0', 'C': '#505050', 'N': '#3050F8', 'O': '#FF0D0D', 'F': '#90E050', 'P': '#FF8000',
+                   'S': '#E0C030', 'Cl': '#1FF01F', 'Br': '#A62929', 'I': '#940094'}
+
+
+def structure_thumbnail(atoms, bonds, size=32):
+    r"""
+    Draw a small picture of a molecule. Only a QImage is used, so this can be called from a thread other than the GUI
+    thread.
+
+    :param atoms: Element and cartesian coordinates of each atom
+    :param bonds: Pairs of indices of bonded atoms
+    :param size: Width and height of the image in pixels
+    :rtype: QImage
+    """
+    from PyQt5.QtGui import QImage, QPainter, QColor, QPen
+    image = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    if not atoms:
+        return image
+    xs = [atom[1] for atom in atoms]
+    ys = [atom[2] for atom in atoms]
+    zs = [atom[3] for atom in atoms]
+    ranges = sorted([(max(c) - min(c), i) for i, c in enumerate([xs, ys, zs])], reverse=True)
+    axes = [[xs, ys, zs][ranges[0][1]], [xs, ys, zs][ranges[1][1]], [xs, ys, zs][ranges[2][1]]]
+    diameter = max(3.0, size / 8)
+    scale = (size - 2 * diameter) / max(ranges[0][0], ranges[1][0], 1e-6)
+    centre = [(max(axis) + min(axis)) / 2 for axis in axes[:2]]
+    points = [(size / 2 + (axes[0][i] - centre[0]) * scale, size / 2 - (axes[1][i] - centre[1]) * scale) for i in
+              range(len(atoms))]
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(QPen(QColor('#808080'), max(1.0, size / 40)))
+    for a, b in bonds:
+        painter.drawLine(int(points[a][0]), int(points[a][1]), int(points[b][0]), int(points[b][1]))
+    painter.setPen(Qt.NoPen)
+    for i in sorted(range(len(atoms)), key=lambda i: axes[2][i]):
+        painter.setBrush(QColor(element_colours.get(atoms[i][0], '#FF1493')))
+        painter.drawEllipse(int(points[i][0] - diameter / 2), int(points[i][1] - diameter / 2), int(diameter),
+                            int(diameter))
+    painter.end()
+    return image
+
+
 def force_suffix(filename, suffix='molpro'):
     if not filename:
         return ''
@@ -339,6 +603,7 @@ class OrbitalSetMolden(OrbitalSet):
                     self.orbitals[-1]['occupation'] = float(value)
                 elif re.match(' *Spin *=', line):
                     self.orbitals[-1]['spin'] = value
+        import numpy
         self.index = [list(numpy.argsort(self.energies)).index(i) + 1 for i in range(len(self.orbitals))]
 
 
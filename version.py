@@ -0,0 +1,37 @@
+import os
+import pathlib
+import subprocess
+
+_version = None
+
+
+def version():
+    r"""
+    The version of iMolpro, found once per process: from git if running from a checkout, or else from the VERSION
+    file written by build.sh
+
+    :rtype: str
+    """
+    global _version
+    if _version is None:
+        _version = _find_version()
+    return _version
+
+
+def _find_version():
+    directory = pathlib.Path(__file__).resolve().parent
+    if os.path.exists(directory / '.git'):
+        try:
+            version_ = subprocess.check_output(['git', 'describe', '--tags', '--dirty'], cwd=directory,
+                                               stderr=subprocess.DEVNULL).decode('ascii').strip()
+            if version_:
+                return version_
+        except Exception:
+            pass
+    version_file = directory / 'VERSION'
+    if os.path.exists(version_file):
+        with open(version_file, 'r') as f:
+            version_ = f.read().strip()
+        if version_:
+            return version_
+    return 'unknown'